@@ -8,6 +8,9 @@ pip install -r requirements.txt
 # Run migrations
 python manage.py migrate
 
+# Create the database cache table (CACHE_BACKEND=db)
+python manage.py createcachetable
+
 # Collect static files
 python manage.py collectstatic --noinput
 
@@ -1,10 +1,13 @@
 from rest_framework import viewsets
+from sparehubadmin.conditional import ConditionalGetMixin
+from sparehubadmin.pagination import OptInKeysetPagination
 from .models import Address
 from .serializers import AddressSerializer
 
-class AddressViewSet(viewsets.ModelViewSet):
+class AddressViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
+    pagination_class = OptInKeysetPagination
 
     def get_queryset(self):
         return Address.objects.filter(user=self.request.user)
@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import Analytics
+from .models import Analytics, DailySalesRollup
 
 @admin.register(Analytics)
 class AnalyticsAdmin(admin.ModelAdmin):
     list_display = ('user', 'start_date', 'end_date', 'created_at')
     search_fields = ('user__username',)
     ordering = ('-created_at',)
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'status', 'dimension', 'dimension_id', 'order_count', 'revenue', 'item_count')
+    list_filter = ('status', 'dimension')
+    ordering = ('-date',)
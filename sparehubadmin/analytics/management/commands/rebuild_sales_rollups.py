@@ -0,0 +1,95 @@
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from analytics.models import Analytics, DailySalesRollup, RollupDimension
+from orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailySalesRollup table from orders, one date chunk per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD), defaults to the first order')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Number of days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        start, end = self.get_range(options)
+        if start is None:
+            self.stdout.write('No orders found, nothing to rebuild')
+            return
+
+        chunk = timedelta(days=options['chunk_days'])
+        day = start
+        total_rows = 0
+        while day <= end:
+            chunk_end = min(day + chunk, end + timedelta(days=1))
+            with transaction.atomic():
+                DailySalesRollup.objects.filter(date__gte=day, date__lt=chunk_end).delete()
+                rows = self.build_rows(day, chunk_end)
+                DailySalesRollup.objects.bulk_create(rows, batch_size=1000)
+                Analytics.objects.filter(
+                    start_date__lt=chunk_end, end_date__gte=day
+                ).update(is_stale=True, generation=F('generation') + 1)
+            total_rows += len(rows)
+            self.stdout.write(f'Rebuilt {day} to {chunk_end - timedelta(days=1)}: {len(rows)} rows')
+            day = chunk_end
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_rows} rollup rows'))
+
+    def get_range(self, options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('Dates must use the YYYY-MM-DD format')
+        if start is None:
+            first_order = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first_order is None:
+                return None, None
+            start = timezone.localdate(first_order)
+        return start, end
+
+    def build_rows(self, start, end):
+        start_dt = timezone.make_aware(datetime.combine(start, time.min))
+        end_dt = timezone.make_aware(datetime.combine(end, time.min))
+        orders = Order.objects.filter(
+            created_at__gte=start_dt, created_at__lt=end_dt
+        ).annotate(day=TruncDate('created_at'))
+        items = OrderItem.objects.filter(
+            order__created_at__gte=start_dt, order__created_at__lt=end_dt
+        ).annotate(day=TruncDate('order__created_at'))
+
+        rows = {}
+
+        def row(day, status, dimension, dimension_id):
+            key = (day, status, dimension, dimension_id)
+            if key not in rows:
+                rows[key] = DailySalesRollup(
+                    date=day, status=status, dimension=dimension, dimension_id=dimension_id
+                )
+            return rows[key]
+
+        for entry in orders.values('day', 'status').annotate(count=Count('id'), revenue=Sum('total')):
+            rollup = row(entry['day'], entry['status'], RollupDimension.ALL, 0)
+            rollup.order_count, rollup.revenue = entry['count'], entry['revenue']
+        for entry in orders.values('day', 'status', 'user_id').annotate(count=Count('id'), revenue=Sum('total')):
+            rollup = row(entry['day'], entry['status'], RollupDimension.SHOP, entry['user_id'])
+            rollup.order_count, rollup.revenue = entry['count'], entry['revenue']
+
+        for entry in items.values('day', 'order__status').annotate(units=Sum('quantity')):
+            row(entry['day'], entry['order__status'], RollupDimension.ALL, 0).item_count = entry['units']
+        for entry in items.values('day', 'order__status', 'order__user_id').annotate(units=Sum('quantity')):
+            row(entry['day'], entry['order__status'], RollupDimension.SHOP, entry['order__user_id']).item_count = entry['units']
+        for entry in items.filter(product__isnull=False).values(
+            'day', 'order__status', 'product__manufacturer_id'
+        ).annotate(
+            count=Count('order_id', distinct=True), revenue=Sum('line_total'), units=Sum('quantity')
+        ):
+            rollup = row(entry['day'], entry['order__status'], RollupDimension.MANUFACTURER, entry['product__manufacturer_id'])
+            rollup.order_count, rollup.revenue, rollup.item_count = entry['count'], entry['revenue'], entry['units']
+
+        return list(rows.values())
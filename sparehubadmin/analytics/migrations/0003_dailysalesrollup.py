@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-17 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('returned', 'Returned')], max_length=20)),
+                ('dimension', models.CharField(choices=[('all', 'All'), ('manufacturer', 'Manufacturer'), ('shop', 'Shop')], default='all', max_length=20)),
+                ('dimension_id', models.PositiveIntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('item_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', 'dimension_id', 'date'], name='analytics_rollup_dim_date_idx')],
+                'unique_together': {('date', 'status', 'dimension', 'dimension_id')},
+            },
+        ),
+    ]
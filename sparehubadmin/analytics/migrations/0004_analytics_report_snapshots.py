@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_dailysalesrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analytics',
+            name='is_stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='analytics',
+            name='report_type',
+            field=models.CharField(blank=True, choices=[('manufacturer', 'Manufacturer'), ('shop', 'Shop')], default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='analytics',
+            index=models.Index(fields=['user', 'report_type', 'start_date', 'end_date'], name='analytics_report_key_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-17 13:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_snapshots(apps, schema_editor):
+    """Keep the most recently updated snapshot of each report; the others were never served."""
+    Analytics = apps.get_model('analytics', 'Analytics')
+    seen = set()
+    duplicates = []
+    rows = Analytics.objects.order_by('-updated_at', '-id').values_list(
+        'id', 'user_id', 'report_type', 'start_date', 'end_date'
+    )
+    for snapshot_id, *key in rows.iterator():
+        key = tuple(key)
+        if key in seen:
+            duplicates.append(snapshot_id)
+        seen.add(key)
+    Analytics.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_analytics_report_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analytics',
+            name='generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(remove_duplicate_snapshots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='analytics',
+            constraint=models.UniqueConstraint(fields=('user', 'report_type', 'start_date', 'end_date'), name='analytics_report_key_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='analytics',
+            name='analytics_report_key_idx',
+        ),
+    ]
@@ -1,14 +1,53 @@
 from django.db import models
 from django.db.models import JSONField
 from users.models import User
+from orders.models import OrderStatus
+
+class ReportType(models.TextChoices):
+    MANUFACTURER = 'manufacturer'
+    SHOP = 'shop'
 
 class Analytics(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    report_type = models.CharField(max_length=20, choices=ReportType.choices, blank=True, default='')
     data = JSONField()
     start_date = models.DateField()
     end_date = models.DateField()
+    is_stale = models.BooleanField(default=False)
+    # Incremented by every invalidation, so a rebuild started before one cannot clear it
+    generation = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'report_type', 'start_date', 'end_date'], name='analytics_report_key_uniq'),
+        ]
+
     def __str__(self):
         return f"Analytics for {self.user.username} from {self.start_date} to {self.end_date}"
+
+class RollupDimension(models.TextChoices):
+    ALL = 'all'
+    MANUFACTURER = 'manufacturer'
+    SHOP = 'shop'
+
+class DailySalesRollup(models.Model):
+    """Per-day sales totals for one order status, overall or for a single manufacturer/shop."""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    dimension = models.CharField(max_length=20, choices=RollupDimension.choices, default=RollupDimension.ALL)
+    dimension_id = models.PositiveIntegerField(default=0)  # User id of the manufacturer/shop, 0 for ALL
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    item_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'status', 'dimension', 'dimension_id')
+        indexes = [
+            models.Index(fields=['dimension', 'dimension_id', 'date'], name='analytics_rollup_dim_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status} {self.dimension}:{self.dimension_id}"
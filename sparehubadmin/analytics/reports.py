@@ -0,0 +1,114 @@
+"""Per-manufacturer and per-shop sales reports, cached as Analytics snapshots.
+
+Reports are computed from the DailySalesRollup table plus one grouped
+OrderItem query for the top SKUs, stored in ``Analytics.data`` and served
+from there until an order touching the report's user and date range marks
+the snapshot stale.
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import F, Sum
+from django.utils import timezone
+from orders.models import OrderItem, OrderStatus
+from .models import Analytics, DailySalesRollup, ReportType, RollupDimension
+
+MAX_REPORT_DAYS = 366
+TOP_SKU_LIMIT = 10
+# Orders in these statuses are listed in the funnel but excluded from sales totals
+LOST_STATUSES = [OrderStatus.CANCELLED, OrderStatus.RETURNED]
+
+def build_report(user, report_type, start_date, end_date):
+    start_dt = timezone.make_aware(datetime.combine(start_date, time.min))
+    end_dt = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    if report_type == ReportType.MANUFACTURER:
+        dimension = RollupDimension.MANUFACTURER
+        items = OrderItem.objects.filter(product__manufacturer=user)
+    else:
+        dimension = RollupDimension.SHOP
+        items = OrderItem.objects.filter(order__user=user)
+
+    rollups = DailySalesRollup.objects.filter(
+        dimension=dimension,
+        dimension_id=user.id,
+        date__range=[start_date, end_date]
+    )
+
+    status_funnel = {status: {'orders': 0, 'revenue': 0.0, 'units': 0} for status in OrderStatus.values}
+    for row in rollups.values('status').annotate(
+        orders=Sum('order_count'), revenue=Sum('revenue'), units=Sum('item_count')
+    ):
+        status_funnel[row['status']] = {
+            'orders': row['orders'],
+            'revenue': float(row['revenue']),
+            'units': row['units'],
+        }
+
+    daily_sales = [
+        {'date': row['date'].isoformat(), 'orders': row['orders'], 'revenue': float(row['revenue'])}
+        for row in rollups.exclude(status__in=LOST_STATUSES).values('date').annotate(
+            orders=Sum('order_count'), revenue=Sum('revenue')
+        ).order_by('date')
+    ]
+
+    top_skus = [
+        {
+            'product_id': row['product_id'],
+            'sku': row['product__sku'],
+            'name': row['product__name'],
+            'units': row['units'],
+            'revenue': float(row['revenue']),
+        }
+        for row in items.filter(
+            product__isnull=False,
+            order__created_at__gte=start_dt,
+            order__created_at__lt=end_dt
+        ).exclude(
+            order__status__in=LOST_STATUSES
+        ).values('product_id', 'product__sku', 'product__name').annotate(
+            units=Sum('quantity'), revenue=Sum('line_total')
+        ).order_by('-units')[:TOP_SKU_LIMIT]
+    ]
+
+    sold = [totals for status, totals in status_funnel.items() if status not in LOST_STATUSES]
+    return {
+        'revenue': sum(totals['revenue'] for totals in sold),
+        'orders': sum(totals['orders'] for totals in sold),
+        'units': sum(totals['units'] for totals in sold),
+        'status_funnel': status_funnel,
+        'daily_sales': daily_sales,
+        'top_skus': top_skus,
+    }
+
+def get_report(user, report_type, start_date, end_date):
+    """Return ``(snapshot, cached)`` for the report, rebuilding the snapshot if it is stale."""
+    key = dict(user=user, report_type=report_type, start_date=start_date, end_date=end_date)
+    snapshot = Analytics.objects.filter(**key).first()
+    if snapshot and not snapshot.is_stale:
+        return snapshot, True
+
+    data = build_report(user, report_type, start_date, end_date)
+    if snapshot is None:
+        # A concurrent request may have stored it first; its data is as fresh as ours
+        snapshot, _ = Analytics.objects.get_or_create(**key, defaults={'data': data})
+        return snapshot, False
+    # Left stale if an order invalidated it while the report was being built
+    Analytics.objects.filter(pk=snapshot.pk, generation=snapshot.generation).update(
+        data=data, is_stale=False, updated_at=timezone.now()
+    )
+    snapshot.data = data
+    return snapshot, False
+
+def invalidate_snapshots(order_snapshot):
+    """Mark the report snapshots covering an order's day as stale."""
+    report_types = {
+        RollupDimension.MANUFACTURER: ReportType.MANUFACTURER,
+        RollupDimension.SHOP: ReportType.SHOP,
+    }
+    for dimension, dimension_id, _, _ in order_snapshot.contributions:
+        if dimension not in report_types:
+            continue
+        Analytics.objects.filter(
+            user_id=dimension_id,
+            report_type=report_types[dimension],
+            start_date__lte=order_snapshot.date,
+            end_date__gte=order_snapshot.date
+        ).update(is_stale=True, generation=F('generation') + 1)
@@ -0,0 +1,128 @@
+"""Incremental maintenance of the DailySalesRollup fact table.
+
+Order writes take a snapshot of what an order contributes to the rollup
+(its day, status and per-dimension totals) and apply it as a delta once the
+surrounding transaction commits, so the hot "today" rows are only locked for
+the duration of a single UPDATE.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from orders.models import OrderItem
+from .models import DailySalesRollup, RollupDimension
+from . import reports
+
+OrderSnapshot = namedtuple('OrderSnapshot', ['date', 'status', 'contributions'])
+
+def snapshot(order):
+    """Capture the rollup contributions of ``order`` as it is currently stored."""
+    manufacturer_totals = order.order_items.values('product__manufacturer_id').annotate(
+        revenue=Sum('line_total'),
+        units=Sum('quantity')
+    )
+    return _build_snapshot(order, manufacturer_totals)
+
+def snapshots(orders):
+    """``snapshot`` for many orders, keyed by pk, from one query."""
+    manufacturer_totals = defaultdict(list)
+    for row in OrderItem.objects.filter(order__in=orders).values('order_id', 'product__manufacturer_id').annotate(
+        revenue=Sum('line_total'),
+        units=Sum('quantity')
+    ):
+        manufacturer_totals[row['order_id']].append(row)
+    return {order.pk: _build_snapshot(order, manufacturer_totals[order.pk]) for order in orders}
+
+def _build_snapshot(order, manufacturer_totals):
+    total_units = 0
+    contributions = []
+    for row in manufacturer_totals:
+        total_units += row['units'] or 0
+        if row['product__manufacturer_id']:
+            contributions.append((
+                RollupDimension.MANUFACTURER, row['product__manufacturer_id'],
+                row['revenue'] or Decimal('0'), row['units'] or 0
+            ))
+    contributions.append((RollupDimension.ALL, 0, order.total, total_units))
+    contributions.append((RollupDimension.SHOP, order.user_id, order.total, total_units))
+    return OrderSnapshot(timezone.localdate(order.created_at), order.status, tuple(contributions))
+
+def _add(date, status, dimension, dimension_id, order_count, revenue, item_count):
+    lookup = {'date': date, 'status': status, 'dimension': dimension, 'dimension_id': dimension_id}
+    changes = {
+        'order_count': F('order_count') + order_count,
+        'revenue': F('revenue') + revenue,
+        'item_count': F('item_count') + item_count,
+        'updated_at': timezone.now(),
+    }
+    if DailySalesRollup.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            DailySalesRollup.objects.create(
+                order_count=order_count, revenue=revenue, item_count=item_count, **lookup
+            )
+    except IntegrityError:
+        # Another worker created the row first
+        DailySalesRollup.objects.filter(**lookup).update(**changes)
+
+def apply_snapshot(order_snapshot, sign=1):
+    for dimension, dimension_id, revenue, units in order_snapshot.contributions:
+        _add(
+            order_snapshot.date, order_snapshot.status, dimension, dimension_id,
+            sign, sign * revenue, sign * units
+        )
+
+def _apply_on_commit(*deltas):
+    def apply():
+        with transaction.atomic():
+            for order_snapshot, sign in deltas:
+                apply_snapshot(order_snapshot, sign)
+                reports.invalidate_snapshots(order_snapshot)
+    transaction.on_commit(apply)
+
+def record_order_created(order):
+    _apply_on_commit((snapshot(order), 1))
+
+def record_order_changed(before, order):
+    """Move an order's contribution from the ``before`` snapshot to its current state."""
+    after = snapshot(order)
+    if after != before:
+        _apply_on_commit((before, -1), (after, 1))
+
+def record_status_change(order, old_status):
+    after = snapshot(order)
+    if old_status != after.status:
+        _apply_on_commit((after._replace(status=old_status), -1), (after, 1))
+
+def record_status_changes(changes):
+    """``record_status_change`` for many ``(order, old_status)`` pairs, merging their deltas."""
+    deltas = defaultdict(lambda: [0, Decimal('0'), 0])
+    stale = defaultdict(set)
+    after_by_pk = snapshots([order for order, _ in changes])
+    for order, old_status in changes:
+        after = after_by_pk[order.pk]
+        if old_status == after.status:
+            continue
+        for dimension, dimension_id, revenue, units in after.contributions:
+            for status, sign in ((old_status, -1), (after.status, 1)):
+                delta = deltas[(after.date, status, dimension, dimension_id)]
+                delta[0] += sign
+                delta[1] += sign * revenue
+                delta[2] += sign * units
+            stale[after.date].add((dimension, dimension_id))
+
+    def apply():
+        with transaction.atomic():
+            for key, (order_count, revenue, item_count) in deltas.items():
+                _add(*key, order_count, revenue, item_count)
+            for date, dimensions in stale.items():
+                reports.invalidate_snapshots(OrderSnapshot(
+                    date, None, tuple((dimension, dimension_id, 0, 0) for dimension, dimension_id in dimensions)
+                ))
+    if deltas:
+        transaction.on_commit(apply)
+
+def record_order_deleted(before):
+    _apply_on_commit((before, -1))
@@ -5,3 +5,4 @@ class AnalyticsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Analytics
         fields = '__all__'
+        read_only_fields = ['generation']
@@ -1,7 +1,62 @@
-from rest_framework import viewsets
-from .models import Analytics
+from datetime import datetime, timedelta
+from django.utils import timezone
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from users.models import User
+from .models import Analytics, ReportType
 from .serializers import AnalyticsSerializer
+from .reports import MAX_REPORT_DAYS, get_report
 
 class AnalyticsViewSet(viewsets.ModelViewSet):
     queryset = Analytics.objects.all()
     serializer_class = AnalyticsSerializer
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def report(self, request):
+        report_type = request.query_params.get('type') or request.user.role
+        if report_type not in ReportType.values:
+            return Response(
+                {'error': f"type must be one of: {', '.join(ReportType.values)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            end_date = request.query_params.get('end')
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else timezone.localdate()
+            start_date = request.query_params.get('start')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end_date - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'start and end must use the YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+        if start_date > end_date:
+            return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end_date - start_date).days >= MAX_REPORT_DAYS:
+            return Response(
+                {'error': f'Reports are limited to {MAX_REPORT_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user
+        if request.query_params.get('user_id'):
+            if not user.is_staff:
+                return Response({'error': 'Only staff can view reports of other users'}, status=status.HTTP_403_FORBIDDEN)
+            try:
+                user = User.objects.get(pk=request.query_params['user_id'])
+            except (User.DoesNotExist, ValueError):
+                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        if user.role != report_type and not request.user.is_staff:
+            return Response(
+                {'error': f'Only {report_type} accounts can view {report_type} reports'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        snapshot, cached = get_report(user, report_type, start_date, end_date)
+        return Response({
+            'type': report_type,
+            'user': user.id,
+            'start': start_date,
+            'end': end_date,
+            'generated_at': snapshot.updated_at,
+            'cached': cached,
+            'data': snapshot.data,
+        })
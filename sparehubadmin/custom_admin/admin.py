@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import ExportJob
 
-# Register your models here.
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'export_format', 'status', 'rows_written', 'bytes_written', 'requested_by', 'created_at')
+    list_filter = ('kind', 'status')
+    ordering = ('-created_at',)
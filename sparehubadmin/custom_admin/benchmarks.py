@@ -0,0 +1,163 @@
+"""Query-count and latency budgets for the API and admin endpoints.
+
+Each entry in ``ENDPOINTS`` is requested ``warmup + iterations`` times
+through the Django test client against a synthetic dataset. The most
+queries seen in any one request and the p50/p95 latency are compared with
+the entry's budget. Query ceilings do not depend on the dataset size, so
+exceeding one means a per-row (N+1) query has crept in. Ceilings for JWT
+requests include the query that loads the authenticated user, and detail
+ceilings include the conditional GET validator query. ``revalidate``
+entries replay the first response's ETag and expect 304 Not Modified.
+"""
+import statistics
+import time
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from orders.models import Order
+from products.models import Product
+from users.models import User
+from .synthetic import SYNTHETIC_PASSWORD
+
+# auth: None, 'shop' / 'manufacturer' (JWT bearer token) or 'admin' (session login);
+# params/data are templates filled from benchmark_context(), or callables taking it
+ENDPOINTS = [
+    {'name': 'products.list', 'method': 'get', 'path': '/api/products/', 'auth': 'shop',
+     'max_queries': 4, 'p50_ms': 150, 'p95_ms': 400},
+    {'name': 'products.list_slim', 'method': 'get', 'path': '/api/products/', 'auth': 'shop',
+     'params': {'expand': '', 'page_size': 100}, 'max_queries': 4, 'p50_ms': 150, 'p95_ms': 400},
+    {'name': 'products.list_keyset', 'method': 'get', 'path': '/api/products/', 'auth': 'shop',
+     'params': {'cursor': '', 'expand': '', 'page_size': 100}, 'max_queries': 3, 'p50_ms': 100, 'p95_ms': 300},
+    {'name': 'products.search', 'method': 'get', 'path': '/api/products/', 'auth': 'shop',
+     'params': {'search': '{search_term}', 'expand': ''}, 'max_queries': 6, 'p50_ms': 200, 'p95_ms': 500},
+    {'name': 'products.manufacturer_list', 'method': 'get', 'path': '/api/products/', 'auth': 'manufacturer',
+     'max_queries': 4, 'p50_ms': 150, 'p95_ms': 400},
+    {'name': 'products.retrieve', 'method': 'get', 'path': '/api/products/{product_id}/', 'auth': 'shop',
+     'max_queries': 4, 'p50_ms': 50, 'p95_ms': 150},
+    {'name': 'products.retrieve_not_modified', 'method': 'get', 'path': '/api/products/{product_id}/',
+     'auth': 'shop', 'revalidate': True, 'max_queries': 2, 'p50_ms': 20, 'p95_ms': 60},
+    {'name': 'products.featured', 'method': 'get', 'path': '/api/products/featured/', 'auth': 'shop',
+     'max_queries': 3, 'p50_ms': 100, 'p95_ms': 300},
+    {'name': 'products.facets', 'method': 'get', 'path': '/api/products/facets/', 'auth': 'shop',
+     'max_queries': 7, 'p50_ms': 50, 'p95_ms': 1000},
+    {'name': 'orders.list_keyset', 'method': 'get', 'path': '/api/orders/', 'auth': 'shop',
+     'params': {'cursor': '', 'page_size': 50}, 'max_queries': 3, 'p50_ms': 150, 'p95_ms': 400},
+    {'name': 'orders.retrieve', 'method': 'get', 'path': '/api/orders/{order_id}/', 'auth': 'shop',
+     'max_queries': 4, 'p50_ms': 50, 'p95_ms': 150},
+    {'name': 'orders.retrieve_not_modified', 'method': 'get', 'path': '/api/orders/{order_id}/',
+     'auth': 'shop', 'revalidate': True, 'max_queries': 2, 'p50_ms': 20, 'p95_ms': 60},
+    {'name': 'orders.quote', 'method': 'post', 'path': '/api/orders/quote/', 'auth': 'shop',
+     'data': lambda context: {'items': [
+         {'product_id': str(product_id), 'quantity': 2} for product_id in context['cart_product_ids']
+     ]}, 'max_queries': 2, 'p50_ms': 150, 'p95_ms': 400},
+    {'name': 'users.login', 'method': 'post', 'path': '/api/users/login/', 'auth': None,
+     'data': {'username': '{shop_email}', 'password': SYNTHETIC_PASSWORD},
+     'max_queries': 3, 'p50_ms': 1000, 'p95_ms': 2000},
+    {'name': 'users.profile', 'method': 'get', 'path': '/api/users/profile/', 'auth': 'shop',
+     'max_queries': 3, 'p50_ms': 50, 'p95_ms': 150},
+    {'name': 'admin.dashboard', 'method': 'get', 'path': '/admin/', 'auth': 'admin',
+     'max_queries': 10, 'p50_ms': 300, 'p95_ms': 800},
+    {'name': 'admin.analytics', 'method': 'get', 'path': '/admin/analytics/', 'auth': 'admin',
+     'max_queries': 8, 'p50_ms': 300, 'p95_ms': 800},
+]
+
+def benchmark_context():
+    """Ids and credentials the endpoint templates are filled in with."""
+    shop = User.objects.filter(role='shop', email__endswith='@load.sparehub.test').order_by('id').first()
+    manufacturer = User.objects.filter(role='manufacturer', products__isnull=False).order_by('id').first()
+    admin = User.objects.filter(is_superuser=True).order_by('id').first()
+    if admin is None:
+        admin = User.objects.create_superuser('benchmark-admin@load.sparehub.test', 'benchmark-admin', SYNTHETIC_PASSWORD)
+    products = Product.objects.filter(is_active=True, is_approved=True).order_by('id')
+    product = products.first()
+    return {
+        'users': {'shop': shop, 'manufacturer': manufacturer, 'admin': admin},
+        'shop_email': shop.email,
+        'product_id': product.id,
+        'cart_product_ids': list(products.values_list('id', flat=True)[:500]),
+        'order_id': Order.objects.order_by('id').values_list('id', flat=True).first(),
+        'search_term': product.subcategory.name.split()[0][:4],
+    }
+
+def fill(value, context):
+    if callable(value):
+        return value(context)
+    if isinstance(value, str):
+        return value.format(**{key: item for key, item in context.items() if key != 'users'})
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    return value
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def build_client(auth, context):
+    client = Client()
+    if auth == 'admin':
+        client.force_login(context['users']['admin'])
+    elif auth:
+        token = RefreshToken.for_user(context['users'][auth]).access_token
+        client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+def run_endpoint(endpoint, context, iterations=20, warmup=3, latency_scale=1.0):
+    client = build_client(endpoint['auth'], context)
+    path = fill(endpoint['path'], context)
+    method = getattr(client, endpoint['method'])
+    if endpoint['method'] == 'get':
+        kwargs = {'data': fill(endpoint.get('params', {}), context)}
+    else:
+        kwargs = {'data': fill(endpoint.get('data', {}), context), 'content_type': 'application/json'}
+    expected_status = 200
+    if endpoint.get('revalidate'):
+        kwargs['HTTP_IF_NONE_MATCH'] = method(path, **kwargs).get('ETag', '')
+        expected_status = 304
+
+    timings = []
+    max_queries = 0
+    status_codes = set()
+    for run in range(warmup + iterations):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = method(path, **kwargs)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        status_codes.add(response.status_code)
+        if run >= warmup:
+            timings.append(elapsed)
+            max_queries = max(max_queries, len(queries))
+
+    result = {
+        'name': endpoint['name'],
+        'method': endpoint['method'].upper(),
+        'path': path,
+        'status_codes': sorted(status_codes),
+        'queries': max_queries,
+        'max_queries': endpoint['max_queries'],
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'budget_p50_ms': endpoint['p50_ms'] * latency_scale,
+        'budget_p95_ms': endpoint['p95_ms'] * latency_scale,
+    }
+    failures = []
+    if status_codes != {expected_status}:
+        failures.append(f"unexpected status codes {result['status_codes']}")
+    if result['queries'] > result['max_queries']:
+        failures.append(f"{result['queries']} queries exceeds ceiling {result['max_queries']}")
+    if result['p50_ms'] > result['budget_p50_ms']:
+        failures.append(f"p50 {result['p50_ms']}ms exceeds {result['budget_p50_ms']}ms")
+    if result['p95_ms'] > result['budget_p95_ms']:
+        failures.append(f"p95 {result['p95_ms']}ms exceeds {result['budget_p95_ms']}ms")
+    result['passed'] = not failures
+    result['failures'] = failures
+    return result
+
+def run_benchmarks(endpoints=ENDPOINTS, iterations=20, warmup=3, latency_scale=1.0):
+    context = benchmark_context()
+    return [
+        run_endpoint(endpoint, context, iterations, warmup, latency_scale)
+        for endpoint in endpoints
+    ]
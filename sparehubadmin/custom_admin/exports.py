@@ -0,0 +1,321 @@
+"""Constant-memory exports of orders, products and users.
+
+Rows are read newest-first in keyset pages, ``(created_at, id)`` below the
+last row of the previous page, so every page is an indexed range scan no
+matter how deep the export is. Rows are rendered as CSV or JSON Lines and
+optionally gzip-compressed on the fly. The same pipeline backs the
+streaming download views and the background ExportJob worker.
+"""
+import csv
+import json
+import zlib
+from collections import defaultdict
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from orders.models import Order, OrderItem
+from products.models import Product
+from users.models import User
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_MODES = ('orders', 'items')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# (CSV header, JSON Lines key)
+ORDER_COLUMNS = [
+    ('Order ID', 'order_id'),
+    ('Customer', 'customer'),
+    ('Shop Name', 'shop_name'),
+    ('Status', 'status'),
+    ('Payment Status', 'payment_status'),
+    ('Payment Method', 'payment_method'),
+    ('Total', 'total'),
+    ('Subtotal', 'subtotal'),
+    ('Tax', 'tax'),
+    ('Shipping Cost', 'shipping_cost'),
+    ('Created At', 'created_at'),
+    ('Item Count', 'item_count'),
+]
+
+ORDER_ITEM_COLUMNS = [
+    ('Order ID', 'order_id'),
+    ('Customer', 'customer'),
+    ('Shop Name', 'shop_name'),
+    ('Status', 'status'),
+    ('Created At', 'created_at'),
+    ('Product ID', 'product_id'),
+    ('SKU', 'sku'),
+    ('Product Name', 'product_name'),
+    ('Variant', 'variant'),
+    ('Quantity', 'quantity'),
+    ('Unit Price', 'unit_price'),
+    ('Line Total', 'line_total'),
+]
+
+PRODUCT_COLUMNS = [
+    ('Product ID', 'product_id'),
+    ('SKU', 'sku'),
+    ('Name', 'name'),
+    ('Manufacturer', 'manufacturer'),
+    ('Category', 'category'),
+    ('Subcategory', 'subcategory'),
+    ('Brand', 'brand'),
+    ('Price', 'price'),
+    ('Discount', 'discount'),
+    ('Stock Quantity', 'stock_quantity'),
+    ('Active', 'is_active'),
+    ('Approved', 'is_approved'),
+    ('Featured', 'is_featured'),
+    ('Created At', 'created_at'),
+]
+
+USER_COLUMNS = [
+    ('User ID', 'user_id'),
+    ('Username', 'username'),
+    ('Email', 'email'),
+    ('Role', 'role'),
+    ('Company/Shop Name', 'business_name'),
+    ('Active', 'is_active'),
+    ('Created At', 'created_at'),
+]
+
+def filter_orders(params):
+    """Apply the order list/export filters from a QueryDict-like ``params``."""
+    search_query = params.get('search', '')
+    status_filter = params.get('status', '')
+    payment_status_filter = params.get('payment_status', '')
+    start_date = params.get('start_date', '')
+    end_date = params.get('end_date', '')
+    orders = Order.objects.select_related('user', 'payment')
+    if search_query:
+        orders = orders.filter(
+            Q(id__icontains=search_query) |
+            Q(user__username__icontains=search_query) |
+            Q(shop_name__icontains=search_query)
+        )
+    if status_filter:
+        orders = orders.filter(status=status_filter)
+    if payment_status_filter:
+        orders = orders.filter(payment__status=payment_status_filter)
+    if start_date:
+        orders = orders.filter(created_at__gte=start_date)
+    if end_date:
+        orders = orders.filter(created_at__lte=end_date)
+    return orders
+
+def filter_products(params):
+    """Apply the product list filters (search, category, brand, status)."""
+    search_query = params.get('search', '')
+    category_filter = params.get('category', '')
+    brand_filter = params.get('brand', '')
+    status_filter = params.get('status', '')
+    products = Product.objects.select_related('category', 'subcategory', 'brand', 'manufacturer')
+    if search_query:
+        products = products.filter(Q(name__icontains=search_query) | Q(sku__icontains=search_query))
+    if category_filter:
+        if category_filter.isdigit():
+            products = products.filter(category_id=category_filter)
+        else:
+            products = products.filter(category__name=category_filter)
+    if brand_filter:
+        if brand_filter.isdigit():
+            products = products.filter(brand_id=brand_filter)
+        else:
+            products = products.filter(brand__name=brand_filter)
+    if status_filter == 'active':
+        products = products.filter(is_active=True)
+    elif status_filter == 'inactive':
+        products = products.filter(is_active=False)
+    return products
+
+def filter_users(params):
+    """Apply the user list filters (search, role, status)."""
+    search_query = params.get('search', '')
+    role_filter = params.get('role', '')
+    status_filter = params.get('status', '')
+    users = User.objects.select_related('manufacturer_profile', 'shop_profile')
+    if search_query:
+        users = users.filter(
+            Q(username__icontains=search_query) |
+            Q(email__icontains=search_query) |
+            Q(manufacturer_profile__company_name__icontains=search_query) |
+            Q(shop_profile__shop_name__icontains=search_query)
+        )
+    if role_filter:
+        users = users.filter(role=role_filter)
+    if status_filter == 'active':
+        users = users.filter(is_active=True)
+    elif status_filter == 'inactive':
+        users = users.filter(is_active=False)
+    return users
+
+def iter_keyset_pages(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of at most ``chunk_size`` rows, newest first, one query per page."""
+    queryset = queryset.order_by('-created_at', '-id')
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(
+                Q(created_at__lt=last.created_at) |
+                Q(created_at=last.created_at, id__lt=last.id)
+            )
+        rows = list(page[:chunk_size].iterator(chunk_size=chunk_size))
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
+
+def order_rows(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    for page in iter_keyset_pages(orders, chunk_size):
+        for order in page:
+            yield [
+                order.id,
+                order.user.username,
+                order.shop_name or '',
+                order.status.title(),
+                order.payment.status.title(),
+                order.payment.method.upper(),
+                order.total,
+                order.subtotal,
+                order.tax,
+                order.shipping_cost,
+                order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                len(order.items)
+            ]
+
+def order_item_rows(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    orders = orders.defer('items', 'metadata')
+    for page in iter_keyset_pages(orders, chunk_size):
+        items_by_order = defaultdict(list)
+        for item in OrderItem.objects.filter(
+            order_id__in=[order.id for order in page]
+        ).select_related('product', 'variant').order_by('id'):
+            items_by_order[item.order_id].append(item)
+        for order in page:
+            for item in items_by_order[order.id]:
+                yield [
+                    order.id,
+                    order.user.username,
+                    order.shop_name or '',
+                    order.status.title(),
+                    order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                    item.product_id or '',
+                    item.product.sku if item.product else '',
+                    item.product.name if item.product else '',
+                    item.variant.name if item.variant else '',
+                    item.quantity,
+                    item.unit_price,
+                    item.line_total
+                ]
+
+def product_rows(products, chunk_size=EXPORT_CHUNK_SIZE):
+    for page in iter_keyset_pages(products, chunk_size):
+        for product in page:
+            yield [
+                product.id,
+                product.sku,
+                product.name,
+                product.manufacturer.username,
+                product.category.name,
+                product.subcategory.name,
+                product.brand.name if product.brand else '',
+                product.price,
+                product.discount,
+                product.stock_quantity,
+                product.is_active,
+                product.is_approved,
+                product.is_featured,
+                product.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            ]
+
+def user_rows(users, chunk_size=EXPORT_CHUNK_SIZE):
+    for page in iter_keyset_pages(users, chunk_size):
+        for user in page:
+            business_name = ''
+            if user.role == 'manufacturer' and hasattr(user, 'manufacturer_profile'):
+                business_name = user.manufacturer_profile.company_name
+            elif user.role == 'shop' and hasattr(user, 'shop_profile'):
+                business_name = user.shop_profile.shop_name
+            yield [
+                user.id,
+                user.username,
+                user.email,
+                user.role,
+                business_name,
+                user.is_active,
+                user.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            ]
+
+# kind -> (filter function, columns, row generator)
+DATASETS = {
+    'orders': (filter_orders, ORDER_COLUMNS, order_rows),
+    'order_items': (filter_orders, ORDER_ITEM_COLUMNS, order_item_rows),
+    'products': (filter_products, PRODUCT_COLUMNS, product_rows),
+    'users': (filter_users, USER_COLUMNS, user_rows),
+}
+
+def export_rows(kind, params):
+    """Return ``(columns, row iterator)`` for an export kind and its list-view filters."""
+    filter_queryset, columns, rows = DATASETS[kind]
+    return columns, rows(filter_queryset(params))
+
+def export_filename(kind, export_format, compress=False):
+    return f'{kind}_export.{export_format}' + ('.gz' if compress else '')
+
+class Echo:
+    """File-like object whose ``write`` returns the value instead of storing it."""
+    def write(self, value):
+        return value
+
+def render_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+def render_jsonl(columns, rows):
+    keys = [key for _, key in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder) + '\n'
+
+def buffered(chunks, size=EXPORT_BUFFER_SIZE):
+    """Encode text chunks and regroup them into blocks of roughly ``size`` bytes."""
+    buffer = []
+    buffered_bytes = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        buffer.append(data)
+        buffered_bytes += len(data)
+        if buffered_bytes >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered_bytes = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def gzipped(blocks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def render(columns, rows, export_format):
+    if export_format == 'jsonl':
+        return render_jsonl(columns, rows)
+    return render_csv(columns, rows)
+
+def export_stream(kind, params, export_format='csv', compress=False):
+    """Return ``(byte chunk iterator, filename, content type)`` for an export."""
+    columns, rows = export_rows(kind, params)
+    stream = buffered(render(columns, rows, export_format))
+    content_type = CONTENT_TYPES[export_format]
+    if compress:
+        stream = gzipped(stream)
+        content_type = 'application/gzip'
+    return stream, export_filename(kind, export_format, compress), content_type
@@ -0,0 +1,88 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database with synthetic data, then check every API/admin endpoint '
+        'against its query-count ceiling and p50/p95 latency budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--manufacturers', type=int, default=10)
+        parser.add_argument('--shops', type=int, default=50)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--images-per-product', type=int, default=2)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic dataset')
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per endpoint')
+        parser.add_argument('--only', action='append', default=[], help='Run only endpoints whose name starts with this prefix')
+        parser.add_argument('--latency-scale', type=float, default=1.0, help='Multiply every latency budget, e.g. 2 on slow CI machines')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test database (and its data) between runs')
+
+    def handle(self, *args, **options):
+        # Imported lazily: they pull in models before the test database exists otherwise
+        from custom_admin.benchmarks import ENDPOINTS, run_benchmarks
+        from custom_admin.synthetic import SyntheticDataGenerator
+        from users.models import User
+
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if not options['only'] or any(endpoint['name'].startswith(prefix) for prefix in options['only'])
+        ]
+        if not endpoints:
+            raise CommandError('No endpoints match --only')
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            counts = {}
+            if not User.objects.filter(email__endswith='@load.sparehub.test').exists():
+                generator = SyntheticDataGenerator(seed=options['seed'], log=lambda message: self.stderr.write(message))
+                counts = generator.generate(
+                    manufacturers=options['manufacturers'],
+                    shops=options['shops'],
+                    products=options['products'],
+                    images_per_product=options['images_per_product'],
+                    orders=options['orders'],
+                )
+            results = run_benchmarks(
+                endpoints,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                latency_scale=options['latency_scale'],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        failed = [result for result in results if not result['passed']]
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': counts,
+            'iterations': options['iterations'],
+            'passed': not failed,
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+        for result in results:
+            line = f"{result['name']}: {result['queries']} queries, p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms"
+            if result['passed']:
+                self.stderr.write(self.style.SUCCESS(line))
+            else:
+                self.stderr.write(self.style.ERROR(f"{line} - {'; '.join(result['failures'])}"))
+        if failed:
+            raise CommandError(f'{len(failed)} endpoint(s) over budget')
@@ -0,0 +1,51 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN on the hot product, order, dashboard and notification queries against the '
+        'current database and report whether their plans use the expected indexes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', default=[], help='Explain only queries whose name starts with this prefix')
+        parser.add_argument('--plans', action='store_true', help='Print each query plan')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--strict', action='store_true', help='Fail when a query does not use any of its expected indexes')
+
+    def handle(self, *args, **options):
+        from custom_admin.query_plans import explain_queries
+
+        results = explain_queries(options['only'])
+        if not results:
+            raise CommandError('No queries match --only')
+
+        failed = [result for result in results if not result['uses_expected_index']]
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'passed': not failed,
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+        for result in results:
+            line = f"{result['name']}: uses {', '.join(result['indexes_used']) or 'no index'}"
+            if result['missing']:
+                line += f" (missing {', '.join(result['missing'])})"
+            if result['uses_expected_index']:
+                self.stderr.write(self.style.SUCCESS(line))
+            else:
+                self.stderr.write(self.style.WARNING(f"{line} - expected {' or '.join(result['expected'])}"))
+            if options['plans']:
+                self.stderr.write(result['plan'])
+        if failed and options['strict']:
+            raise CommandError(f'{len(failed)} quer{"y" if len(failed) == 1 else "ies"} not using the expected indexes')
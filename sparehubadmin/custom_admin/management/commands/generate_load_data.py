@@ -0,0 +1,65 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from custom_admin.synthetic import SyntheticDataGenerator
+
+# Orders drive the size of each preset; the other counts keep realistic ratios
+PRESETS = {
+    'small': {'manufacturers': 50, 'shops': 500, 'products': 20000, 'orders': 10000},
+    'medium': {'manufacturers': 500, 'shops': 10000, 'products': 200000, 'orders': 1000000},
+    'large': {'manufacturers': 2000, 'shops': 100000, 'products': 1000000, 'orders': 10000000},
+}
+
+COUNT_OPTIONS = ('manufacturers', 'shops', 'products', 'orders')
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic dataset (users, addresses, catalog, products, '
+        'variants, images, orders and line items) for load and query-plan testing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=sorted(PRESETS), default='small',
+                            help='small = 10k orders, medium = 1M orders, large = 10M orders')
+        for name in COUNT_OPTIONS:
+            parser.add_argument(f'--{name}', type=int, help=f'Override the preset number of {name}')
+        parser.add_argument('--images-per-product', type=int, default=2)
+        parser.add_argument('--variants-per-product', type=int, default=2)
+        parser.add_argument('--addresses-per-shop', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same dataset')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+        parser.add_argument('--days', type=int, default=365, help='Spread created_at over this many past days')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild the daily sales rollups afterwards')
+
+    def handle(self, *args, **options):
+        counts = dict(PRESETS[options['preset']])
+        for name in COUNT_OPTIONS:
+            if options[name] is not None:
+                counts[name] = options[name]
+        if any(value < 0 for value in counts.values()):
+            raise CommandError('Counts must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        self.stdout.write(
+            f"Generating {options['preset']} dataset (seed {options['seed']}): "
+            + ', '.join(f'{value} {name}' for name, value in counts.items())
+        )
+        started = time.monotonic()
+        generator = SyntheticDataGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            days=options['days'],
+            log=self.stdout.write,
+        )
+        created = generator.generate(
+            images_per_product=options['images_per_product'],
+            variants_per_product=options['variants_per_product'],
+            addresses_per_shop=options['addresses_per_shop'],
+            rebuild_rollups=not options['skip_rollups'],
+            **counts,
+        )
+        elapsed = time.monotonic() - started
+        summary = ', '.join(f'{value} {name}' for name, value in created.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary} in {elapsed:.1f}s'))
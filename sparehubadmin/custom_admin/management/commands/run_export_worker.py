@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.core.management.base import BaseCommand
+
+
+def init_worker():
+    # Worker processes are spawned fresh, so they need their own app registry
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Run queued ExportJob rows in a local process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of export processes')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between queue polls when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument(
+            '--requeue-running', action='store_true',
+            help='Reset jobs left running by a crashed worker back to pending before starting'
+        )
+
+    def handle(self, *args, **options):
+        from django.utils import timezone
+        from custom_admin.export_jobs import claim_next_job, run_export_job
+        from custom_admin.models import ExportJob, ExportJobStatus
+
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+
+        if options['requeue_running']:
+            requeued = ExportJob.objects.filter(status=ExportJobStatus.RUNNING).update(
+                status=ExportJobStatus.PENDING, started_at=None
+            )
+            self.stdout.write(f'Requeued {requeued} running jobs')
+
+        in_flight = {}
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as pool:
+            while True:
+                while len(in_flight) < workers:
+                    job_id = claim_next_job()
+                    if job_id is None:
+                        break
+                    in_flight[pool.submit(run_export_job, job_id)] = job_id
+                    self.stdout.write(f'Started export job {job_id}')
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = in_flight.pop(future)
+                    try:
+                        _, succeeded = future.result()
+                    except Exception as e:
+                        # The worker process died before it could record the failure itself
+                        ExportJob.objects.filter(pk=job_id).update(
+                            status=ExportJobStatus.FAILED,
+                            error=str(e),
+                            finished_at=timezone.now()
+                        )
+                        succeeded = False
+                    if succeeded:
+                        self.stdout.write(self.style.SUCCESS(f'Export job {job_id} completed'))
+                    else:
+                        self.stdout.write(self.style.ERROR(f'Export job {job_id} failed'))
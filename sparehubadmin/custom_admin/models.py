@@ -1,3 +1,46 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+class ExportKind(models.TextChoices):
+    ORDERS = 'orders'
+    ORDER_ITEMS = 'order_items'
+    PRODUCTS = 'products'
+    USERS = 'users'
+
+class ExportFormat(models.TextChoices):
+    CSV = 'csv'
+    JSONL = 'jsonl'
+
+class ExportJobStatus(models.TextChoices):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+class ExportJob(models.Model):
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    kind = models.CharField(max_length=20, choices=ExportKind.choices)
+    export_format = models.CharField(max_length=10, choices=ExportFormat.choices, default=ExportFormat.CSV)
+    compress = models.BooleanField(default=False)
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=ExportJobStatus.choices, default=ExportJobStatus.PENDING)
+    file_path = models.CharField(max_length=255, blank=True)  # Relative to MEDIA_ROOT
+    rows_written = models.BigIntegerField(default=0)
+    bytes_written = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='custom_admin_export_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} export #{self.id} ({self.status})"
+
+    @property
+    def filename(self):
+        return self.file_path.rsplit('/', 1)[-1] if self.file_path else ''
@@ -0,0 +1,119 @@
+"""EXPLAIN checks for the hot list, export and dashboard queries.
+
+``canonical_queries`` rebuilds the querysets behind ``ProductViewSet``,
+``order_list``, ``export_orders``, the dashboard and the notification list
+with the same filter helpers those views use, filled in with ids from the
+current database. ``explain_query`` runs ``EXPLAIN`` on one of them and
+reports which indexes of the tables involved appear in the plan.
+
+Planners pick sequential scans on small tables, so plans are only
+meaningful on a realistically sized database (see ``generate_load_data``).
+"""
+from datetime import timedelta
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from notifications.models import Notification
+from orders.models import Order, OrderItem
+from products.facets import apply_catalog_filters
+from products.models import Product
+from .exports import EXPORT_CHUNK_SIZE, filter_orders
+
+PAGE_SIZE = 20
+
+
+def sample_ids():
+    """Ids the canonical queries are filtered by, taken from existing rows."""
+    product = Product.objects.order_by('id').values('manufacturer_id', 'category_id', 'subcategory_id').first() or {}
+    return {
+        'manufacturer_id': product.get('manufacturer_id') or 0,
+        'category_id': product.get('category_id') or 0,
+        'subcategory_id': product.get('subcategory_id') or 0,
+        'notification_user_id': Notification.objects.values_list('user_id', flat=True).first() or 0,
+    }
+
+def canonical_queries():
+    """``(name, queryset, expected index names)`` for each hot query."""
+    ids = sample_ids()
+    visible = Product.objects.filter(is_active=True, is_approved=True)
+    end_date = timezone.localdate()
+    start_date = end_date - timedelta(days=30)
+    return [
+        ('products.shop_list', visible.order_by('-created_at', '-id')[:PAGE_SIZE],
+         ['product_visible_created_idx']),
+        ('products.shop_list_category',
+         apply_catalog_filters(visible, {
+             'category_id': ids['category_id'], 'subcategory_id': ids['subcategory_id'],
+         }).order_by('-created_at', '-id')[:PAGE_SIZE],
+         ['product_category_idx', 'product_visible_created_idx']),
+        ('products.shop_list_price',
+         apply_catalog_filters(visible, {'min_price': '100', 'max_price': '500'}).order_by('price', 'id')[:PAGE_SIZE],
+         ['product_visible_price_idx']),
+        ('products.low_stock',
+         apply_catalog_filters(visible, {'stock_status': 'low_stock'}).order_by('-created_at', '-id')[:PAGE_SIZE],
+         ['product_low_stock_idx', 'product_visible_created_idx']),
+        ('products.manufacturer_list',
+         Product.objects.filter(manufacturer_id=ids['manufacturer_id']).order_by('-created_at', '-id')[:PAGE_SIZE],
+         ['product_manufacturer_idx']),
+        ('products.featured', visible.filter(is_featured=True).order_by('-created_at')[:10],
+         ['product_featured_idx', 'product_visible_created_idx']),
+        ('orders.order_list', Order.objects.select_related('user', 'payment', 'shipping_address').order_by('-created_at')[:10],
+         ['order_created_idx']),
+        ('orders.export',
+         filter_orders({
+             'status': 'pending', 'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(),
+         }).order_by('-created_at', '-id')[:EXPORT_CHUNK_SIZE],
+         ['order_status_created_idx']),
+        ('dashboard.recent_orders', Order.objects.select_related('user').order_by('-created_at')[:10],
+         ['order_created_idx']),
+        ('dashboard.top_products',
+         OrderItem.objects.filter(
+             order__status__in=['delivered', 'shipped'], product__isnull=False
+         ).values('product_id', 'product__name').annotate(quantity=Sum('quantity')).order_by('-quantity')[:5],
+         ['order_status_created_idx', 'orders_item_product_order_idx']),
+        ('notifications.unread',
+         Notification.objects.filter(user_id=ids['notification_user_id'], is_read=False).order_by('-created_at'),
+         ['notification_user_read_idx']),
+    ]
+
+def table_indexes(tables):
+    """Names of every index, including primary keys and unique constraints, on ``tables``."""
+    names = set()
+    with connection.cursor() as cursor:
+        for table in tables:
+            for name, constraint in connection.introspection.get_constraints(cursor, table).items():
+                if constraint['index'] or constraint['primary_key'] or constraint['unique']:
+                    names.add(name)
+    return names
+
+def explain_query(name, queryset, expected):
+    """EXPLAIN ``queryset`` and report the indexes its plan mentions."""
+    sql, params = queryset.query.sql_with_params()
+    tables = {join.table_name for join in queryset.query.alias_map.values()}
+    plan = queryset.explain()
+    indexes = table_indexes(tables)
+    # Longest first so an index whose name contains a shorter one is not reported twice
+    used = []
+    remaining = plan
+    for index in sorted(indexes, key=len, reverse=True):
+        if index in remaining:
+            used.append(index)
+            remaining = remaining.replace(index, '')
+    return {
+        'name': name,
+        'tables': sorted(tables),
+        'indexes_used': sorted(used),
+        'expected': expected,
+        # Not in the database: migrations not applied, or a partial index on MySQL
+        'missing': [index for index in expected if index not in indexes],
+        'uses_expected_index': any(index in used for index in expected),
+        'sql': sql % tuple(repr(param) for param in params),
+        'plan': plan,
+    }
+
+def explain_queries(only=()):
+    return [
+        explain_query(name, queryset, expected)
+        for name, queryset, expected in canonical_queries()
+        if not only or any(name.startswith(prefix) for prefix in only)
+    ]
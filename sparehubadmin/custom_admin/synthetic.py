@@ -0,0 +1,367 @@
+"""Deterministic synthetic data for benchmarks and load testing.
+
+``SyntheticDataGenerator`` bulk-creates users with their profiles and
+addresses, the catalog, products with variants and images, and orders with
+their line items, in batches. Primary keys are assigned up front from the
+current maximum so related rows can be built without reading ids back,
+which ``bulk_create`` cannot do on MySQL. The same seed always produces the
+same dataset.
+"""
+import io
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from addresses.models import Address, AddressType
+from orders.models import (
+    Order, OrderAddress, OrderItem, OrderPayment, OrderStatus, PaymentMethod, PaymentStatus
+)
+from orders.pricing import CENT, TAX_RATE
+from products.cache import bump_catalog_version
+from products.models import Brand, Category, Product, ProductImage, ProductVariant, Subcategory
+from products.search import build_search_document, get_search_backend
+from users.models import Manufacturer, Shop, User
+
+SYNTHETIC_PASSWORD = 'synthetic-pass'
+VARIANT_PRICE_STEP = Decimal('25.00')
+VARIANT_NAMES = ['Standard', 'Heavy Duty', 'Premium', 'OEM', 'Economy']
+
+CATEGORIES = {
+    'Engine': ['Pistons', 'Gaskets', 'Timing Belts', 'Spark Plugs'],
+    'Brakes': ['Brake Pads', 'Brake Discs', 'Calipers', 'Brake Fluid'],
+    'Suspension': ['Shock Absorbers', 'Coil Springs', 'Control Arms', 'Bushings'],
+    'Electrical': ['Batteries', 'Alternators', 'Starters', 'Headlights'],
+    'Filters': ['Oil Filters', 'Air Filters', 'Fuel Filters', 'Cabin Filters'],
+    'Transmission': ['Clutch Kits', 'Gearbox Mounts', 'CV Joints', 'Flywheels'],
+    'Cooling': ['Radiators', 'Water Pumps', 'Thermostats', 'Hoses'],
+    'Body': ['Mirrors', 'Bumpers', 'Wiper Blades', 'Door Handles'],
+}
+BRANDS = [
+    'Bosch', 'Denso', 'Valeo', 'Mahle', 'Brembo', 'NGK', 'Sachs', 'Lemforder', 'Hella', 'Mann',
+    'Gates', 'SKF', 'Febi', 'Continental', 'Delphi', 'Monroe', 'TRW', 'Exide', 'Minda', 'Lumax',
+]
+MATERIALS = ['Steel', 'Aluminium', 'Cast Iron', 'Rubber', 'Ceramic', 'Copper', 'Plastic', 'Composite']
+COLORS = ['Black', 'Silver', 'Grey', 'Red', 'Blue', '']
+CITIES = [
+    ('Mumbai', 'Maharashtra'), ('Pune', 'Maharashtra'), ('Delhi', 'Delhi'), ('Bengaluru', 'Karnataka'),
+    ('Chennai', 'Tamil Nadu'), ('Hyderabad', 'Telangana'), ('Ahmedabad', 'Gujarat'), ('Kolkata', 'West Bengal'),
+]
+ORDER_STATUSES = [
+    OrderStatus.DELIVERED, OrderStatus.SHIPPED, OrderStatus.PROCESSING, OrderStatus.CONFIRMED,
+    OrderStatus.PENDING, OrderStatus.CANCELLED, OrderStatus.RETURNED,
+]
+ORDER_STATUS_WEIGHTS = [45, 15, 10, 10, 10, 7, 3]
+PAYMENT_STATUS_BY_ORDER_STATUS = {
+    OrderStatus.DELIVERED: PaymentStatus.COMPLETED,
+    OrderStatus.SHIPPED: PaymentStatus.COMPLETED,
+    OrderStatus.PROCESSING: PaymentStatus.PROCESSING,
+    OrderStatus.CONFIRMED: PaymentStatus.PROCESSING,
+    OrderStatus.PENDING: PaymentStatus.PENDING,
+    OrderStatus.CANCELLED: PaymentStatus.FAILED,
+    OrderStatus.RETURNED: PaymentStatus.REFUNDED,
+}
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the ``created_at``/``updated_at`` values set on the instances."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class SyntheticDataGenerator:
+    def __init__(self, seed=0, batch_size=1000, days=365, log=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.days = days
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.password_hash = make_password(SYNTHETIC_PASSWORD)
+        self.counts = {}
+
+    def generate(self, manufacturers=10, shops=50, products=1000, images_per_product=2,
+                 variants_per_product=2, addresses_per_shop=1, orders=5000, rebuild_rollups=True):
+        """Create the dataset and return the number of rows created per model."""
+        with explicit_timestamps(
+            User, Manufacturer, Shop, Address, Product, ProductVariant, ProductImage, Order, OrderItem
+        ):
+            self.create_catalog()
+            self.manufacturer_ids = self.create_users('manufacturer', manufacturers)
+            self.shop_ids = self.create_users('shop', shops, addresses_per_shop)
+            self.create_products(products, images_per_product, variants_per_product)
+            self.create_orders(orders)
+        self.reset_sequences()
+        bump_catalog_version()
+        if rebuild_rollups:
+            self.log('Rebuilding sales rollups')
+            call_command('rebuild_sales_rollups', stdout=io.StringIO())
+        return self.counts
+
+    def next_id(self, model):
+        return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+    def created_at(self):
+        return self.now - timedelta(seconds=self.random.randrange(self.days * 86400))
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(start + self.batch_size, total)
+
+    def save(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model._meta.label] = self.counts.get(model._meta.label, 0) + len(objects)
+
+    def reset_sequences(self):
+        # Explicit primary keys leave PostgreSQL sequences behind; no-op elsewhere
+        models = [User, Manufacturer, Shop, Address, Category, Subcategory, Brand, Product, ProductVariant,
+                  ProductImage, OrderAddress, OrderPayment, Order, OrderItem]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def create_catalog(self):
+        self.subcategories = []
+        for category_name, subcategory_names in CATEGORIES.items():
+            category, _ = Category.objects.get_or_create(
+                name=category_name, defaults={'slug': category_name.lower().replace(' ', '-')}
+            )
+            for subcategory_name in subcategory_names:
+                subcategory, _ = Subcategory.objects.get_or_create(
+                    category=category, name=subcategory_name,
+                    defaults={'slug': subcategory_name.lower().replace(' ', '-')}
+                )
+                self.subcategories.append(subcategory)
+        self.brands = [Brand.objects.get_or_create(name=name)[0] for name in BRANDS]
+
+    def create_users(self, role, total, addresses_per_user=0):
+        """Create ``total`` users with their role profile and addresses; returns the new user ids."""
+        first_id = self.next_id(User)
+        profile_model = Manufacturer if role == 'manufacturer' else Shop
+        for start, end in self.batches(total):
+            users, profiles, addresses = [], [], []
+            for index in range(start, end):
+                user_id = first_id + index
+                city, state = self.random.choice(CITIES)
+                created_at = self.created_at()
+                email = f'{role}{self.seed}-{user_id}@load.sparehub.test'
+                users.append(User(
+                    id=user_id, email=email, username=email, role=role, password=self.password_hash,
+                    created_at=created_at, updated_at=created_at
+                ))
+                profile = {
+                    'user_id': user_id,
+                    'contact_name': f'Contact {user_id}',
+                    'phone': f'9{self.random.randrange(10 ** 9):09d}',
+                    'address': f'{self.random.randrange(1, 500)} Industrial Area',
+                    'city': city,
+                    'state': state,
+                    'country': 'India',
+                    'terms_accepted': True,
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                }
+                if role == 'manufacturer':
+                    profile.update(company_name=f'Manufacturer {user_id} Pvt Ltd', product_categories='Engine,Brakes')
+                else:
+                    profile.update(shop_name=f'Spare Shop {user_id}', business_type='retail')
+                profiles.append(profile_model(**profile))
+                for position in range(addresses_per_user):
+                    address_city, address_state = (city, state) if position == 0 else self.random.choice(CITIES)
+                    addresses.append(Address(
+                        user_id=user_id,
+                        name=f'Contact {user_id}',
+                        phone=profile['phone'],
+                        address_line1=f'{self.random.randrange(1, 500)} Market Road',
+                        city=address_city,
+                        state=address_state,
+                        pincode=f'{self.random.randrange(100000, 999999)}',
+                        country='India',
+                        type=AddressType.WORK if position == 0 else AddressType.OTHER,
+                        is_default=position == 0,
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+            with transaction.atomic():
+                self.save(User, users)
+                self.save(profile_model, profiles)
+                if addresses:
+                    self.save(Address, addresses)
+            self.log(f'Created {end} of {total} {role} users')
+        return list(range(first_id, first_id + total))
+
+    def create_products(self, total, images_per_product, variants_per_product):
+        first_id = self.next_id(Product)
+        first_image_id = self.next_id(ProductImage)
+        first_variant_id = self.next_id(ProductVariant)
+        # Products get contiguous ids, so orders only need compact per-index price arrays
+        self.product_first_id = first_id
+        self.product_prices = array('q')
+        self.product_shipping = array('q')
+        self.variant_first_id = first_variant_id
+        self.variants_per_product = variants_per_product
+        backend = get_search_backend()
+        for start, end in self.batches(total):
+            products, variants, images = [], [], []
+            for index in range(start, end):
+                product_id = first_id + index
+                subcategory = self.random.choice(self.subcategories)
+                brand = self.random.choice(self.brands)
+                price = Decimal(self.random.randrange(99, 250000)) / 100
+                created_at = self.created_at()
+                product = Product(
+                    id=product_id,
+                    name=f'{brand.name} {subcategory.name} {self.random.choice(MATERIALS)} {product_id}',
+                    description=f'{subcategory.name} for passenger and light commercial vehicles.',
+                    sku=f'{brand.name[:3].upper()}-{self.seed}-{product_id:07d}',
+                    brand=brand,
+                    category=subcategory.category,
+                    subcategory=subcategory,
+                    manufacturer_id=self.random.choice(self.manufacturer_ids),
+                    price=price,
+                    discount=Decimal(self.random.choice([0, 0, 0, 5, 10, 15])),
+                    stock_quantity=self.random.choice([0, 5, 25, 100, 500]),
+                    min_order_quantity=1,
+                    weight=Decimal(self.random.randrange(10, 5000)) / 100,
+                    material=self.random.choice(MATERIALS),
+                    color=self.random.choice(COLORS),
+                    shipping_cost=Decimal(self.random.choice([0, 50, 100, 150])),
+                    origin_country='India',
+                    is_active=self.random.random() < 0.95,
+                    is_featured=self.random.random() < 0.02,
+                    is_approved=self.random.random() < 0.9,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                product.search_document = build_search_document(product)
+                products.append(product)
+                self.product_prices.append(int(price * 100))
+                self.product_shipping.append(int(product.shipping_cost * 100))
+                for position in range(variants_per_product):
+                    variants.append(ProductVariant(
+                        id=first_variant_id + index * variants_per_product + position,
+                        product_id=product_id,
+                        name=VARIANT_NAMES[position % len(VARIANT_NAMES)],
+                        sku=f'{product.sku}-V{position}',
+                        price_modifier=VARIANT_PRICE_STEP * position,
+                        stock_quantity=self.random.choice([0, 10, 50]),
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+                for position in range(images_per_product):
+                    images.append(ProductImage(
+                        id=first_image_id + index * images_per_product + position,
+                        product_id=product_id,
+                        image=f'product_images/synthetic/{product.sku}-{position}.jpg',
+                        is_primary=position == 0,
+                        created_at=created_at,
+                    ))
+            with transaction.atomic():
+                self.save(Product, products)
+                self.save(ProductVariant, variants)
+                self.save(ProductImage, images)
+                backend.index_products(products)
+            self.log(f'Created {end} of {total} products')
+
+    def create_orders(self, total):
+        product_count = len(self.product_prices)
+        if not product_count or not self.shop_ids:
+            return
+        first_order_id = self.next_id(Order)
+        first_address_id = self.next_id(OrderAddress)
+        first_payment_id = self.next_id(OrderPayment)
+        first_item_id = self.next_id(OrderItem)
+        item_id = first_item_id
+        for start, end in self.batches(total):
+            addresses, payments, orders, items = [], [], [], []
+            for index in range(start, end):
+                order_id = first_order_id + index
+                status = self.random.choices(ORDER_STATUSES, weights=ORDER_STATUS_WEIGHTS)[0]
+                created_at = self.created_at()
+                shop_id = self.random.choice(self.shop_ids)
+                city, state = self.random.choice(CITIES)
+
+                subtotal = shipping = Decimal('0')
+                order_lines = []
+                for product_index in self.random.sample(
+                    range(product_count), min(product_count, self.random.randint(1, 5))
+                ):
+                    product_id = self.product_first_id + product_index
+                    price = Decimal(self.product_prices[product_index]) / 100
+                    shipping_cost = Decimal(self.product_shipping[product_index]) / 100
+                    variant_id = None
+                    if self.variants_per_product and self.random.random() < 0.3:
+                        position = self.random.randrange(self.variants_per_product)
+                        variant_id = self.variant_first_id + product_index * self.variants_per_product + position
+                        price += VARIANT_PRICE_STEP * position
+                    quantity = self.random.randint(1, 10)
+                    line_total = price * quantity
+                    subtotal += line_total
+                    shipping += shipping_cost * quantity
+                    line = {'product_id': str(product_id), 'quantity': quantity, 'price': float(price)}
+                    if variant_id:
+                        line['variant_id'] = variant_id
+                    order_lines.append(line)
+                    items.append(OrderItem(
+                        id=item_id, order_id=order_id, product_id=product_id, variant_id=variant_id,
+                        quantity=quantity, unit_price=price, line_total=line_total, created_at=created_at
+                    ))
+                    item_id += 1
+                tax = (subtotal * TAX_RATE).quantize(CENT)
+                total_amount = subtotal + tax + shipping
+
+                addresses.append(OrderAddress(
+                    id=first_address_id + index,
+                    name=f'Spare Shop {shop_id}',
+                    phone=f'9{self.random.randrange(10 ** 9):09d}',
+                    address_line1=f'{self.random.randrange(1, 500)} Market Road',
+                    city=city,
+                    state=state,
+                    pincode=f'{self.random.randrange(100000, 999999)}',
+                    country='India',
+                ))
+                payments.append(OrderPayment(
+                    id=first_payment_id + index,
+                    method=self.random.choice(PaymentMethod.values),
+                    status=PAYMENT_STATUS_BY_ORDER_STATUS[status],
+                    amount=total_amount,
+                ))
+                orders.append(Order(
+                    id=order_id,
+                    user_id=shop_id,
+                    shop_name=f'Spare Shop {shop_id}',
+                    items=order_lines,
+                    shipping_address_id=first_address_id + index,
+                    payment_id=first_payment_id + index,
+                    status=status,
+                    subtotal=subtotal,
+                    tax=tax,
+                    shipping_cost=shipping,
+                    total=total_amount,
+                    created_at=created_at,
+                    updated_at=created_at,
+                ))
+            with transaction.atomic():
+                self.save(OrderAddress, addresses)
+                self.save(OrderPayment, payments)
+                self.save(Order, orders)
+                self.save(OrderItem, items)
+            self.log(f'Created {end} of {total} orders')
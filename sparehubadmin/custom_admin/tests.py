@@ -1,3 +1,83 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from users.models import User
+from .models import ExportJob, ExportJobStatus, ExportKind
+from .views import _parse_byte_range
 
-# Create your tests here.
+CONTENT = bytes(range(256)) * 4
+
+
+class ByteRangeParsingTests(TestCase):
+    def test_ranges(self):
+        self.assertEqual(_parse_byte_range('bytes=0-99', 1024), (0, 99))
+        self.assertEqual(_parse_byte_range('bytes=1000-', 1024), (1000, 1023))
+        self.assertEqual(_parse_byte_range('bytes=1000-5000', 1024), (1000, 1023))
+        self.assertEqual(_parse_byte_range('bytes=-24', 1024), (1000, 1023))
+        self.assertEqual(_parse_byte_range('bytes=-5000', 1024), (0, 1023))
+
+    def test_ignored_headers(self):
+        for header in ('bytes=0-1,5-6', 'items=0-1', 'bytes=-', 'bytes=a-b', 'bytes=10-5', 'bytes=1.5-'):
+            self.assertIsNone(_parse_byte_range(header, 1024), header)
+
+    def test_unsatisfiable_ranges(self):
+        for header, size in (('bytes=1024-', 1024), ('bytes=-0', 1024), ('bytes=-10', 0)):
+            with self.assertRaises(ValueError):
+                _parse_byte_range(header, size)
+
+
+class ExportDownloadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin@example.com', 'admin', 'pw', role='admin')
+        self.client.force_login(admin)
+        self.job = ExportJob.objects.create(
+            requested_by=admin, kind=ExportKind.ORDERS, status=ExportJobStatus.COMPLETED,
+            file_path='exports/orders.csv',
+        )
+        os.makedirs(os.path.join(self.media_root, 'exports'), exist_ok=True)
+        with open(os.path.join(self.media_root, self.job.file_path), 'wb') as export_file:
+            export_file.write(CONTENT)
+        self.url = reverse('custom_admin:export_job_download', args=[self.job.id])
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[100:200])
+
+    def test_resume_from_offset(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[1000:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_multiple_ranges_serve_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
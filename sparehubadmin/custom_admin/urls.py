@@ -30,11 +30,18 @@ urlpatterns = [
     
     # Order URLs
     path('orders/', views.order_list, name='orders'),
+    path('orders/bulk-status/', views.order_bulk_update_status, name='order_bulk_update_status'),
     path('orders/<int:pk>/', views.order_detail, name='order_detail'),
     path('orders/<int:pk>/print/', views.order_print, name='order_print'),
     path('orders/<int:pk>/status/', views.order_update_status, name='order_update_status'),
     path('orders/<int:pk>/cancel/', views.order_cancel, name='order_cancel'),
     path('orders/export/', views.export_orders, name='order_export'),
+
+    # Export Job URLs
+    path('exports/', views.export_job_list, name='export_jobs'),
+    path('exports/create/', views.export_job_create, name='export_job_create'),
+    path('exports/<int:pk>/', views.export_job_detail, name='export_job_detail'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
     
     # Analytics URLs
     path('analytics/', views.analytics, name='analytics'),
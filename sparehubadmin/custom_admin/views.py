@@ -1,24 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout as auth_logout
-from django.db.models import Count, Sum, Avg, Q
-from django.db.models.functions import TruncDate
+from django.db.models import Sum, Q
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.db import transaction
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404
+from django.urls import reverse
 from users.models import User, Manufacturer, Shop
 from products.models import Product, Category, Brand, ProductImage, Subcategory
-from orders.models import Order, OrderStatus, OrderStatusUpdate
+from orders.models import Order, OrderEvent, OrderStatus, OrderItem
+from orders.stock import release_order_stock
+from orders.transitions import can_transition, parse_order_ids, transition_orders
 from settings.models import Setting
+from analytics.models import DailySalesRollup, RollupDimension
+from analytics import rollups
+from uploads.tasks import PRODUCT_PDF_FIELDS, next_image_position, queue_product_images, queue_product_pdf, queue_renditions
 from products.forms import ProductForm, CategoryForm, SubcategoryForm, BrandForm
+from .exports import CONTENT_TYPES, EXPORT_FORMATS, EXPORT_MODES, export_stream
+from .export_jobs import job_file_path
+from .models import ExportJob, ExportJobStatus, ExportKind, ExportFormat
 from django.core.paginator import Paginator
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
 from django.utils import timezone
 import json
+import os
 import smtplib
 from email.mime.text import MIMEText
 from datetime import datetime, timedelta
-import csv
 
 # Form for user creation
 class CustomUserCreationForm(UserCreationForm):
@@ -231,49 +240,36 @@ def logout_view(request):
 def dashboard(request):
     total_users = User.objects.count()
     total_products = Product.objects.count()
-    total_orders = Order.objects.count()
-    revenue = Order.objects.filter(
+    overall_sales = DailySalesRollup.objects.filter(dimension=RollupDimension.ALL)
+    total_orders = overall_sales.aggregate(
+        total=Sum('order_count')
+    )['total'] or 0
+    revenue = overall_sales.filter(
         status='delivered'
     ).aggregate(
-        total_revenue=Sum('total')
+        total_revenue=Sum('revenue')
     )['total_revenue'] or 0
     recent_orders = Order.objects.select_related('user').order_by('-created_at')[:10]
-    end_date = timezone.now()
+    end_date = timezone.localdate()
     start_date = end_date - timedelta(days=6)
-    daily_sales = Order.objects.filter(
-        created_at__range=[start_date, end_date]
-    ).annotate(
-        date=TruncDate('created_at')
+    daily_sales = overall_sales.filter(
+        date__range=[start_date, end_date]
     ).values('date').annotate(
-        total=Sum('total')
+        total=Sum('revenue'),
+        orders=Sum('order_count')
+    ).filter(
+        orders__gt=0
     ).order_by('date')
     sales_labels = [d['date'].strftime('%b %d') for d in daily_sales]
     sales_data = [float(d['total']) for d in daily_sales]
-    completed_orders = Order.objects.filter(
-        status__in=['delivered', 'shipped']
-    )
-    product_counts = {}
-    for order in completed_orders:
-        for item in order.items:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity', 1)
-            if product_id:
-                if product_id in product_counts:
-                    product_counts[product_id] += quantity
-                else:
-                    product_counts[product_id] = quantity
-    top_product_ids = sorted(product_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-    top_products = []
-    product_labels = []
-    product_data = []
-    for product_id, count in top_product_ids:
-        try:
-            product = Product.objects.get(id=product_id)
-            top_products.append(product)
-            product_labels.append(product.name)
-            product_data.append(count)
-        except Product.DoesNotExist:
-            continue
+    top_products = OrderItem.objects.filter(
+        order__status__in=['delivered', 'shipped'],
+        product__isnull=False
+    ).values('product_id', 'product__name').annotate(
+        quantity=Sum('quantity')
+    ).order_by('-quantity')[:5]
+    product_labels = [p['product__name'] for p in top_products]
+    product_data = [p['quantity'] for p in top_products]
     context = {
         'total_users': total_users,
         'total_products': total_products,
@@ -291,14 +287,15 @@ def dashboard(request):
 def analytics(request):
     end_date = timezone.now()
     start_date = end_date - timedelta(days=30)
-    sales_data = Order.objects.filter(
-        created_at__range=[start_date, end_date],
+    completed_sales = DailySalesRollup.objects.filter(
+        dimension=RollupDimension.ALL,
         status__in=['delivered', 'shipped']
-    ).annotate(
-        date=TruncDate('created_at')
+    )
+    sales_data = completed_sales.filter(
+        date__range=[start_date.date(), end_date.date()]
     ).values('date').annotate(
-        total=Sum('total'),
-        count=Count('id')
+        total=Sum('revenue'),
+        count=Sum('order_count')
     ).order_by('date')
     date_range = [(start_date + timedelta(days=x)).date() for x in range(31)]
     sales_by_date = {item['date']: item for item in sales_data}
@@ -316,46 +313,28 @@ def analytics(request):
                 'total': 0,
                 'count': 0
             })
-    completed_orders = Order.objects.filter(
-        status__in=['delivered', 'shipped']
-    )
-    product_counts = {}
-    product_revenue = {}
-    for order in completed_orders:
-        for item in order.items:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity', 1)
-            total = item.get('total', 0)
-            if product_id:
-                if product_id in product_counts:
-                    product_counts[product_id] += quantity
-                    product_revenue[product_id] += total
-                else:
-                    product_counts[product_id] = quantity
-                    product_revenue[product_id] = total
-    top_product_ids = sorted(product_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-    product_labels = []
-    product_values = []
-    for product_id, count in top_product_ids:
-        try:
-            product = Product.objects.get(id=product_id)
-            product_labels.append(product.name)
-            product_values.append(count)
-        except Product.DoesNotExist:
-            continue
+    top_products = OrderItem.objects.filter(
+        order__status__in=['delivered', 'shipped'],
+        product__isnull=False
+    ).values('product_id', 'product__name').annotate(
+        quantity=Sum('quantity'),
+        revenue=Sum('line_total')
+    ).order_by('-quantity')[:10]
+    product_labels = [p['product__name'] for p in top_products]
+    product_values = [p['quantity'] for p in top_products]
     sales_labels = [item['date'].strftime('%b %d') for item in filled_sales_data]
     sales_values = [item['total'] for item in filled_sales_data]
-    total_orders = Order.objects.count()
-    total_revenue = Order.objects.filter(
-        status__in=['delivered', 'shipped']
+    total_orders = DailySalesRollup.objects.filter(
+        dimension=RollupDimension.ALL
     ).aggregate(
-        total=Sum('total')
+        total=Sum('order_count')
     )['total'] or 0
-    avg_order_value = Order.objects.filter(
-        status__in=['delivered', 'shipped']
-    ).aggregate(
-        avg=Avg('total')
-    )['avg'] or 0
+    completed_totals = completed_sales.aggregate(
+        total=Sum('revenue'),
+        count=Sum('order_count')
+    )
+    total_revenue = completed_totals['total'] or 0
+    avg_order_value = total_revenue / completed_totals['count'] if completed_totals['count'] else 0
     context = {
         'sales_labels': json.dumps(sales_labels),
         'sales_data': json.dumps(sales_values),
@@ -499,11 +478,30 @@ def product_detail(request, pk):
     }
     return render(request, 'custom_admin/product_detail.html', context)
 
+def _take_form_pdfs(form):
+    """Remove uploaded PDFs from a valid ProductForm so saving it leaves them to the media worker."""
+    pdfs = {}
+    for field in PRODUCT_PDF_FIELDS:
+        uploaded = form.cleaned_data.get(field)
+        if uploaded and hasattr(uploaded, 'content_type'):
+            pdfs[field] = uploaded
+            # FileField.save_form_data keeps the current file for None
+            form.cleaned_data[field] = None
+    return pdfs
+
+def _queue_product_media(request, product, images, pdfs, first_is_primary):
+    tasks = queue_product_images(product, images, requested_by=request.user, first_is_primary=first_is_primary)
+    for field, pdf in pdfs.items():
+        tasks.append(queue_product_pdf(product, field, pdf, requested_by=request.user))
+    if tasks:
+        messages.info(request, f'{len(tasks)} file(s) are being processed and will appear shortly.')
+
 @login_required
 def product_create(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)
         if form.is_valid():
+            pdfs = _take_form_pdfs(form)
             product = form.save()
             images = request.FILES.getlist('images')
             for image in images:
@@ -523,11 +521,7 @@ def product_create(request):
                         'brands': Brand.objects.filter(is_active=True),
                         'manufacturers': User.objects.filter(role='manufacturer', is_active=True),
                     })
-                ProductImage.objects.create(
-                    product=product,
-                    image=image,
-                    is_primary=not product.images.exists()
-                )
+            _queue_product_media(request, product, images, pdfs, first_is_primary=True)
             messages.success(request, f'Product {product.name} created successfully.')
             return redirect('custom_admin:products')
         else:
@@ -551,6 +545,7 @@ def product_edit(request, pk):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
+            pdfs = _take_form_pdfs(form)
             product = form.save()
             images = request.FILES.getlist('images')
             for image in images:
@@ -572,11 +567,7 @@ def product_edit(request, pk):
                         'brands': Brand.objects.filter(is_active=True),
                         'manufacturers': User.objects.filter(role='manufacturer', is_active=True),
                     })
-                ProductImage.objects.create(
-                    product=product,
-                    image=image,
-                    is_primary=not product.images.exists()
-                )
+            _queue_product_media(request, product, images, pdfs, first_is_primary=not product.images.exists())
             messages.success(request, f'Product {product.name} updated successfully.')
             return redirect('custom_admin:product_detail', pk=pk)
         else:
@@ -636,8 +627,10 @@ def product_image_upload(request, pk):
         image_obj = ProductImage.objects.create(
             product=product,
             image=image,
-            is_primary=not product.images.exists()
+            is_primary=not product.images.exists(),
+            position=next_image_position(product)
         )
+        queue_renditions(image_obj, requested_by=request.user)
         return JsonResponse({
             'success': True,
             'image_id': image_obj.id,
@@ -941,7 +934,7 @@ def order_detail(request, pk):
     order = get_object_or_404(
         Order.objects.select_related(
             'user', 'payment', 'shipping_address', 'billing_address'
-        ).prefetch_related('status_updates'),
+        ).prefetch_related('events'),
         pk=pk
     )
     context = {
@@ -952,17 +945,25 @@ def order_detail(request, pk):
 @login_required
 def order_update_status(request, pk):
     if request.method == 'POST':
-        order = get_object_or_404(Order, pk=pk)
         data = json.loads(request.body)
         status = data.get('status')
         if status in OrderStatus.values:
-            status_update = OrderStatusUpdate.objects.create(
-                status=status,
-                comment=f"Status updated to {status} by {request.user.username}"
-            )
-            order.status = status
-            order.status_updates.add(status_update)
-            order.save()
+            with transaction.atomic():
+                order = get_object_or_404(Order.objects.select_for_update(), pk=pk)
+                old_status = order.status
+                if status != old_status and not can_transition(old_status, status):
+                    return JsonResponse(
+                        {'success': False, 'error': f'Cannot move a {old_status} order to {status}'}, status=400
+                    )
+                OrderEvent.objects.record(
+                    order, status, old_status=old_status, actor=request.user,
+                    comment=f"Status updated to {status} by {request.user.username}"
+                )
+                if status == OrderStatus.CANCELLED:
+                    release_order_stock(order)
+                order.status = status
+                order.save()
+                rollups.record_status_change(order, old_status)
             messages.success(request, f'Order status updated to {status}')
             return JsonResponse({'success': True})
         return JsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
@@ -973,13 +974,15 @@ def order_cancel(request, pk):
     if request.method == 'POST':
         order = get_object_or_404(Order, pk=pk)
         if order.status == 'pending':
-            status_update = OrderStatusUpdate.objects.create(
-                status='cancelled',
-                comment=f"Order cancelled by {request.user.username}"
-            )
-            order.status = 'cancelled'
-            order.status_updates.add(status_update)
-            order.save()
+            with transaction.atomic():
+                OrderEvent.objects.record(
+                    order, 'cancelled', old_status='pending', actor=request.user,
+                    comment=f"Order cancelled by {request.user.username}"
+                )
+                release_order_stock(order)
+                order.status = 'cancelled'
+                order.save()
+                rollups.record_status_change(order, 'pending')
             messages.success(request, 'Order cancelled successfully')
             return JsonResponse({'success': True})
         return JsonResponse(
@@ -988,6 +991,25 @@ def order_cancel(request, pk):
         )
     return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
 
+@login_required
+def order_bulk_update_status(request):
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    try:
+        data = json.loads(request.body)
+        order_ids = parse_order_ids(data.get('order_ids'))
+        status = data.get('status')
+        if status not in OrderStatus.values:
+            return JsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
+        report = transition_orders(order_ids, status, actor=request.user, comment=data.get('comment'))
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    if report['updated']:
+        messages.success(request, f"{report['updated']} order{'s' if report['updated'] != 1 else ''} updated to {status}")
+    return JsonResponse({'success': True, **report})
+
 @login_required
 def order_print(request, pk):
     order = get_object_or_404(
@@ -1011,58 +1033,137 @@ def order_print(request, pk):
 
 @login_required
 def export_orders(request):
-    search_query = request.GET.get('search', '')
-    status_filter = request.GET.get('status', '')
-    payment_status_filter = request.GET.get('payment_status', '')
-    start_date = request.GET.get('start_date', '')
-    end_date = request.GET.get('end_date', '')
-    orders = Order.objects.select_related('user', 'payment').order_by('-created_at')
-    if search_query:
-        orders = orders.filter(
-            Q(id__icontains=search_query) |
-            Q(user__username__icontains=search_query) |
-            Q(shop_name__icontains=search_query)
+    export_format = request.GET.get('format', 'csv')
+    mode = request.GET.get('mode', 'orders')
+    if export_format not in EXPORT_FORMATS or mode not in EXPORT_MODES:
+        return HttpResponse('Invalid export format or mode', status=400)
+    compress = request.GET.get('gzip', '').lower() in ('1', 'true', 'yes')
+    stream, filename, content_type = export_stream(
+        'order_items' if mode == 'items' else 'orders',
+        request.GET, export_format=export_format, compress=compress
+    )
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# Export Job Views
+@login_required
+def export_job_list(request):
+    jobs = ExportJob.objects.select_related('requested_by').order_by('-created_at')
+    paginator = Paginator(jobs, 20)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    context = {
+        'jobs': page_obj,
+        'kinds': ExportKind.choices,
+        'formats': ExportFormat.choices,
+    }
+    return render(request, 'custom_admin/export_job_list.html', context)
+
+@login_required
+def export_job_create(request):
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    kind = request.POST.get('kind')
+    export_format = request.POST.get('format', ExportFormat.CSV)
+    if kind not in ExportKind.values or export_format not in ExportFormat.values:
+        return JsonResponse({'success': False, 'error': 'Invalid export kind or format'}, status=400)
+    filters = {
+        key: value for key, value in request.POST.items()
+        if key not in ('csrfmiddlewaretoken', 'kind', 'format', 'gzip') and value
+    }
+    job = ExportJob.objects.create(
+        requested_by=request.user,
+        kind=kind,
+        export_format=export_format,
+        compress=request.POST.get('gzip', '').lower() in ('1', 'true', 'on', 'yes'),
+        filters=filters
+    )
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'success': True, 'job_id': job.id})
+    messages.success(request, f'Export #{job.id} queued. It will be available here once the worker finishes.')
+    return redirect('custom_admin:export_jobs')
+
+@login_required
+def export_job_detail(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk)
+    return JsonResponse({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'rows_written': job.rows_written,
+        'bytes_written': job.bytes_written,
+        'error': job.error,
+        'download_url': (
+            reverse('custom_admin:export_job_download', args=[job.id])
+            if job.status == ExportJobStatus.COMPLETED else None
+        ),
+    })
+
+def _parse_byte_range(header, size):
+    """Parse a single-range ``Range: bytes=`` header into inclusive (start, end).
+
+    Returns None for a header to ignore (malformed or multiple ranges), so the
+    whole file is served, and raises ``ValueError`` for a valid range that
+    lies beyond the end of the file.
+    """
+    if not header.startswith('bytes=') or ',' in header:
+        return None
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    if not (start or end) or any(part and not part.isdigit() for part in (start, end)):
+        return None
+    if start:
+        start = int(start)
+        if end and int(end) < start:
+            return None
+        if start >= size:
+            raise ValueError(f'Range starts beyond {size} bytes')
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        # Suffix range: the last N bytes
+        if int(end) == 0 or size == 0:
+            raise ValueError('Empty suffix range')
+        start = max(size - int(end), 0)
+        end = size - 1
+    return start, end
+
+def _read_file_range(path, start, length, block_size=64 * 1024):
+    with open(path, 'rb') as export_file:
+        export_file.seek(start)
+        while length > 0:
+            data = export_file.read(min(block_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+@login_required
+def export_job_download(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, status=ExportJobStatus.COMPLETED)
+    path = job_file_path(job)
+    if not os.path.exists(path):
+        raise Http404('Export file no longer exists')
+    size = os.path.getsize(path)
+    content_type = 'application/gzip' if job.compress else CONTENT_TYPES[job.export_format]
+    range_header = request.headers.get('Range')
+    try:
+        byte_range = _parse_byte_range(range_header, size) if range_header else None
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_file_range(path, start, end - start + 1), status=206, content_type=content_type
         )
-    if status_filter:
-        orders = orders.filter(status=status_filter)
-    if payment_status_filter:
-        orders = orders.filter(payment__status=payment_status_filter)
-    if start_date:
-        orders = orders.filter(created_at__gte=start_date)
-    if end_date:
-        orders = orders.filter(created_at__lte=end_date)
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="orders_export.csv"'
-    writer = csv.writer(response)
-    writer.writerow([
-        'Order ID',
-        'Customer',
-        'Shop Name',
-        'Status',
-        'Payment Status',
-        'Payment Method',
-        'Total',
-        'Subtotal',
-        'Tax',
-        'Shipping Cost',
-        'Created At',
-        'Item Count'
-    ])
-    for order in orders:
-        writer.writerow([
-            order.id,
-            order.user.username,
-            order.shop_name or '',
-            order.status.title(),
-            order.payment.status.title(),
-            order.payment.method.upper(),
-            order.total,
-            order.subtotal,
-            order.tax,
-            order.shipping_cost,
-            order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            len(order.items)
-        ])
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'attachment; filename="{job.filename}"'
     return response
 
 # Settings Views
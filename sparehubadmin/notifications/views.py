@@ -1,7 +1,9 @@
 from rest_framework import viewsets
+from sparehubadmin.pagination import OptInKeysetPagination
 from .models import Notification
 from .serializers import NotificationSerializer
 
 class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
+    pagination_class = OptInKeysetPagination
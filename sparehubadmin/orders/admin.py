@@ -1,5 +1,20 @@
 from django.contrib import admin
-from .models import Order, OrderAddress, OrderPayment, OrderStatusUpdate
+from .models import Order, OrderAddress, OrderPayment, OrderEvent, OrderItem
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ('product', 'variant')
+
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    extra = 0
+    can_delete = False
+    fields = ('timestamp', 'old_status', 'status', 'actor', 'comment')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -7,6 +22,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')
     search_fields = ('id', 'shop_name', 'user__username')
     ordering = ('-created_at',)
+    inlines = [OrderItemInline, OrderEventInline]
 
 @admin.register(OrderAddress)
 class OrderAddressAdmin(admin.ModelAdmin):
@@ -19,7 +35,8 @@ class OrderPaymentAdmin(admin.ModelAdmin):
     list_filter = ('method', 'status')
     search_fields = ('transaction_id',)
 
-@admin.register(OrderStatusUpdate)
-class OrderStatusUpdateAdmin(admin.ModelAdmin):
-    list_display = ('status', 'timestamp')
+@admin.register(OrderEvent)
+class OrderEventAdmin(admin.ModelAdmin):
+    list_display = ('order', 'old_status', 'status', 'actor', 'timestamp')
     list_filter = ('status',)
+    raw_id_fields = ('order', 'actor')
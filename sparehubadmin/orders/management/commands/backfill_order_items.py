@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Populate the OrderItem table from the JSON items stored on existing orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of orders migrated per transaction')
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild items for orders that already have OrderItem rows')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        orders = Order.objects.only('id', 'items').order_by('id')
+        if not options['rebuild']:
+            orders = orders.filter(order_items__isnull=True)
+
+        last_id = 0
+        migrated_orders = 0
+        created_items = 0
+        while True:
+            batch = list(orders.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                created_items += len(OrderItem.objects.sync_from_json(batch))
+            migrated_orders += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f'Migrated {migrated_orders} orders (last id {last_id})')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {created_items} order items from {migrated_orders} orders'
+        ))
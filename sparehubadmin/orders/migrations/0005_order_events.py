@@ -0,0 +1,91 @@
+# Generated by Django 5.1.4 on 2026-10-17 12:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def copy_status_updates(apps, schema_editor):
+    """Fold the status_updates M2M into OrderEvent rows, deriving old_status per order."""
+    Order = apps.get_model('orders', 'Order')
+    OrderEvent = apps.get_model('orders', 'OrderEvent')
+    rows = Order.status_updates.through.objects.order_by(
+        'order_id', 'orderstatusupdate__timestamp', 'orderstatusupdate_id'
+    ).values_list(
+        'order_id', 'orderstatusupdate_id', 'orderstatusupdate__status',
+        'orderstatusupdate__comment', 'orderstatusupdate__timestamp',
+    )
+    events = []
+    previous_order_id = previous_status = None
+    for order_id, update_id, status, comment, timestamp in rows.iterator(chunk_size=BATCH_SIZE):
+        if order_id != previous_order_id:
+            previous_order_id, previous_status = order_id, None
+        events.append(OrderEvent(
+            order_id=order_id, old_status=previous_status, status=status, comment=comment,
+            payload={'status_update_id': update_id}, timestamp=timestamp,
+        ))
+        previous_status = status
+        if len(events) >= BATCH_SIZE:
+            OrderEvent.objects.bulk_create(events)
+            events = []
+    OrderEvent.objects.bulk_create(events)
+
+
+def copy_events_back(apps, schema_editor):
+    # Row by row: bulk_create does not return primary keys on MySQL
+    Order = apps.get_model('orders', 'Order')
+    OrderEvent = apps.get_model('orders', 'OrderEvent')
+    OrderStatusUpdate = apps.get_model('orders', 'OrderStatusUpdate')
+    Through = Order.status_updates.through
+    events = OrderEvent.objects.order_by('id').values_list('order_id', 'status', 'comment', 'timestamp')
+    for order_id, status, comment, timestamp in events.iterator(chunk_size=BATCH_SIZE):
+        update = OrderStatusUpdate.objects.create(status=status, comment=comment)
+        # timestamp is auto_now_add, so restore it afterwards
+        OrderStatusUpdate.objects.filter(pk=update.pk).update(timestamp=timestamp)
+        Through.objects.create(order_id=order_id, orderstatusupdate_id=update.pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_stock_reserved'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('returned', 'Returned')], max_length=20, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('returned', 'Returned')], max_length=20)),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='orders.order')),
+            ],
+            options={
+                'ordering': ['timestamp', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(fields=['order', 'timestamp'], name='orders_event_order_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(fields=['timestamp'], name='orders_event_timestamp_idx'),
+        ),
+        migrations.RunPython(copy_status_updates, copy_events_back),
+        migrations.RemoveField(
+            model_name='order',
+            name='status_updates',
+        ),
+        migrations.DeleteModel(
+            name='OrderStatusUpdate',
+        ),
+    ]
@@ -1,6 +1,9 @@
+from decimal import Decimal
 from django.db import models
 from django.db.models import JSONField
+from django.utils import timezone
 from users.models import User
+from products.models import Product, ProductVariant
 
 class OrderStatus(models.TextChoices):
     PENDING = 'pending'
@@ -50,14 +53,6 @@ class OrderPayment(models.Model):
     def __str__(self):
         return f"{self.method} - {self.status} - {self.amount}"
 
-class OrderStatusUpdate(models.Model):
-    status = models.CharField(max_length=20, choices=OrderStatus.choices)
-    comment = models.TextField(blank=True, null=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return f"{self.status} at {self.timestamp}"
-
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     shop_name = models.CharField(max_length=255)
@@ -72,8 +67,108 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    status_updates = models.ManyToManyField(OrderStatusUpdate, blank=True)
     metadata = JSONField(blank=True, null=True)
+    # True while the order's items are deducted from product/variant stock; see orders.stock
+    stock_reserved = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # Newest-first lists and keyset pages order by (-created_at, -id)
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} by {self.user}"
+
+class OrderEventManager(models.Manager):
+    def record(self, order, status, old_status=None, actor=None, comment=None, payload=None):
+        """Append one event to ``order``'s history."""
+        return self.create(
+            order=order, status=status, old_status=old_status, actor=actor, comment=comment, payload=payload
+        )
+
+class OrderEvent(models.Model):
+    """Append-only order history: one row per status change or other notable event."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events')
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    old_status = models.CharField(max_length=20, choices=OrderStatus.choices, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    comment = models.TextField(blank=True, null=True)
+    payload = JSONField(blank=True, null=True)
+    # Not auto_now_add so migrated history keeps its original times
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    objects = OrderEventManager()
+
+    class Meta:
+        ordering = ['timestamp', 'id']
+        indexes = [
+            models.Index(fields=['order', 'timestamp'], name='orders_event_order_ts_idx'),
+            models.Index(fields=['timestamp'], name='orders_event_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.status} at {self.timestamp} (Order {self.order_id})"
+
+class OrderItemManager(models.Manager):
+    def build_from_json(self, orders):
+        """Build unsaved OrderItem rows from the JSON ``items`` of the given orders.
+
+        Product and variant ids are resolved in one query each so that line items
+        pointing at deleted products are kept with a null foreign key.
+        """
+        product_ids = set()
+        variant_ids = set()
+        for order in orders:
+            for item in order.items or []:
+                if str(item.get('product_id', '')).isdigit():
+                    product_ids.add(int(item['product_id']))
+                if str(item.get('variant_id') or '').isdigit():
+                    variant_ids.add(int(item['variant_id']))
+
+        existing_products = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+        existing_variants = set(ProductVariant.objects.filter(pk__in=variant_ids).values_list('pk', flat=True))
+
+        order_items = []
+        for order in orders:
+            for item in order.items or []:
+                product_id = item.get('product_id')
+                product_id = int(product_id) if str(product_id).isdigit() else None
+                variant_id = item.get('variant_id')
+                variant_id = int(variant_id) if str(variant_id or '').isdigit() else None
+                quantity = int(item.get('quantity') or 1)
+                unit_price = Decimal(str(item.get('price') or 0)).quantize(Decimal('0.01'))
+                order_items.append(self.model(
+                    order=order,
+                    product_id=product_id if product_id in existing_products else None,
+                    variant_id=variant_id if variant_id in existing_variants else None,
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    line_total=unit_price * quantity,
+                ))
+        return order_items
+
+    def sync_from_json(self, orders):
+        """Replace the OrderItem rows of ``orders`` with their current JSON items."""
+        self.filter(order__in=orders).delete()
+        return self.bulk_create(self.build_from_json(orders))
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items')
+    variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items')
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = OrderItemManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'order'], name='orders_item_product_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} (Order {self.order_id})"
@@ -0,0 +1,132 @@
+"""Server-side order pricing.
+
+Clients send product and variant ids with quantities; prices, discounts,
+shipping and tax always come from the database. Every referenced product
+and requested variant is loaded in one query (products ``LEFT JOIN`` the
+requested variants through a ``FilteredRelation``), so a cart of any size
+costs a single round trip.
+
+* unit price  = (product price + variant price_modifier) less the product discount
+* shipping    = product shipping_cost x quantity, as the mobile app shows it
+* tax         = ``ORDER_TAX_RATE`` (18% GST by default) of the subtotal
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.db.models import FilteredRelation, Q
+from products.models import Product
+
+CENT = Decimal('0.01')
+TAX_RATE = Decimal(str(getattr(settings, 'ORDER_TAX_RATE', '0.18')))
+
+
+class PricingError(Exception):
+    """Raised with per-line messages when items cannot be priced."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def parse_id(value):
+    return int(value) if str(value or '').isdigit() else None
+
+def load_prices(product_ids, variant_ids):
+    """Return ``(products, variants)`` dicts keyed by id from a single query."""
+    rows = Product.objects.filter(id__in=product_ids).annotate(
+        requested_variant=FilteredRelation('variants', condition=Q(variants__id__in=variant_ids or [0]))
+    ).values(
+        'id', 'name', 'price', 'discount', 'shipping_cost', 'is_active', 'is_approved',
+        'requested_variant__id', 'requested_variant__name', 'requested_variant__price_modifier',
+    )
+    products, variants = {}, {}
+    for row in rows:
+        products[row['id']] = row
+        if row['requested_variant__id'] is not None:
+            variants[row['requested_variant__id']] = {
+                'product_id': row['id'],
+                'name': row['requested_variant__name'],
+                'price_modifier': row['requested_variant__price_modifier'],
+            }
+    return products, variants
+
+def price_items(items):
+    """Price JSON-style order ``items`` and return the canonical quote.
+
+    Raises ``PricingError`` listing every line that cannot be priced.
+    """
+    lines = []
+    errors = []
+    for index, item in enumerate(items or []):
+        product_id = parse_id(item.get('product_id'))
+        variant_id = parse_id(item.get('variant_id'))
+        quantity = int(item.get('quantity') or 0)
+        if product_id is None:
+            errors.append(f"Item {index + 1}: invalid product id {item.get('product_id')!r}.")
+        elif quantity < 1:
+            errors.append(f"Item {index + 1}: quantity must be at least 1.")
+        else:
+            lines.append((index, product_id, variant_id, quantity))
+    if not lines and not errors:
+        errors.append('An order needs at least one item.')
+
+    products, variants = load_prices(
+        {product_id for _, product_id, _, _ in lines},
+        {variant_id for _, _, variant_id, _ in lines if variant_id is not None},
+    )
+    priced = []
+    subtotal = shipping_cost = Decimal('0')
+    for index, product_id, variant_id, quantity in lines:
+        product = products.get(product_id)
+        if product is None or not product['is_active'] or not product['is_approved']:
+            errors.append(f"Item {index + 1}: product {product_id} is not available.")
+            continue
+        base_price = product['price']
+        if variant_id is not None:
+            variant = variants.get(variant_id)
+            if variant is None:
+                errors.append(f"Item {index + 1}: variant {variant_id} does not belong to product {product_id}.")
+                continue
+            base_price += variant['price_modifier']
+        unit_price = money(base_price * (1 - product['discount'] / 100))
+        line_total = unit_price * quantity
+        line_shipping = product['shipping_cost'] * quantity
+        subtotal += line_total
+        shipping_cost += line_shipping
+        line = {
+            'product_id': str(product_id),
+            'name': product['name'],
+            'quantity': quantity,
+            'list_price': base_price,
+            'discount': product['discount'],
+            'price': unit_price,
+            'line_total': line_total,
+            'shipping_cost': line_shipping,
+        }
+        if variant_id is not None:
+            line['variant_id'] = variant_id
+        priced.append(line)
+
+    if errors:
+        raise PricingError(errors)
+    tax = money(subtotal * TAX_RATE)
+    return {
+        'items': priced,
+        'subtotal': subtotal,
+        'tax': tax,
+        'tax_rate': TAX_RATE,
+        'shipping_cost': shipping_cost,
+        'total': subtotal + tax + shipping_cost,
+    }
+
+def order_items_json(quote):
+    """The ``Order.items`` JSON for a quote, in the shape clients already send."""
+    items = []
+    for line in quote['items']:
+        item = {'product_id': line['product_id'], 'quantity': line['quantity'], 'price': float(line['price'])}
+        if 'variant_id' in line:
+            item['variant_id'] = line['variant_id']
+        items.append(item)
+    return items
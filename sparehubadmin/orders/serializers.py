@@ -1,6 +1,11 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Order, OrderAddress, OrderPayment, OrderStatusUpdate
+from .models import Order, OrderAddress, OrderPayment, OrderStatus, OrderEvent, OrderItem
+from .pricing import PricingError, order_items_json, price_items
+from .stock import StockError, release_order_stock, reserve_order_stock, reserve_stock
+from .transitions import can_transition
 from decimal import Decimal
+from analytics import rollups
 
 class OrderAddressSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,21 +17,26 @@ class OrderPaymentSerializer(serializers.ModelSerializer):
         model = OrderPayment
         fields = '__all__'
 
-class OrderStatusUpdateSerializer(serializers.ModelSerializer):
+class OrderEventSerializer(serializers.ModelSerializer):
     class Meta:
-        model = OrderStatusUpdate
-        fields = '__all__'
+        model = OrderEvent
+        fields = ['id', 'status', 'old_status', 'comment', 'payload', 'actor', 'timestamp']
+        # Clients may only add a comment; the history itself is written by the server
+        read_only_fields = ['id', 'status', 'old_status', 'payload', 'actor', 'timestamp']
 
 class OrderItemSerializer(serializers.Serializer):  # NEW: Serializer for items
     product_id = serializers.CharField()
+    variant_id = serializers.IntegerField(required=False, allow_null=True)
     quantity = serializers.IntegerField()
-    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    # Accepted from older clients but replaced by the server-side price
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
 
     def to_internal_value(self, data):
         # Convert incoming data to internal format
         ret = super().to_internal_value(data)
         # Ensure price is a Decimal
-        ret['price'] = Decimal(str(data['price']))
+        if data.get('price') is not None:
+            ret['price'] = Decimal(str(data['price']))
         return ret
 
     def to_representation(self, instance):
@@ -35,11 +45,27 @@ class OrderItemSerializer(serializers.Serializer):  # NEW: Serializer for items
         ret['price'] = float(ret['price'])
         return ret
 
+PRICED_FIELDS = ('subtotal', 'tax', 'shipping_cost', 'total')
+
+def price_order(items_data):
+    # Server-side prices; a line that cannot be priced fails validation
+    try:
+        return price_items(items_data)
+    except PricingError as e:
+        raise serializers.ValidationError({'items': e.errors})
+
+def apply_quote(validated_data, quote):
+    # Client-sent prices and totals are replaced by the quote's
+    for field in PRICED_FIELDS:
+        validated_data[field] = quote[field]
+    return order_items_json(quote)
+
 class OrderSerializer(serializers.ModelSerializer):
     shipping_address = OrderAddressSerializer()
     billing_address = OrderAddressSerializer(required=False, allow_null=True)
     payment = OrderPaymentSerializer()
-    status_updates = OrderStatusUpdateSerializer(many=True, required=False)
+    # The order's event log; a comment is accepted on create, later changes append events
+    status_updates = OrderEventSerializer(source='events', many=True, required=False)
     items = OrderItemSerializer(many=True)  # NEW: Use OrderItemSerializer
 
     class Meta:
@@ -50,13 +76,36 @@ class OrderSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'status_updates', 'metadata'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        # Computed by orders.pricing; values sent by clients are ignored
+        extra_kwargs = {field: {'required': False} for field in PRICED_FIELDS}
 
+    def validate_status(self, value):
+        # Updates follow the same state machine as the bulk transitions
+        if self.instance is not None and value != self.instance.status and not can_transition(self.instance.status, value):
+            raise serializers.ValidationError(f'Cannot move a {self.instance.status} order to {value}.')
+        return value
+
+    def request_user(self):
+        request = self.context.get('request')
+        return request.user if request and request.user.is_authenticated else None
+
+    @transaction.atomic
     def create(self, validated_data):
         shipping_address_data = validated_data.pop('shipping_address')
         billing_address_data = validated_data.pop('billing_address', None)
         payment_data = validated_data.pop('payment')
-        status_updates_data = validated_data.pop('status_updates', [])
+        events_data = validated_data.pop('events', [])
         items_data = validated_data.pop('items')  # Extract items
+        items = apply_quote(validated_data, price_order(items_data))
+        payment_data['amount'] = validated_data['total']
+
+        # Reserve first so a rejected order fails before anything is written
+        stock_reserved = validated_data.get('status') != OrderStatus.CANCELLED
+        if stock_reserved:
+            try:
+                reserve_stock(items)
+            except StockError as e:
+                raise serializers.ValidationError({'items': e.errors})
 
         # Create nested objects
         shipping_address = OrderAddress.objects.create(**shipping_address_data)
@@ -65,36 +114,34 @@ class OrderSerializer(serializers.ModelSerializer):
             billing_address = OrderAddress.objects.create(**billing_address_data)
         payment = OrderPayment.objects.create(**payment_data)
 
-        # Convert items_data to JSON-serializable format
-        json_items = [
-            {
-                'product_id': item['product_id'],
-                'quantity': item['quantity'],
-                'price': float(item['price'])  # Convert Decimal to float
-            }
-            for item in items_data
-        ]
-
         order = Order.objects.create(
             shipping_address=shipping_address,
             billing_address=billing_address,
             payment=payment,
-            items=json_items,  # Store items as JSON
+            items=items,  # Store items as JSON
+            stock_reserved=stock_reserved,
             **validated_data
         )
+        OrderItem.objects.sync_from_json([order])
+        rollups.record_order_created(order)
 
-        for status_update_data in status_updates_data:
-            status_update = OrderStatusUpdate.objects.create(**status_update_data)
-            order.status_updates.add(status_update)
+        # One event for the placed order, whatever history the client sent; only its comment is kept
+        comment = next((event_data['comment'] for event_data in events_data if event_data.get('comment')), 'Order placed')
+        OrderEvent.objects.create(order=order, status=order.status, comment=comment, actor=self.request_user())
 
         return order
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         shipping_address_data = validated_data.pop('shipping_address', None)
         billing_address_data = validated_data.pop('billing_address', None)
         payment_data = validated_data.pop('payment', None)
-        status_updates_data = validated_data.pop('status_updates', None)
+        validated_data.pop('events', None)  # history is append-only
         items_data = validated_data.pop('items', None)
+        quote = price_order(items_data) if items_data is not None else None
+        for field in PRICED_FIELDS:
+            validated_data.pop(field, None)
+        rollup_before = rollups.snapshot(instance)
 
         if shipping_address_data:
             for attr, value in shipping_address_data.items():
@@ -109,30 +156,38 @@ class OrderSerializer(serializers.ModelSerializer):
             else:
                 instance.billing_address = OrderAddress.objects.create(**billing_address_data)
 
+        if quote is not None:
+            payment_data = {**(payment_data or {}), 'amount': quote['total']}
+
         if payment_data:
             for attr, value in payment_data.items():
                 setattr(instance.payment, attr, value)
             instance.payment.save()
 
-        if status_updates_data is not None:
-            instance.status_updates.clear()
-            for status_update_data in status_updates_data:
-                status_update = OrderStatusUpdate.objects.create(**status_update_data)
-                instance.status_updates.add(status_update)
+        # Give back the old reservation when the items change or the order is cancelled,
+        # then reserve the new items for orders that held stock
+        held_stock = instance.stock_reserved
+        cancelled = validated_data.get('status', instance.status) == OrderStatus.CANCELLED
+        if held_stock and (items_data is not None or cancelled):
+            release_order_stock(instance)
 
-        if items_data is not None:
-            # Convert items_data to JSON-serializable format
-            instance.items = [
-                {
-                    'product_id': item['product_id'],
-                    'quantity': item['quantity'],
-                    'price': float(item['price'])  # Convert Decimal to float
-                }
-                for item in items_data
-            ]
+        if quote is not None:
+            instance.items = apply_quote(validated_data, quote)
 
+        old_status = instance.status
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        if instance.status != old_status:
+            OrderEvent.objects.record(instance, instance.status, old_status=old_status, actor=self.request_user())
+        if held_stock and not cancelled and not instance.stock_reserved:
+            try:
+                reserve_order_stock(instance)
+            except StockError as e:
+                raise serializers.ValidationError({'items': e.errors})
         instance.save()
 
-        return instance
\ No newline at end of file
+        if items_data is not None:
+            OrderItem.objects.sync_from_json([instance])
+        rollups.record_order_changed(rollup_before, instance)
+
+        return instance
@@ -0,0 +1,185 @@
+"""Stock reservation for orders.
+
+Placing an order decrements ``stock_quantity`` of the ordered products, or
+of the variants when a line names one, inside the order's transaction:
+
+* the affected rows are locked with ``select_for_update`` in id order,
+  products before variants, so concurrent checkouts always acquire locks
+  in the same sequence and cannot deadlock;
+* quantities are checked against the locked stock and the products'
+  ``min_order_quantity`` / ``max_order_quantity``;
+* each model is then decremented with a single ``UPDATE`` of ``F()``
+  expressions.
+
+Cancelling releases the reservation the same way. ``Order.stock_reserved``
+records whether an order holds stock, so orders placed before reservations
+existed are never released.
+"""
+import logging
+from collections import defaultdict
+from django.db.models import Case, F, IntegerField, When
+from django.utils import timezone
+from products.models import Product, ProductVariant
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+
+class StockError(Exception):
+    """Raised with per-line messages when an order cannot be reserved."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def parse_id(value):
+    return int(value) if str(value or '').isdigit() else None
+
+def order_quantities(items):
+    """Total ordered quantity per product id and per variant id."""
+    products = defaultdict(int)
+    variants = defaultdict(int)
+    invalid = []
+    for index, item in enumerate(items or []):
+        product_id = parse_id(item.get('product_id'))
+        variant_id = parse_id(item.get('variant_id'))
+        quantity = int(item.get('quantity') or 0)
+        if product_id is None:
+            invalid.append(f"Item {index + 1}: invalid product id {item.get('product_id')!r}.")
+            continue
+        if quantity < 1:
+            invalid.append(f"Item {index + 1}: quantity must be at least 1.")
+            continue
+        products[product_id] += quantity
+        if variant_id is not None:
+            variants[variant_id] += quantity
+    return products, variants, invalid
+
+def lock_rows(products, variants):
+    """Lock the referenced rows in a deterministic order and return them by id."""
+    locked_products = {
+        product.id: product for product in
+        Product.objects.select_for_update().filter(id__in=products).order_by('id').only(
+            'id', 'name', 'stock_quantity', 'min_order_quantity', 'max_order_quantity', 'is_active', 'is_approved'
+        )
+    }
+    locked_variants = {}
+    if variants:
+        locked_variants = {
+            variant.id: variant for variant in
+            ProductVariant.objects.select_for_update().filter(id__in=variants).order_by('id').only(
+                'id', 'name', 'product_id', 'stock_quantity'
+            )
+        }
+    return locked_products, locked_variants
+
+def adjust_stock(model, deltas):
+    """Add ``deltas[id]`` to ``stock_quantity`` of each row in one UPDATE."""
+    if not deltas:
+        return
+    model.objects.filter(id__in=deltas).update(
+        stock_quantity=Case(
+            *[When(id=row_id, then=F('stock_quantity') + delta) for row_id, delta in deltas.items()],
+            default=F('stock_quantity'),
+            output_field=IntegerField(),
+        ),
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+
+def reserve_stock(items):
+    """Check and decrement stock for JSON order ``items``; call inside the order transaction.
+
+    Raises ``StockError`` without changing anything when any line cannot be
+    fulfilled. Cached catalog lists are not invalidated here, so their
+    stock figures may lag by up to the catalog cache timeout.
+    """
+    products, variants, errors = order_quantities(items)
+    locked_products, locked_variants = lock_rows(products, variants)
+
+    # Variant lines draw on the variant's stock, the rest on the product's
+    variant_quantity_by_product = defaultdict(int)
+    for variant_id, quantity in variants.items():
+        variant = locked_variants.get(variant_id)
+        if variant is None:
+            errors.append(f"Variant {variant_id} does not exist.")
+            continue
+        if variant.product_id not in products:
+            errors.append(f"Variant {variant_id} does not belong to an ordered product.")
+            continue
+        variant_quantity_by_product[variant.product_id] += quantity
+        if variant.stock_quantity < quantity:
+            errors.append(f"Only {variant.stock_quantity} of variant '{variant.name}' in stock, {quantity} ordered.")
+
+    product_deltas = {}
+    for product_id, quantity in products.items():
+        product = locked_products.get(product_id)
+        if product is None or not product.is_active or not product.is_approved:
+            errors.append(f"Product {product_id} is not available.")
+            continue
+        if quantity < product.min_order_quantity:
+            errors.append(f"'{product.name}' requires at least {product.min_order_quantity} units, {quantity} ordered.")
+        if product.max_order_quantity is not None and quantity > product.max_order_quantity:
+            errors.append(f"'{product.name}' allows at most {product.max_order_quantity} units, {quantity} ordered.")
+        own_quantity = quantity - variant_quantity_by_product[product_id]
+        if own_quantity:
+            if product.stock_quantity < own_quantity:
+                errors.append(f"Only {product.stock_quantity} of '{product.name}' in stock, {own_quantity} ordered.")
+            product_deltas[product_id] = -own_quantity
+
+    if errors:
+        raise StockError(errors)
+    adjust_stock(Product, product_deltas)
+    adjust_stock(ProductVariant, {variant_id: -quantity for variant_id, quantity in variants.items()})
+
+def release_stock(items):
+    """Return the stock reserved for JSON order ``items``; rows deleted since are skipped."""
+    products, variants, _ = order_quantities(items)
+    locked_products, locked_variants = lock_rows(products, variants)
+    variant_quantity_by_product = defaultdict(int)
+    variant_deltas = {}
+    for variant_id, quantity in variants.items():
+        variant = locked_variants.get(variant_id)
+        if variant is not None:
+            variant_quantity_by_product[variant.product_id] += quantity
+            variant_deltas[variant_id] = quantity
+    product_deltas = {
+        product_id: quantity - variant_quantity_by_product[product_id]
+        for product_id, quantity in products.items()
+        if product_id in locked_products and quantity > variant_quantity_by_product[product_id]
+    }
+    adjust_stock(Product, product_deltas)
+    adjust_stock(ProductVariant, variant_deltas)
+
+def reserve_order_stock(order):
+    """Reserve stock for ``order``'s items and mark it as holding stock; the caller saves the order."""
+    reserve_stock(order.items)
+    order.stock_reserved = True
+
+def release_order_stock(order):
+    """Release ``order``'s reservation, if it holds one; the caller saves the order."""
+    if not order.stock_reserved:
+        return False
+    order.stock_reserved = False
+    # Clearing the flag first means only one of two concurrent cancels releases the stock
+    if not Order.objects.filter(pk=order.pk, stock_reserved=True).update(stock_reserved=False):
+        return False
+    release_stock(order.items)
+    logger.info(f"Released stock reserved by order {order.pk}")
+    return True
+
+def release_orders_stock(orders):
+    """Release the reservations of many ``orders`` with one stock update per model.
+
+    The caller must hold row locks on ``orders``, e.g. from ``select_for_update``.
+    """
+    held = [order for order in orders if order.stock_reserved]
+    if not held:
+        return 0
+    Order.objects.filter(pk__in=[order.pk for order in held]).update(stock_reserved=False)
+    release_stock([item for order in held for item in order.items or []])
+    for order in held:
+        order.stock_reserved = False
+    logger.info(f"Released stock reserved by {len(held)} orders")
+    return len(held)
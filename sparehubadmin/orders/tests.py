@@ -0,0 +1,275 @@
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from products.models import Category, Product, ProductVariant, Subcategory
+from users.models import User
+from .models import Order, OrderAddress, OrderEvent, OrderPayment, OrderStatus
+from .pricing import TAX_RATE, PricingError, price_items
+from .stock import StockError, release_stock, reserve_stock
+from .transitions import can_transition, parse_order_ids, transition_orders
+
+ADDRESS = {
+    'name': 'Shop', 'phone': '9999999999', 'address_line1': '1 Main Road',
+    'city': 'Pune', 'state': 'MH', 'pincode': '411001', 'country': 'India',
+}
+
+
+class OrderTestData:
+    @classmethod
+    def setUpTestData(cls):
+        cls.manufacturer = User.objects.create_user('maker@example.com', 'maker', 'pw', role='manufacturer')
+        cls.shop = User.objects.create_user('shop@example.com', 'shop', 'pw', role='shop')
+        cls.admin = User.objects.create_superuser('admin@example.com', 'admin', 'pw', role='admin')
+        category = Category.objects.create(name='Engine', slug='engine')
+        subcategory = Subcategory.objects.create(category=category, name='Pistons', slug='pistons')
+        cls.product = Product.objects.create(
+            name='Piston', sku='PST-1', category=category, subcategory=subcategory, manufacturer=cls.manufacturer,
+            price=Decimal('100.00'), discount=Decimal('10.00'), shipping_cost=Decimal('5.00'), weight=1,
+            stock_quantity=10, max_order_quantity=20, is_approved=True,
+        )
+        cls.variant = ProductVariant.objects.create(
+            product=cls.product, name='Oversize', sku='PST-1-OS', price_modifier=Decimal('20.00'), stock_quantity=3
+        )
+        cls.hidden = Product.objects.create(
+            name='Ring', sku='RNG-1', category=category, subcategory=subcategory, manufacturer=cls.manufacturer,
+            price=Decimal('10.00'), weight=1, stock_quantity=10, is_approved=False,
+        )
+
+    def stock(self):
+        self.product.refresh_from_db()
+        self.variant.refresh_from_db()
+        return self.product.stock_quantity, self.variant.stock_quantity
+
+    def make_order(self, status=OrderStatus.PENDING, quantity=1, stock_reserved=False):
+        return Order.objects.create(
+            user=self.shop, shop_name='Shop', status=status,
+            items=[{'product_id': str(self.product.id), 'quantity': quantity, 'price': 90.0}],
+            shipping_address=OrderAddress.objects.create(**ADDRESS),
+            payment=OrderPayment.objects.create(method='cod', status='pending', amount=Decimal('90.00')),
+            subtotal=Decimal('90.00'), tax=Decimal('0.00'), shipping_cost=Decimal('0.00'), total=Decimal('90.00'),
+            stock_reserved=stock_reserved,
+        )
+
+    def order_payload(self, items, status=OrderStatus.PENDING):
+        return {
+            'user': self.shop.id,
+            'shop_name': 'Shop',
+            'items': items,
+            'shipping_address': ADDRESS,
+            'payment': {'method': 'cod', 'status': 'pending', 'amount': '1.00'},
+            'status': status,
+        }
+
+
+class StockReservationTests(OrderTestData, TestCase):
+    def test_reserve_draws_on_variant_and_product_stock(self):
+        reserve_stock([
+            {'product_id': str(self.product.id), 'quantity': 2},
+            {'product_id': str(self.product.id), 'variant_id': self.variant.id, 'quantity': 1},
+        ])
+        self.assertEqual(self.stock(), (8, 2))
+
+    def test_release_returns_reserved_stock(self):
+        items = [
+            {'product_id': str(self.product.id), 'quantity': 2},
+            {'product_id': str(self.product.id), 'variant_id': self.variant.id, 'quantity': 1},
+        ]
+        reserve_stock(items)
+        release_stock(items)
+        self.assertEqual(self.stock(), (10, 3))
+
+    def test_oversell_is_rejected_without_changes(self):
+        with self.assertRaises(StockError) as raised:
+            reserve_stock([
+                {'product_id': str(self.product.id), 'quantity': 1},
+                {'product_id': str(self.product.id), 'variant_id': self.variant.id, 'quantity': 4},
+            ])
+        self.assertEqual(len(raised.exception.errors), 1)
+        self.assertIn('variant', raised.exception.errors[0])
+        self.assertEqual(self.stock(), (10, 3))
+
+    def test_quantities_are_summed_across_lines(self):
+        with self.assertRaises(StockError):
+            reserve_stock([
+                {'product_id': str(self.product.id), 'quantity': 6},
+                {'product_id': str(self.product.id), 'quantity': 5},
+            ])
+        self.assertEqual(self.stock(), (10, 3))
+
+    def test_order_limits_and_availability(self):
+        self.product.min_order_quantity = 3
+        self.product.save()
+        with self.assertRaises(StockError) as raised:
+            reserve_stock([
+                {'product_id': str(self.product.id), 'quantity': 2},
+                {'product_id': str(self.hidden.id), 'quantity': 1},
+            ])
+        self.assertEqual(len(raised.exception.errors), 2)
+
+    def test_placing_an_order_reserves_stock(self):
+        client = APIClient()
+        client.force_authenticate(self.shop)
+        response = client.post('/api/orders/', self.order_payload(
+            [{'product_id': str(self.product.id), 'quantity': 4}]
+        ), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Order.objects.get(pk=response.data['id']).stock_reserved)
+        self.assertEqual(self.stock(), (6, 3))
+
+    def test_oversold_order_is_not_placed(self):
+        client = APIClient()
+        client.force_authenticate(self.shop)
+        response = client.post('/api/orders/', self.order_payload(
+            [{'product_id': str(self.product.id), 'quantity': 11}]
+        ), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('items', response.data)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.stock(), (10, 3))
+
+    def test_deleting_an_order_releases_its_stock(self):
+        client = APIClient()
+        client.force_authenticate(self.shop)
+        response = client.post('/api/orders/', self.order_payload(
+            [{'product_id': str(self.product.id), 'quantity': 4}]
+        ), format='json')
+        client.delete(f"/api/orders/{response.data['id']}/")
+        self.assertEqual(self.stock(), (10, 3))
+
+
+class PricingTests(OrderTestData, TestCase):
+    def items(self):
+        return [
+            {'product_id': str(self.product.id), 'quantity': 2},
+            {'product_id': str(self.product.id), 'variant_id': self.variant.id, 'quantity': 1},
+        ]
+
+    def test_quote_applies_discount_variant_shipping_and_tax(self):
+        quote = price_items(self.items())
+        self.assertEqual([line['price'] for line in quote['items']], [Decimal('90.00'), Decimal('108.00')])
+        self.assertEqual(quote['subtotal'], Decimal('288.00'))
+        self.assertEqual(quote['shipping_cost'], Decimal('15.00'))
+        self.assertEqual(quote['tax'], (Decimal('288.00') * TAX_RATE).quantize(Decimal('0.01')))
+        self.assertEqual(quote['total'], quote['subtotal'] + quote['tax'] + quote['shipping_cost'])
+
+    def test_unpriceable_lines_are_reported(self):
+        with self.assertRaises(PricingError) as raised:
+            price_items([
+                {'product_id': str(self.hidden.id), 'quantity': 1},
+                {'product_id': str(self.product.id), 'variant_id': 999999, 'quantity': 1},
+                {'product_id': 'x', 'quantity': 1},
+            ])
+        self.assertEqual(len(raised.exception.errors), 3)
+
+    def test_order_totals_match_quote_and_ignore_client_prices(self):
+        client = APIClient()
+        client.force_authenticate(self.shop)
+        quote = client.post('/api/orders/quote/', {'items': self.items()}, format='json')
+        self.assertEqual(quote.status_code, 200, quote.data)
+
+        items = [dict(item, price='1.00') for item in self.items()]
+        payload = dict(self.order_payload(items), subtotal='1.00', tax='0.00', total='1.00')
+        response = client.post('/api/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        order = Order.objects.get(pk=response.data['id'])
+        for field in ('subtotal', 'tax', 'shipping_cost', 'total'):
+            self.assertEqual(getattr(order, field), Decimal(str(quote.data[field])), field)
+        self.assertEqual(order.payment.amount, order.total)
+        self.assertEqual([item['price'] for item in order.items], [90.0, 108.0])
+
+
+class TransitionTests(OrderTestData, TestCase):
+    def test_transition_table(self):
+        self.assertTrue(can_transition(OrderStatus.PENDING, OrderStatus.CONFIRMED))
+        self.assertTrue(can_transition(OrderStatus.PROCESSING, OrderStatus.CANCELLED))
+        self.assertTrue(can_transition(OrderStatus.SHIPPED, OrderStatus.RETURNED))
+        self.assertFalse(can_transition(OrderStatus.PENDING, OrderStatus.DELIVERED))
+        self.assertFalse(can_transition(OrderStatus.SHIPPED, OrderStatus.CANCELLED))
+        self.assertFalse(can_transition(OrderStatus.CANCELLED, OrderStatus.PENDING))
+        self.assertFalse(can_transition(OrderStatus.RETURNED, OrderStatus.DELIVERED))
+
+    def test_parse_order_ids(self):
+        self.assertEqual(parse_order_ids([3, '1', 3]), [3, 1])
+        for values in ([], None, [1, 'x'], [True], [-1]):
+            with self.assertRaises(ValueError):
+                parse_order_ids(values)
+
+    def test_transition_reports_each_order(self):
+        pending = self.make_order()
+        shipped = self.make_order(status=OrderStatus.SHIPPED)
+        confirmed = self.make_order(status=OrderStatus.CONFIRMED)
+        report = transition_orders([pending.id, shipped.id, confirmed.id, 999999], OrderStatus.CONFIRMED)
+        self.assertEqual((report['updated'], report['unchanged'], report['failed']), (1, 1, 2))
+        self.assertEqual({error['order_id'] for error in report['errors']}, {shipped.id, 999999})
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, OrderStatus.CONFIRMED)
+        event = OrderEvent.objects.get(order=pending)
+        self.assertEqual((event.old_status, event.status), (OrderStatus.PENDING, OrderStatus.CONFIRMED))
+
+    def test_cancelling_releases_reserved_stock_once(self):
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=7)
+        reserved = self.make_order(quantity=3, stock_reserved=True)
+        legacy = self.make_order(quantity=2)
+        transition_orders([reserved.id, legacy.id], OrderStatus.CANCELLED)
+        self.assertEqual(self.stock(), (10, 3))
+        reserved.refresh_from_db()
+        self.assertFalse(reserved.stock_reserved)
+        transition_orders([reserved.id], OrderStatus.CANCELLED)
+        self.assertEqual(self.stock(), (10, 3))
+
+    def test_bulk_status_endpoint(self):
+        order = self.make_order()
+        client = APIClient()
+        client.force_authenticate(self.shop)
+        payload = {'order_ids': [order.id], 'status': OrderStatus.CONFIRMED}
+        self.assertEqual(client.post('/api/orders/bulk-status/', payload, format='json').status_code, 403)
+
+        client.force_authenticate(self.admin)
+        response = client.post('/api/orders/bulk-status/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+        response = client.post('/api/orders/bulk-status/', {'order_ids': [order.id], 'status': 'lost'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(OrderTestData, TestCase):
+    def fetch_all(self, client, params, during=None):
+        ids = []
+        cursor = ''
+        while True:
+            response = client.get('/api/orders/', dict(params, cursor=cursor, page_size=2))
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            if during:
+                during()
+                during = None
+            cursor = response.data['next_cursor']
+            if not cursor:
+                return ids
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.orders = [self.make_order() for _ in range(5)]
+        # Equal sort keys, so the id tiebreaker decides the order
+        Order.objects.update(created_at=timezone.now())
+
+    def test_pages_cover_every_order_once(self):
+        ids = self.fetch_all(self.client, {})
+        self.assertEqual(ids, sorted((order.id for order in self.orders), reverse=True))
+
+    def test_rows_inserted_while_scrolling_do_not_shift_pages(self):
+        ids = self.fetch_all(self.client, {}, during=self.make_order)
+        self.assertEqual(ids, sorted((order.id for order in self.orders), reverse=True))
+
+    def test_ascending_ordering(self):
+        ids = self.fetch_all(self.client, {'ordering': 'total'})
+        self.assertEqual(ids, sorted(order.id for order in self.orders))
+
+    def test_invalid_cursors(self):
+        first = self.client.get('/api/orders/', {'cursor': '', 'page_size': 2})
+        cursor = first.data['next_cursor']
+        self.assertEqual(self.client.get('/api/orders/', {'cursor': 'garbage'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/orders/', {'cursor': cursor, 'ordering': 'total'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/orders/', {'cursor': '', 'ordering': 'shop_name'}).status_code, 400)
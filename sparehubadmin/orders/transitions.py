@@ -0,0 +1,102 @@
+"""Order status state machine and bulk transitions.
+
+Orders move pending -> confirmed -> processing -> shipped -> delivered.
+Anything not yet shipped can be cancelled; shipped orders that come back
+(refused or undeliverable) and delivered orders can be returned. Cancelled
+and returned orders are final.
+
+``transition_orders`` moves many orders to one status in a single
+transaction: the orders are locked in id order, invalid moves are reported
+per order, and the rest are written with one ``UPDATE``, one batched insert
+of ``OrderEvent`` rows, one stock release for cancellations and merged
+rollup deltas.
+"""
+import logging
+from django.db import transaction
+from django.utils import timezone
+from analytics import rollups
+from .models import Order, OrderEvent, OrderStatus
+from .stock import release_orders_stock
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_TRANSITION_ORDERS = 5000
+
+ORDER_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.CONFIRMED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.PROCESSING, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.SHIPPED, OrderStatus.CANCELLED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED, OrderStatus.RETURNED},
+    OrderStatus.DELIVERED: {OrderStatus.RETURNED},
+    OrderStatus.CANCELLED: set(),
+    OrderStatus.RETURNED: set(),
+}
+
+
+def can_transition(old_status, new_status):
+    return new_status in ORDER_TRANSITIONS.get(old_status, set())
+
+def parse_order_ids(values):
+    """Unique order ids in request order; raises ``ValueError`` on anything else."""
+    if not isinstance(values, list) or not values:
+        raise ValueError('Send a non-empty list of order ids.')
+    if len(values) > MAX_BULK_TRANSITION_ORDERS:
+        raise ValueError(f'At most {MAX_BULK_TRANSITION_ORDERS} orders per request.')
+    order_ids = []
+    for value in values:
+        if isinstance(value, bool) or not str(value).isdigit():
+            raise ValueError(f'Invalid order id {value!r}.')
+        order_ids.append(int(value))
+    return list(dict.fromkeys(order_ids))
+
+def transition_orders(order_ids, status, actor=None, comment=None):
+    """Move ``order_ids`` to ``status`` and return a per-order report."""
+    if status not in OrderStatus.values:
+        raise ValueError(f'Invalid status {status!r}.')
+    report = {'requested': len(order_ids), 'updated': 0, 'unchanged': 0, 'failed': 0, 'errors': []}
+    with transaction.atomic():
+        orders = {
+            order.pk: order for order in
+            Order.objects.select_for_update().filter(pk__in=order_ids).order_by('id').only(
+                'id', 'user_id', 'status', 'items', 'total', 'stock_reserved', 'created_at'
+            )
+        }
+        moving = []
+        for order_id in order_ids:
+            order = orders.get(order_id)
+            if order is None:
+                error = 'Order not found.'
+            elif order.status == status:
+                report['unchanged'] += 1
+                continue
+            elif not can_transition(order.status, status):
+                error = f'Cannot move a {order.status} order to {status}.'
+            else:
+                moving.append((order, order.status))
+                continue
+            report['failed'] += 1
+            report['errors'].append({'order_id': order_id, 'error': error})
+
+        if moving:
+            now = timezone.now()
+            if status == OrderStatus.CANCELLED:
+                release_orders_stock([order for order, _ in moving])
+            Order.objects.filter(pk__in=[order.pk for order, _ in moving]).update(status=status, updated_at=now)
+            comment = comment or f"Status updated to {status}" + (f" by {actor.username}" if actor else '')
+            OrderEvent.objects.bulk_create([
+                OrderEvent(
+                    order=order, actor=actor, old_status=old_status, status=status,
+                    comment=comment, payload={'bulk': True}, timestamp=now,
+                )
+                for order, old_status in moving
+            ])
+            for order, _ in moving:
+                order.status = status
+            rollups.record_status_changes(moving)
+        report['updated'] = len(moving)
+
+    logger.info(
+        f"Bulk transition to {status}: requested={report['requested']} updated={report['updated']} "
+        f"unchanged={report['unchanged']} failed={report['failed']}"
+    )
+    return report
@@ -1,7 +1,70 @@
-from rest_framework import viewsets
+import logging
+from django.db import transaction
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from analytics import rollups
+from sparehubadmin.conditional import ConditionalGetMixin
+from sparehubadmin.pagination import OptInKeysetPagination
 from .models import Order
-from .serializers import OrderSerializer
+from .pricing import PricingError, price_items
+from .serializers import OrderItemSerializer, OrderSerializer
+from .stock import release_order_stock
+from .transitions import parse_order_ids, transition_orders
 
-class OrderViewSet(viewsets.ModelViewSet):
+logger = logging.getLogger(__name__)
+
+class OrderViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    pagination_class = OptInKeysetPagination
+    keyset_ordering_fields = ('created_at', 'total')
+    # Payment and addresses have no updated_at; payment status is compared directly.
+    # Events are append-only, so the latest timestamp covers them
+    conditional_fields = ('updated_at', 'events__timestamp', 'payment__status')
+
+    def get_queryset(self):
+        return Order.objects.select_related(
+            'shipping_address', 'billing_address', 'payment'
+        ).prefetch_related('events')
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        rollup_before = rollups.snapshot(instance)
+        # Give back a pending reservation, as cancelling does
+        release_order_stock(instance)
+        instance.delete()
+        rollups.record_order_deleted(rollup_before)
+
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """Price a cart without placing it; totals match what order creation stores."""
+        data = request.data.get('items') if isinstance(request.data, dict) else request.data
+        items = OrderItemSerializer(data=data, many=True)
+        if not items.is_valid():
+            return Response({'items': items.errors}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            quote = price_items(items.validated_data)
+        except PricingError as e:
+            return Response({'items': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error pricing order quote: {str(e)}")
+            return Response({"detail": "Failed to price order"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(quote)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status', permission_classes=[permissions.IsAdminUser])
+    def bulk_status(self, request):
+        """Move many orders to one status; invalid transitions are reported per order."""
+        if not isinstance(request.data, dict):
+            return Response({"detail": "Send {order_ids, status, comment}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            order_ids = parse_order_ids(request.data.get('order_ids'))
+            report = transition_orders(
+                order_ids, request.data.get('status'), actor=request.user, comment=request.data.get('comment')
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error in bulk order status update: {str(e)}")
+            return Response({"detail": "Failed to update orders"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(report)
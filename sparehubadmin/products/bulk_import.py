@@ -0,0 +1,402 @@
+"""Bulk product import for manufacturers.
+
+Rows are streamed from a CSV or JSON Lines upload and handled in batches:
+each batch is validated in memory (categories, subcategories and brands are
+resolved from maps loaded once per import), checked against existing SKUs
+with a single query, then upserted with one
+``bulk_create(update_conflicts=True)``. Invalid rows are skipped and
+reported by row number; they never abort the rest of the import.
+
+An existing product only changes in the columns the file has, so a file
+of the required columns plus ``price`` leaves stock, descriptions and the
+other optional columns alone. Empty
+text and brand cells clear the value; empty number and boolean cells are
+treated as absent.
+"""
+import csv
+import io
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from .cache import bump_catalog_version
+from .models import Brand, Category, Product, Subcategory
+from .search import build_search_document, get_search_backend
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 1000
+
+# Header aliases, including the column titles of the product export
+COLUMN_ALIASES = {
+    'product_name': 'name',
+    'stock': 'stock_quantity',
+    'active': 'is_active',
+    'category_name': 'category',
+    'subcategory_name': 'subcategory',
+    'brand_name': 'brand',
+}
+
+REQUIRED_COLUMNS = ('sku', 'name', 'category', 'subcategory', 'price', 'weight')
+
+# column: (max_digits, decimal_places, min, max)
+DECIMAL_COLUMNS = {
+    'price': (10, 2, 0, None),
+    'discount': (5, 2, 0, 100),
+    'weight': (10, 2, 0, None),
+    'shipping_cost': (10, 2, 0, None),
+}
+
+INTEGER_COLUMNS = {
+    'stock_quantity': 0,
+    'min_order_quantity': 1,
+    'max_order_quantity': 1,
+}
+
+TEXT_COLUMNS = ('description', 'dimensions', 'material', 'color', 'shipping_time', 'origin_country')
+
+# Fields overwritten when a SKU already exists; approval and featuring stay with the admins
+UPDATE_FIELDS = [
+    'name', 'description', 'brand', 'category', 'subcategory', 'price', 'discount', 'stock_quantity',
+    'min_order_quantity', 'max_order_quantity', 'weight', 'dimensions', 'material', 'color',
+    'shipping_cost', 'shipping_time', 'origin_country', 'is_active', 'search_document', 'version', 'updated_at',
+]
+
+# Fields derived by the importer rather than read from a column
+DERIVED_FIELDS = ('search_document', 'version', 'updated_at')
+# Batches retried after another manufacturer inserted one of their SKUs mid-upsert
+UPSERT_ATTEMPTS = 3
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+
+class ImportFormatError(ValueError):
+    """The upload cannot be read as the requested format."""
+
+
+class SkuTaken(Exception):
+    """A SKU in the batch was created by another manufacturer after it was looked up."""
+
+
+def detect_format(upload, requested=None):
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ImportFormatError(f"Unsupported format '{requested}'")
+        return requested
+    name = (upload.name or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    raise ImportFormatError('Cannot tell the file format; pass file_format=csv or file_format=jsonl')
+
+def normalize_key(key):
+    key = str(key or '').strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(key, key)
+
+def read_rows(upload, file_format):
+    """Yield ``(row_number, dict)`` pairs without reading the whole upload into memory."""
+    upload.seek(0)
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'csv':
+            reader = csv.reader(lines)
+            header = next(reader, None)
+            if not header:
+                raise ImportFormatError('The CSV file has no header row')
+            keys = [normalize_key(name) for name in header]
+            for values in reader:
+                if any(value.strip() for value in values):
+                    yield reader.line_num, dict(zip(keys, values))
+            return
+        for row_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                yield row_number, None
+                continue
+            yield row_number, {normalize_key(key): value for key, value in data.items()} if isinstance(data, dict) else None
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f'Cannot read the file: {e}')
+    finally:
+        # Leave the upload open for Django to clean up
+        lines.detach()
+
+def read_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CatalogMaps:
+    """Categories, subcategories and brands keyed by id and by lowercase name."""
+
+    def __init__(self):
+        self.categories = {}
+        self.subcategories = {}
+        self.brands = {}
+        for category in Category.objects.all():
+            self.categories[str(category.id)] = category
+            self.categories[category.name.strip().lower()] = category
+        for subcategory in Subcategory.objects.all():
+            self.subcategories[str(subcategory.id)] = subcategory
+            # Names are only unique within a category
+            self.subcategories[(subcategory.category_id, subcategory.name.strip().lower())] = subcategory
+        for brand in Brand.objects.all():
+            self.brands[str(brand.id)] = brand
+            self.brands[brand.name.strip().lower()] = brand
+
+    def category(self, value):
+        return self.categories.get(str(value).strip().lower())
+
+    def subcategory(self, value, category):
+        value = str(value).strip()
+        subcategory = self.subcategories.get(value)
+        if subcategory is None and category is not None:
+            subcategory = self.subcategories.get((category.id, value.lower()))
+        return subcategory
+
+    def brand(self, value):
+        return self.brands.get(str(value).strip().lower())
+
+
+def clean_text(value):
+    return '' if value is None else str(value).strip()
+
+def parse_decimal(value, max_digits, decimal_places, minimum, maximum):
+    try:
+        number = Decimal(clean_text(value))
+    except InvalidOperation:
+        raise ValueError('must be a valid number')
+    if not number.is_finite():
+        raise ValueError('must be a valid number')
+    if number.adjusted() >= max_digits - decimal_places:
+        raise ValueError(f'must have at most {max_digits - decimal_places} digits before the decimal point')
+    number = number.quantize(Decimal(1).scaleb(-decimal_places))
+    if number < minimum or (maximum is not None and number > maximum):
+        bound = f'between {minimum} and {maximum}' if maximum is not None else f'at least {minimum}'
+        raise ValueError(f'must be {bound}')
+    return number
+
+def parse_integer(value, minimum):
+    try:
+        number = Decimal(clean_text(value))
+    except InvalidOperation:
+        raise ValueError('must be a whole number')
+    if not number.is_finite() or number != number.to_integral_value():
+        raise ValueError('must be a whole number')
+    number = int(number)
+    if number < minimum:
+        raise ValueError(f'must be at least {minimum}')
+    return number
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = clean_text(value).lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError('must be true or false')
+
+def build_product(data, manufacturer, maps):
+    """Validate one row; returns ``(Product, None)`` or ``(None, errors)``."""
+    errors = {}
+    for column in REQUIRED_COLUMNS:
+        if not clean_text(data.get(column)):
+            errors[column] = 'This field is required.'
+
+    values = {}
+    sku = clean_text(data.get('sku'))
+    name = clean_text(data.get('name'))
+    if len(sku) > 100:
+        errors['sku'] = 'Must be at most 100 characters.'
+    if len(name) > 255:
+        errors['name'] = 'Must be at most 255 characters.'
+
+    for column, bounds in DECIMAL_COLUMNS.items():
+        if clean_text(data.get(column)):
+            try:
+                values[column] = parse_decimal(data[column], *bounds)
+            except ValueError as e:
+                errors[column] = f'{column.replace("_", " ").capitalize()} {e}.'
+    for column, minimum in INTEGER_COLUMNS.items():
+        if clean_text(data.get(column)):
+            try:
+                values[column] = parse_integer(data[column], minimum)
+            except ValueError as e:
+                errors[column] = f'{column.replace("_", " ").capitalize()} {e}.'
+    if values.get('max_order_quantity') is not None and values['max_order_quantity'] < values.get('min_order_quantity', 1):
+        errors['max_order_quantity'] = 'Maximum order quantity must be greater than minimum order quantity.'
+    if clean_text(data.get('is_active')):
+        try:
+            values['is_active'] = parse_bool(data['is_active'])
+        except ValueError as e:
+            errors['is_active'] = f'Active {e}.'
+
+    category = subcategory = brand = None
+    if clean_text(data.get('category')):
+        category = maps.category(data['category'])
+        if category is None:
+            errors['category'] = f"Unknown category '{clean_text(data['category'])}'."
+    if clean_text(data.get('subcategory')):
+        subcategory = maps.subcategory(data['subcategory'], category)
+        if subcategory is None:
+            errors['subcategory'] = f"Unknown subcategory '{clean_text(data['subcategory'])}'."
+        elif category is not None and subcategory.category_id != category.id:
+            errors['subcategory'] = 'Selected subcategory does not belong to the selected category.'
+    if clean_text(data.get('brand')):
+        brand = maps.brand(data['brand'])
+        if brand is None:
+            errors['brand'] = f"Unknown brand '{clean_text(data['brand'])}'."
+
+    if errors:
+        return None, errors
+    product = Product(
+        sku=sku,
+        name=name,
+        manufacturer=manufacturer,
+        category=category,
+        subcategory=subcategory,
+        brand=brand,
+        is_active=values.pop('is_active', True),
+        **{column: clean_text(data.get(column)) for column in TEXT_COLUMNS},
+        **values,
+    )
+    product.search_document = build_search_document(product)
+    return product, None
+
+
+def supplied_fields(data):
+    """``UPDATE_FIELDS`` a row sets; an existing product keeps its values for the others."""
+    return {
+        field for field in UPDATE_FIELDS
+        if field in data and (field in TEXT_COLUMNS or field == 'brand' or clean_text(data[field]))
+    }
+
+
+class ProductImporter:
+    """Upsert a manufacturer's products from an upload and collect a per-row report."""
+
+    def __init__(self, manufacturer, batch_size=IMPORT_BATCH_SIZE):
+        self.manufacturer = manufacturer
+        self.batch_size = batch_size
+        self.maps = CatalogMaps()
+        self.report = {'processed': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def error(self, row_number, sku, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'row': row_number, 'sku': sku or None, 'errors': errors})
+
+    def run(self, upload, file_format):
+        for batch in read_batches(read_rows(upload, file_format), self.batch_size):
+            self.import_batch(batch)
+        self.report['errors_truncated'] = self.report['failed'] > len(self.report['errors'])
+        transaction.on_commit(bump_catalog_version)
+        logger.info(
+            f"Bulk import by manufacturer {self.manufacturer.id}: processed={self.report['processed']} "
+            f"created={self.report['created']} updated={self.report['updated']} failed={self.report['failed']}"
+        )
+        return self.report
+
+    def import_batch(self, batch):
+        products = {}
+        for row_number, data in batch:
+            self.report['processed'] += 1
+            if data is None:
+                self.error(row_number, None, {'non_field_errors': 'Row is not a JSON object.'})
+                continue
+            product, errors = build_product(data, self.manufacturer, self.maps)
+            if errors:
+                self.error(row_number, clean_text(data.get('sku')), errors)
+                continue
+            if product.sku in products:
+                # Last occurrence wins, like a second import of the same SKU would
+                earlier_row, _, _ = products.pop(product.sku)
+                self.error(earlier_row, product.sku, {'sku': f'Superseded by row {row_number} with the same SKU.'})
+            products[product.sku] = (row_number, product, supplied_fields(data))
+        if not products:
+            return
+
+        for attempt in range(UPSERT_ATTEMPTS):
+            try:
+                rejected, updated = self.upsert(dict(products))
+                break
+            except SkuTaken:
+                # The rolled back batch is retried; the lookup now sees the other manufacturer's SKU
+                logger.warning(f"Bulk import by manufacturer {self.manufacturer.id}: SKU taken concurrently, retrying batch")
+        else:
+            raise SkuTaken('SKUs kept being created concurrently by other manufacturers')
+        for row_number, sku in rejected:
+            self.error(row_number, sku, {'sku': 'This SKU is already in use.'})
+        self.report['updated'] += updated
+        self.report['created'] += len(products) - len(rejected) - updated
+
+    def keep_unsupplied(self, product, current, supplied):
+        """Copy the fields the row did not supply from the stored product ``current``."""
+        for field in UPDATE_FIELDS:
+            if field in supplied or field in DERIVED_FIELDS:
+                continue
+            if field == 'brand':
+                product.brand = self.maps.brands.get(str(current.brand_id)) if current.brand_id else None
+            else:
+                setattr(product, field, getattr(current, field))
+        product.search_document = build_search_document(product)
+
+    def upsert(self, products):
+        """Upsert one batch in a transaction; returns ``(rejected, updated)``.
+
+        ``rejected`` lists ``(row_number, sku)`` of SKUs owned by other manufacturers.
+        """
+        rejected = []
+        with transaction.atomic():
+            # One SKU lookup per batch; locking the rows, in id order like orders.stock.lock_rows so
+            # imports, stock syncs and checkouts cannot deadlock, keeps ownership stable until the upsert
+            existing = {
+                current.sku: current for current in
+                Product.objects.select_for_update()
+                .filter(sku__in=list(products))
+                .only('sku', 'manufacturer', 'version', *(f for f in UPDATE_FIELDS if f not in DERIVED_FIELDS))
+                .order_by('id')
+            }
+            for sku, current in existing.items():
+                if current.manufacturer_id != self.manufacturer.id:
+                    row_number, _, _ = products.pop(sku)
+                    rejected.append((row_number, sku))
+                    continue
+                _, product, supplied = products[sku]
+                self.keep_unsupplied(product, current, supplied)
+                product.version = current.version + 1
+            if not products:
+                return rejected, 0
+            batch_products = [product for _, product, _ in products.values()]
+            options = {'update_conflicts': True, 'update_fields': UPDATE_FIELDS}
+            # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target
+            if connection.features.supports_update_conflicts_with_target:
+                options['unique_fields'] = ['sku']
+            Product.objects.bulk_create(batch_products, **options)
+            # bulk_create skips the save signals and returns no ids on MySQL (nor for
+            # updated rows elsewhere), so read the ids back before indexing
+            rows = Product.objects.filter(sku__in=list(products)).values_list('sku', 'id', 'manufacturer_id')
+            ids = {}
+            for sku, product_id, owner_id in rows:
+                if owner_id != self.manufacturer.id:
+                    # Inserted by someone else after the lookup, so the upsert overwrote their product
+                    raise SkuTaken(sku)
+                ids[sku] = product_id
+            for product in batch_products:
+                product.id = ids[product.sku]
+            get_search_backend().index_products(batch_products)
+        return rejected, sum(1 for sku in products if sku in existing)
@@ -0,0 +1,65 @@
+"""Versioned cache keys for catalog data.
+
+Every key embeds the current catalog version, a counter bumped whenever a
+product, category, subcategory or brand changes. Bumping the version makes
+all earlier entries unreachable at once; they expire on their own timeout.
+The counter starts from the clock whenever its key is missing, so losing it
+to culling or a cache restart never brings back an earlier version.
+The cache backend itself is configured through ``CACHES`` in settings.
+"""
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from sparehubadmin.conditional import compute_etag
+
+CATALOG_VERSION_KEY = 'catalog:version'
+FACETS_CACHE_TIMEOUT = 300
+
+def seed_version():
+    """Clock-based starting version, above every version used before the key was lost."""
+    # Microseconds, so a counter bumped since the last seed stays behind it
+    return time.time_ns() // 1000
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # A culled or evicted key must not restart at a version whose entries may still be cached
+        version = seed_version()
+        cache.add(CATALOG_VERSION_KEY, version, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+def bump_catalog_version():
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key missing or evicted: a fresh seed invalidates old entries
+        version = seed_version()
+        cache.add(CATALOG_VERSION_KEY, version, timeout=None)
+        return cache.get(CATALOG_VERSION_KEY, version)
+
+def catalog_cache_key(namespace, scope, params):
+    """Key for ``namespace`` data of a visibility ``scope`` and filter ``params``."""
+    signature = json.dumps(
+        {key: params[key] for key in sorted(params) if params[key] not in (None, '')},
+        sort_keys=True
+    )
+    digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()
+    return f'catalog:v{catalog_version()}:{namespace}:{scope}:{digest}'
+
+def cached_catalog_data(namespace, scope, params, build):
+    """Return ``(data, etag, cached)``, calling ``build()`` only on a cache miss.
+
+    The ETag is computed once when the entry is built, so cache hits answer
+    conditional requests without re-serializing the payload.
+    """
+    key = catalog_cache_key(namespace, scope, params)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry['data'], entry['etag'], True
+    data = build()
+    etag = compute_etag(data)
+    cache.set(key, {'data': data, 'etag': etag}, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    return data, etag, False
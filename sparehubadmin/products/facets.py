@@ -0,0 +1,127 @@
+"""Catalog filters and facet counts for ``ProductViewSet``.
+
+Each facet is counted against the current filter set minus its own filter,
+so picking a brand still shows how many products the other brands have.
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+from django.db.models import Count, Q
+from .search import search_products
+
+logger = logging.getLogger(__name__)
+
+FILTER_PARAMS = (
+    'category_id', 'subcategory_id', 'brand_id', 'min_price', 'max_price', 'stock_status', 'search'
+)
+
+# (min, max) with max exclusive; None means unbounded
+PRICE_BUCKETS = [
+    (0, 50), (50, 100), (100, 250), (250, 500), (500, 1000), (1000, None),
+]
+
+LOW_STOCK_THRESHOLD = 10
+
+STOCK_BUCKETS = {
+    'in_stock': Q(stock_quantity__gt=LOW_STOCK_THRESHOLD),
+    'low_stock': Q(stock_quantity__lte=LOW_STOCK_THRESHOLD, stock_quantity__gt=0),
+    'out_of_stock': Q(stock_quantity=0),
+}
+
+def filter_params(query_params):
+    return {key: query_params.get(key) for key in FILTER_PARAMS if query_params.get(key)}
+
+def parse_price(value, name):
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError):
+        logger.warning(f"Invalid {name}: {value}")
+        return None
+
+def apply_catalog_filters(queryset, params, exclude=()):
+    """Apply the catalog query params to ``queryset``, skipping those in ``exclude``."""
+    params = {key: value for key, value in params.items() if key not in exclude}
+    if params.get('category_id'):
+        queryset = queryset.filter(category_id=params['category_id'])
+    if params.get('subcategory_id'):
+        queryset = queryset.filter(subcategory_id=params['subcategory_id'])
+    if params.get('brand_id'):
+        queryset = queryset.filter(brand_id=params['brand_id'])
+    if params.get('min_price'):
+        min_price = parse_price(params['min_price'], 'min_price')
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+    if params.get('max_price'):
+        max_price = parse_price(params['max_price'], 'max_price')
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+    if params.get('stock_status') in STOCK_BUCKETS:
+        queryset = queryset.filter(STOCK_BUCKETS[params['stock_status']])
+    if params.get('search'):
+        queryset = search_products(queryset, params['search'])
+    return queryset
+
+def count_by(queryset, *fields):
+    return list(queryset.values(*fields).annotate(count=Count('id')).order_by('-count', fields[0]))
+
+def price_bucket_q(low, high):
+    condition = Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+def compute_facets(queryset, params):
+    """Return facet counts for ``queryset`` (already scoped to the user) and ``params``."""
+    if params.get('search'):
+        # No facet excludes the search, so resolve it once as a plain id filter;
+        # the search backends annotate and group, which the grouped counts cannot build on
+        queryset = queryset.filter(
+            id__in=search_products(queryset, params['search']).order_by().values('id')
+        )
+        params = {key: value for key, value in params.items() if key != 'search'}
+    total = apply_catalog_filters(queryset, params).count()
+    categories = count_by(
+        apply_catalog_filters(queryset, params, exclude=('category_id', 'subcategory_id')),
+        'category_id', 'category__name'
+    )
+    subcategories = count_by(
+        apply_catalog_filters(queryset, params, exclude=('subcategory_id',)),
+        'subcategory_id', 'subcategory__name', 'subcategory__category_id'
+    )
+    brands = count_by(
+        apply_catalog_filters(queryset, params, exclude=('brand_id',)).filter(brand__isnull=False),
+        'brand_id', 'brand__name'
+    )
+    price_counts = apply_catalog_filters(queryset, params, exclude=('min_price', 'max_price')).aggregate(**{
+        f'bucket_{index}': Count('id', filter=price_bucket_q(low, high))
+        for index, (low, high) in enumerate(PRICE_BUCKETS)
+    })
+    stock_counts = apply_catalog_filters(queryset, params, exclude=('stock_status',)).aggregate(**{
+        name: Count('id', filter=condition) for name, condition in STOCK_BUCKETS.items()
+    })
+    return {
+        'count': total,
+        'categories': [
+            {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+            for row in categories
+        ],
+        'subcategories': [
+            {
+                'id': row['subcategory_id'],
+                'name': row['subcategory__name'],
+                'category_id': row['subcategory__category_id'],
+                'count': row['count']
+            }
+            for row in subcategories
+        ],
+        'brands': [
+            {'id': row['brand_id'], 'name': row['brand__name'], 'count': row['count']}
+            for row in brands
+        ],
+        'price_ranges': [
+            {'min': low, 'max': high, 'count': price_counts[f'bucket_{index}']}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        'stock_status': [
+            {'value': name, 'count': stock_counts[name]} for name in STOCK_BUCKETS
+        ],
+    }
@@ -0,0 +1,109 @@
+"""Incremental sync of a product's images.
+
+Clients editing a product send only the files that are new, plus an
+``image_sync`` instruction describing the result::
+
+    {
+        "images": [{"id": 12}, {"upload": 0}, {"id": 15}],
+        "delete": [13, 14],
+        "primary": {"id": 15}
+    }
+
+``images`` is the final order: existing images by id and new files by their
+index in the request's ``images`` uploads. Every existing image must be
+either listed or deleted, so a client working from a stale image list gets
+an error instead of silently dropping someone else's upload. ``primary`` is
+optional; without it the current primary stays if kept, otherwise the first
+image becomes primary.
+
+``sync_product_images`` applies the difference in the caller's transaction:
+one ``DELETE`` for removed images (their files are removed later by the
+media worker), one batched ``UPDATE`` of the kept images whose position or
+primary flag changed, and a queued placeholder per new file.
+"""
+import json
+from uploads.tasks import queue_product_image
+from .models import ProductImage
+
+
+def reference(entry):
+    """``('id', 12)`` or ``('upload', 0)`` for one instruction entry."""
+    if isinstance(entry, dict) and len(entry) == 1:
+        kind, value = next(iter(entry.items()))
+        if kind in ('id', 'upload') and isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+            return kind, value
+    raise ValueError(f'Invalid image reference {entry!r}; use {{"id": <image id>}} or {{"upload": <file index>}}.')
+
+def parse_image_sync(value, existing_ids, upload_count):
+    """Validate an ``image_sync`` instruction against a product's current images.
+
+    Returns ``(order, delete_ids, primary)``; raises ``ValueError`` describing the first problem.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValueError('image_sync must be a JSON object.')
+    if not isinstance(value, dict):
+        raise ValueError('image_sync must be a JSON object.')
+
+    order = [reference(entry) for entry in value.get('images') or []]
+    delete_ids = value.get('delete') or []
+    if not isinstance(delete_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in delete_ids):
+        raise ValueError('delete must be a list of image ids.')
+    if len(set(order)) != len(order) or len(set(delete_ids)) != len(delete_ids):
+        raise ValueError('Each image may be listed only once.')
+
+    kept_ids = {ref for kind, ref in order if kind == 'id'}
+    unknown = (kept_ids | set(delete_ids)) - set(existing_ids)
+    if unknown:
+        raise ValueError(f'Images {sorted(unknown)} do not belong to this product.')
+    if kept_ids & set(delete_ids):
+        raise ValueError(f'Images {sorted(kept_ids & set(delete_ids))} are both kept and deleted.')
+    unaccounted = set(existing_ids) - kept_ids - set(delete_ids)
+    if unaccounted:
+        raise ValueError(f'Images {sorted(unaccounted)} are neither kept nor deleted.')
+    uploads = [ref for kind, ref in order if kind == 'upload']
+    if sorted(uploads) != list(range(upload_count)):
+        raise ValueError(f'images must place each of the {upload_count} uploaded files exactly once.')
+
+    primary = value.get('primary')
+    if primary is not None:
+        primary = reference(primary)
+        if primary not in order:
+            raise ValueError('primary must be one of the listed images.')
+    return order, set(delete_ids), primary
+
+def replace_all(existing_ids, upload_count):
+    """The instruction equivalent to uploading without ``image_sync``: the new files replace every image."""
+    return {'images': [{'upload': index} for index in range(upload_count)], 'delete': list(existing_ids)}
+
+def sync_product_images(product, instructions, uploads, requested_by=None):
+    """Apply ``instructions`` to ``product``'s images and return the media tasks of new files."""
+    existing = {image.id: image for image in ProductImage.objects.select_for_update().filter(product=product)}
+    order, delete_ids, primary = parse_image_sync(instructions, existing, len(uploads))
+
+    if primary is None and order:
+        current = next((('id', image_id) for image_id, image in existing.items()
+                        if image.is_primary and ('id', image_id) in order), None)
+        primary = current or order[0]
+
+    if delete_ids:
+        # Model deletes, so the post_delete signal queues removal of each image's files
+        ProductImage.objects.filter(pk__in=delete_ids).delete()
+
+    changed = []
+    tasks = []
+    for position, (kind, ref) in enumerate(order):
+        is_primary = (kind, ref) == primary
+        if kind == 'upload':
+            tasks.append(queue_product_image(product, uploads[ref], position, is_primary, requested_by))
+            continue
+        image = existing[ref]
+        if image.position != position or image.is_primary != is_primary:
+            image.position = position
+            image.is_primary = is_primary
+            changed.append(image)
+    if changed:
+        ProductImage.objects.bulk_update(changed, ['position', 'is_primary'])
+    return tasks
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from products.models import ProductImage
+from products.renditions import pending_images, process_images, rendition_formats
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive renditions and metadata for product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render images that already have renditions')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of images rendered per batch')
+        parser.add_argument('--workers', type=int, help='Rendering threads (default IMAGE_RENDITION_WORKERS)')
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image='') if options['all'] else pending_images()
+        ids = list(images.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f"Rendering {len(ids)} images as {', '.join(rendition_formats())}")
+        rendered = 0
+        for start in range(0, len(ids), options['batch_size']):
+            batch = ProductImage.objects.filter(pk__in=ids[start:start + options['batch_size']])
+            rendered += process_images(list(batch), workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} images'))
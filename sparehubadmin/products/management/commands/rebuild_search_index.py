@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from products.models import Product
+from products.search import get_search_backend, reindex_queryset
+
+
+class Command(BaseCommand):
+    help = 'Rebuild product search documents and the search backend index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of products indexed per batch')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f'Indexing products with {backend.__class__.__name__}')
+        indexed = reindex_queryset(Product.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} products'))
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-17 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_postgres_search_indexes(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other databases use ProductSearchTerm
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    Product = apps.get_model('products', 'Product')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.add_index(Product, GinIndex(
+        SearchVector('search_document', config='simple'), name='products_search_document_fts'
+    ))
+    schema_editor.add_index(Product, GinIndex(
+        fields=['search_document'], name='products_search_document_trgm', opclasses=['gin_trgm_ops']
+    ))
+
+
+def drop_postgres_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS products_search_document_fts')
+    schema_editor.execute('DROP INDEX IF EXISTS products_search_document_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='products.product')),
+            ],
+            options={
+                'unique_together': {('term', 'product')},
+            },
+        ),
+        migrations.RunPython(create_postgres_search_indexes, drop_postgres_search_indexes),
+    ]
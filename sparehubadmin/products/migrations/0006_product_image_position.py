@@ -0,0 +1,47 @@
+# Generated by Django 5.1.4 on 2026-10-17 12:39
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def number_images(apps, schema_editor):
+    """Positions follow the previous id order; the first image of each product keeps 0."""
+    ProductImage = apps.get_model('products', 'ProductImage')
+    rows = ProductImage.objects.order_by('product_id', 'id').values_list('id', 'product_id')
+    changed = []
+    product_id, position = None, 0
+    for image_id, image_product_id in rows.iterator(chunk_size=BATCH_SIZE):
+        position = position + 1 if image_product_id == product_id else 0
+        product_id = image_product_id
+        if position:
+            changed.append(ProductImage(id=image_id, position=position))
+        if len(changed) >= BATCH_SIZE:
+            ProductImage.objects.bulk_update(changed, ['position'])
+            changed = []
+    if changed:
+        ProductImage.objects.bulk_update(changed, ['position'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='productimage',
+            options={'ordering': ['position', 'id'], 'verbose_name_plural': 'Product Images'},
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(number_images, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', 'position'], name='product_image_position_idx'),
+        ),
+    ]
@@ -72,20 +72,68 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=False)
+    # Normalised terms maintained by products.search; see search.build_search_document
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Incremented on every write; bulk updates compare it to reject stale changes
+    version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Composite indexes serve the catalog filters everywhere; the partial ones
+        # are only created on backends that support them (not MySQL)
+        indexes = [
+            models.Index(fields=['is_active', 'is_approved', 'created_at'], name='product_visible_created_idx'),
+            models.Index(fields=['is_active', 'is_approved', 'price'], name='product_visible_price_idx'),
+            models.Index(fields=['manufacturer', 'created_at'], name='product_manufacturer_idx'),
+            models.Index(fields=['category', 'subcategory'], name='product_category_idx'),
+            # Low and out-of-stock filters (products.facets.LOW_STOCK_THRESHOLD); in-stock
+            # matches most rows, where an index would not be used anyway
+            models.Index(
+                fields=['stock_quantity'], name='product_low_stock_idx',
+                condition=models.Q(stock_quantity__lte=10),
+            ),
+            models.Index(
+                fields=['created_at'], name='product_featured_idx',
+                condition=models.Q(is_featured=True, is_active=True, is_approved=True),
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
+class ProductSearchTerm(models.Model):
+    """Inverted-index posting used by the portable search backend."""
+    term = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ['term', 'product']
+
+    def __str__(self):
+        return f"{self.term} -> {self.product_id}"
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='product_images/', blank=True, null=True)
     is_primary = models.BooleanField(default=False)
+    position = models.PositiveIntegerField(default=0)
+    # Filled in by products.renditions; width stays null until the image is processed
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    bytes = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    # {size name: {format: {"name", "width", "height", "bytes"}}}
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name_plural = 'Product Images'
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(fields=['product', 'position'], name='product_image_position_idx'),
+        ]
 
     def __str__(self):
         return f"Image for {self.product.name}"
@@ -96,8 +144,34 @@ class ProductVariant(models.Model):
     sku = models.CharField(max_length=100, unique=True)
     price_modifier = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     stock_quantity = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.product.name} - {self.name}"
+
+class ProductChangeEvent(models.Model):
+    """Append-only record of a price/stock change, for ERP syncs and auditing."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='change_events')
+    variant = models.ForeignKey(
+        ProductVariant, on_delete=models.SET_NULL, null=True, blank=True, related_name='change_events'
+    )
+    sku = models.CharField(max_length=100)
+    source = models.CharField(max_length=50)
+    # {field: [old, new]} with decimals as strings
+    changes = models.JSONField()
+    version = models.PositiveIntegerField()
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='product_change_product_idx'),
+            models.Index(fields=['created_at'], name='product_change_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} v{self.version} ({self.source})"
@@ -0,0 +1,162 @@
+"""Responsive renditions of product images.
+
+Each processed ``ProductImage`` gets downscaled copies at ``RENDITION_SIZES``
+(longest side, never upscaled) in every ``IMAGE_RENDITION_FORMATS`` format
+Pillow can encode here, plus the original's dimensions, size in bytes and
+dominant colour for placeholders. The metadata is stored on the image in
+``ProductImage.renditions``, so serializers build ``srcset`` maps without
+extra queries.
+
+Pillow releases the GIL while decoding, resampling and encoding, so images
+are rendered in a thread pool; only the calling thread touches the database.
+New uploads are rendered by the media worker (``uploads.tasks``) and
+``manage.py generate_renditions`` backfills existing images.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .cache import bump_catalog_version
+from .models import Product, ProductImage
+
+logger = logging.getLogger(__name__)
+
+# name -> longest side in pixels, smallest first
+RENDITION_SIZES = {'thumb': 160, 'small': 320, 'medium': 640, 'large': 1280}
+# Rendition served as ``primary_image`` in product lists
+LIST_RENDITION = 'small'
+RENDITION_DIRECTORY = 'product_images/renditions'
+FORMAT_OPTIONS = {
+    'avif': {'format': 'AVIF', 'quality': 60},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def rendition_formats():
+    """Configured formats this Pillow build can encode, in preference order."""
+    Image.init()
+    formats = [name.strip().lower() for name in settings.IMAGE_RENDITION_FORMATS if name.strip()]
+    supported = [name for name in formats if name in FORMAT_OPTIONS and FORMAT_OPTIONS[name]['format'] in Image.SAVE]
+    return supported or ['jpeg']
+
+def dominant_color(image):
+    """Hex colour of the most common of a few quantized colours."""
+    small = image.convert('RGB').resize((64, 64), Image.Resampling.BILINEAR)
+    palette_image = small.quantize(colors=5)
+    count, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+def rendition_targets(width, height):
+    """``(name, longest side)`` pairs for an original, skipping sizes that would upscale it."""
+    longest = max(width, height)
+    targets = []
+    for name, size in RENDITION_SIZES.items():
+        target = min(size, longest)
+        if targets and targets[-1][1] == target:
+            break
+        targets.append((name, target))
+    return targets
+
+def encode(image, file_format):
+    options = dict(FORMAT_OPTIONS[file_format])
+    if file_format == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+def render(product_image):
+    """Write the renditions of one image and return its metadata fields.
+
+    Runs in worker threads, so it only reads and writes files.
+    """
+    field = product_image.image
+    storage = field.storage
+    stem = os.path.splitext(os.path.basename(field.name))[0]
+    try:
+        with storage.open(field.name, 'rb') as source, Image.open(source) as original:
+            original = ImageOps.exif_transpose(original)
+            original.load()
+            source_bytes = storage.size(field.name)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Cannot render product image {product_image.pk} ({field.name}): {str(e)}")
+        # Zero dimensions mark the image as processed so it is not retried
+        return {'width': 0, 'height': 0, 'bytes': 0, 'dominant_color': '', 'renditions': {}}
+
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info or original.mode in ('LA', 'PA') else 'RGB')
+    renditions = {}
+    for name, size in rendition_targets(*original.size):
+        resized = original.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        renditions[name] = {}
+        for file_format in rendition_formats():
+            data = encode(resized, file_format)
+            path = storage.save(
+                f'{RENDITION_DIRECTORY}/{product_image.pk}-{stem}-{name}.{file_format}', ContentFile(data)
+            )
+            renditions[name][file_format] = {
+                'name': path, 'width': resized.width, 'height': resized.height, 'bytes': len(data),
+            }
+    return {
+        'width': original.width,
+        'height': original.height,
+        'bytes': source_bytes,
+        'dominant_color': dominant_color(original),
+        'renditions': renditions,
+    }
+
+def rendition_files(renditions):
+    return [entry['name'] for formats in (renditions or {}).values() for entry in formats.values()]
+
+def delete_files(names, storage=None):
+    storage = storage or ProductImage._meta.get_field('image').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError as e:
+            logger.warning(f"Could not delete rendition {name}: {str(e)}")
+
+def process_images(images, workers=None):
+    """Render ``images`` in a thread pool, save their metadata and return how many were processed."""
+    images = [image for image in images if image.image]
+    if not images:
+        return 0
+    workers = workers or settings.IMAGE_RENDITION_WORKERS
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(render, images))
+    for image, fields in zip(images, results):
+        ProductImage.objects.filter(pk=image.pk).update(**fields)
+        # Files only the previous renditions used; shared content-addressed blobs are left in place
+        delete_files(
+            set(rendition_files(image.renditions)) - set(rendition_files(fields['renditions'])), image.image.storage
+        )
+    # Detail ETags and cached catalog lists include image URLs
+    Product.objects.filter(pk__in={image.product_id for image in images}).update(updated_at=timezone.now())
+    bump_catalog_version()
+    logger.info(f"Rendered {len(images)} product images")
+    return len(images)
+
+def pending_images(product_ids=None):
+    images = ProductImage.objects.filter(width__isnull=True).exclude(image='').exclude(image__isnull=True)
+    if product_ids is not None:
+        images = images.filter(product_id__in=product_ids)
+    return images
+
+def srcset(product_image, build_url):
+    """``{size name: url}`` of an image's renditions in the preferred available format."""
+    renditions = product_image.renditions or {}
+    urls = {}
+    for name in RENDITION_SIZES:
+        formats = renditions.get(name) or {}
+        file_format = next((file_format for file_format in rendition_formats() if file_format in formats), None)
+        file_format = file_format or next(iter(formats), None)
+        if file_format:
+            urls[name] = build_url(product_image.image.storage.url(formats[file_format]['name']))
+    return urls
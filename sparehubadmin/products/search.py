@@ -0,0 +1,295 @@
+"""Product search backends.
+
+Every product carries a normalised ``search_document`` built from its name,
+SKU, brand, category, subcategory, material and description. How that
+document is queried depends on the database:
+
+* PostgreSQL matches a GIN-indexed ``to_tsvector`` of the document with
+  prefix tsqueries, ranks with ``ts_rank`` and falls back to ``pg_trgm``
+  word similarity when nothing matches (typo tolerance).
+* Other databases (MySQL, SQLite) use ``ProductSearchTerm``, an inverted
+  index of ``(term, product, weight)`` postings maintained by this module.
+  Query terms match exactly, by prefix (a B-tree range scan) or, when a
+  term has no hit at all, against vocabulary terms within a small edit
+  distance.
+
+Both backends require every query term to match, so results narrow as the
+user types.
+"""
+import re
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Length
+from django.utils.module_loading import import_string
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+SEPARATOR_RE = re.compile(r'[\W_]+')
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+MIN_TYPO_TERM_LENGTH = 4
+TYPO_CANDIDATE_LIMIT = 500
+INDEX_BATCH_SIZE = 500
+
+# Posting weight per product field; the highest weight wins for a term
+FIELD_WEIGHTS = {
+    'sku': 8,
+    'name': 4,
+    'brand': 2,
+    'category': 1,
+    'subcategory': 1,
+    'material': 1,
+    'description': 1,
+}
+
+# Rank multiplier by how a query term matched a posting
+EXACT_MATCH, PREFIX_MATCH, TYPO_MATCH = 4, 2, 1
+
+def tokenize(text):
+    """Lowercase word tokens of ``text``, truncated to the indexed term length."""
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall((text or '').lower())]
+
+def compact(text):
+    """Part-number form with separators removed: ``'BP-12/A'`` -> ``'bp12a'``."""
+    return SEPARATOR_RE.sub('', (text or '').lower())[:MAX_TERM_LENGTH]
+
+def product_fields(product):
+    return {
+        'sku': product.sku,
+        'name': product.name,
+        'brand': product.brand.name if product.brand_id else '',
+        'category': product.category.name if product.category_id else '',
+        'subcategory': product.subcategory.name if product.subcategory_id else '',
+        'material': product.material,
+        'description': product.description,
+    }
+
+def product_terms(product):
+    """Return ``{term: weight}`` for a product, including the compact SKU."""
+    terms = {}
+    for field, text in product_fields(product).items():
+        tokens = tokenize(text)
+        if field == 'sku' and compact(text):
+            tokens.append(compact(text))
+        for token in tokens:
+            terms[token] = max(terms.get(token, 0), FIELD_WEIGHTS[field])
+    return terms
+
+def build_search_document(product):
+    """Space-separated terms, highest weight first, for ``Product.search_document``."""
+    terms = product_terms(product)
+    return ' '.join(sorted(terms, key=lambda term: -terms[term]))
+
+def query_terms(query):
+    terms = []
+    for token in tokenize(query):
+        if token not in terms:
+            terms.append(token)
+    return terms[:MAX_QUERY_TERMS]
+
+def prefix_q(field, prefix):
+    """Index-friendly ``startswith``: a half-open range instead of ``LIKE``."""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+def typo_limit(term):
+    return 1 if len(term) < 8 else 2
+
+
+class SearchBackend:
+    """Interface shared by the search backends."""
+
+    def index_products(self, products):
+        """Refresh the index for already-saved products."""
+
+    def search(self, queryset, query):
+        """Filter ``queryset`` to matches of ``query``, annotated and ordered by ``search_rank``."""
+        raise NotImplementedError
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    """Portable backend over the ``ProductSearchTerm`` postings table."""
+
+    def index_products(self, products):
+        from .models import ProductSearchTerm
+        products = list(products)
+        if not products:
+            return
+        postings = [
+            ProductSearchTerm(term=term, product_id=product.id, weight=weight)
+            for product in products
+            for term, weight in product_terms(product).items()
+        ]
+        with transaction.atomic():
+            ProductSearchTerm.objects.filter(product_id__in=[product.id for product in products]).delete()
+            ProductSearchTerm.objects.bulk_create(postings, batch_size=INDEX_BATCH_SIZE)
+
+    def typo_candidates(self, term):
+        """Vocabulary terms within the typo limit of ``term``.
+
+        Candidates share the first two characters (in either order), which
+        keeps the lookup a pair of index range scans.
+        """
+        from .models import ProductSearchTerm
+        if len(term) < MIN_TYPO_TERM_LENGTH:
+            return []
+        limit = typo_limit(term)
+        prefixes = {term[:2], term[1] + term[0]}
+        vocabulary = ProductSearchTerm.objects.annotate(
+            term_length=Length('term')
+        ).filter(
+            term_length__gte=len(term) - limit,
+            term_length__lte=len(term) + limit
+        )
+        candidates = set()
+        for prefix in prefixes:
+            candidates.update(
+                vocabulary.filter(prefix_q('term', prefix))
+                .order_by('term').values_list('term', flat=True).distinct()[:TYPO_CANDIDATE_LIMIT]
+            )
+        return [candidate for candidate in candidates if edit_distance(term, candidate, limit) <= limit]
+
+    def term_condition(self, term):
+        """Return ``(Q over postings, rank expression)`` for one query term."""
+        from .models import ProductSearchTerm
+        exact = Q(search_terms__term=term)
+        prefix = prefix_q('search_terms__term', term)
+        condition = exact | prefix
+        whens = [
+            When(exact, then=F('search_terms__weight') * EXACT_MATCH),
+            When(prefix, then=F('search_terms__weight') * PREFIX_MATCH),
+        ]
+        if not ProductSearchTerm.objects.filter(prefix_q('term', term)).exists():
+            typos = self.typo_candidates(term)
+            if typos:
+                typo = Q(search_terms__term__in=typos)
+                condition |= typo
+                whens.append(When(typo, then=F('search_terms__weight') * TYPO_MATCH))
+        return condition, Max(Case(*whens, default=Value(0), output_field=IntegerField()))
+
+    def search(self, queryset, query):
+        terms = query_terms(query)
+        if not terms:
+            return queryset.none()
+        conditions = Q()
+        ranks = {}
+        for index, term in enumerate(terms):
+            condition, rank = self.term_condition(term)
+            conditions |= condition
+            ranks[f'_term_rank_{index}'] = rank
+        queryset = queryset.filter(conditions).annotate(**ranks).filter(
+            **{f'{name}__gt': 0 for name in ranks}
+        )
+        search_rank = sum((F(name) for name in ranks), Value(0))
+        return queryset.annotate(search_rank=search_rank).order_by('-search_rank', '-id')
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Full-text search over the GIN-indexed ``to_tsvector`` of the search document."""
+
+    config = 'simple'
+    trigram_threshold = 0.3
+
+    def search_vector(self):
+        from django.contrib.postgres.search import SearchVector
+        # Must match the expression of the products_search_document_fts index
+        return SearchVector('search_document', config=self.config)
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+        terms = query_terms(query)
+        if not terms:
+            return queryset.none()
+        # Terms are alphanumeric, so the raw tsquery needs no escaping
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms), config=self.config, search_type='raw'
+        )
+        vector = self.search_vector()
+        sku_boost = Case(
+            When(sku__istartswith=query.strip(), then=Value(1.0)),
+            default=Value(0.0)
+        )
+        matches = queryset.annotate(_search_vector=vector).filter(_search_vector=search_query)
+        if matches.exists():
+            return matches.annotate(
+                search_rank=SearchRank(vector, search_query) + sku_boost
+            ).order_by('-search_rank', '-id')
+
+        # The <% operator can use the products_search_document_trgm index; filtering on the
+        # annotated similarity would compute it for every product
+        text = ' '.join(terms)
+        self.set_trigram_threshold(queryset.db)
+        return queryset.filter(TrigramWordSimilar(F('search_document'), text)).annotate(
+            search_rank=TrigramWordSimilarity(text, 'search_document')
+        ).order_by('-search_rank', '-id')
+
+    def set_trigram_threshold(self, alias):
+        """Set the word similarity ``<%`` requires for this connection; pg_trgm defaults to 0.6."""
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(self.trigram_threshold)]
+            )
+
+
+_backend = None
+
+def get_search_backend():
+    """Backend from ``PRODUCT_SEARCH_BACKEND``, else chosen by database vendor."""
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+        if backend_path:
+            _backend = import_string(backend_path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        else:
+            _backend = InvertedIndexSearchBackend()
+    return _backend
+
+def search_products(queryset, query):
+    return get_search_backend().search(queryset, query)
+
+def index_products(products):
+    """Rebuild ``search_document`` and backend postings for ``products``.
+
+    Bulk writes (``bulk_create``/``update``) bypass the save signals and
+    must call this explicitly.
+    """
+    from .models import Product
+    products = list(products)
+    for product in products:
+        product.search_document = build_search_document(product)
+    Product.objects.bulk_update(products, ['search_document'], batch_size=INDEX_BATCH_SIZE)
+    get_search_backend().index_products(products)
+
+def reindex_queryset(queryset, batch_size=INDEX_BATCH_SIZE):
+    """Reindex products from ``queryset`` in id-ordered batches; returns the count."""
+    queryset = queryset.select_related('brand', 'category', 'subcategory').order_by('id')
+    last_id = 0
+    indexed = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return indexed
+        index_products(batch)
+        indexed += len(batch)
+        last_id = batch[-1].id
@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from .models import Product, Category, Subcategory, Brand, ProductImage
+from .image_sync import replace_all, sync_product_images
+from .renditions import LIST_RENDITION, srcset
 from users.models import User
+from uploads.serializers import MediaTaskSerializer
+from uploads.sessions import claim_upload_session, claim_upload_sessions, upload_ids
+from uploads.tasks import copy_request_data, queue_product_images, queue_product_pdf
 import logging
 
 # Set up logging
@@ -36,10 +41,11 @@ class BrandSerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'is_primary', 'created_at']
+        fields = ['id', 'image', 'is_primary', 'position', 'width', 'height', 'dominant_color', 'srcset', 'created_at']
 
     def get_image(self, obj):
         if obj.image:
@@ -47,6 +53,12 @@ class ProductImageSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url) if request else obj.image.url
         return None
 
+    def get_srcset(self, obj):
+        if not obj.image:
+            return {}
+        request = self.context.get('request')
+        return srcset(obj, request.build_absolute_uri if request else str)
+
 class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
@@ -81,17 +93,17 @@ class ProductSerializer(serializers.ModelSerializer):
             'subcategory', 'subcategory_id', 'manufacturer', 'price', 'discount', 'stock_quantity',
             'min_order_quantity', 'max_order_quantity', 'weight', 'dimensions', 'material', 'color',
             'technical_specification_pdf', 'installation_guide_pdf', 'shipping_cost', 'shipping_time',
-            'origin_country', 'is_active', 'is_featured', 'is_approved', 'created_at', 'updated_at',
+            'origin_country', 'is_active', 'is_featured', 'is_approved', 'version', 'created_at', 'updated_at',
             'images'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'is_approved']
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at', 'is_approved']
 
     def to_internal_value(self, data):
         # Log the incoming data for debugging
         logger.info(f"Received data in to_internal_value: {data}")
 
         # Convert string IDs to integers for multipart form data
-        mutable_data = data.copy()
+        mutable_data = copy_request_data(data)
         for field in ['category_id', 'subcategory_id', 'brand_id', 'manufacturer']:
             if field in mutable_data and mutable_data[field]:
                 try:
@@ -213,6 +225,7 @@ class ProductSerializer(serializers.ModelSerializer):
                 images = request_files.getlist('images', [])
                 technical_pdf = request_files.get('technical_specification_pdf', technical_pdf)
                 installation_pdf = request_files.get('installation_guide_pdf', installation_pdf)
+                images, technical_pdf, installation_pdf = self.add_upload_sessions(images, technical_pdf, installation_pdf)
 
                 for image in images:
                     if not image.content_type.startswith('image/'):
@@ -234,22 +247,13 @@ class ProductSerializer(serializers.ModelSerializer):
 
                 product = Product.objects.create(
                     manufacturer=manufacturer,
-                    technical_specification_pdf=technical_pdf,
-                    installation_guide_pdf=installation_pdf,
                     **validated_data
                 )
 
-                if images:
-                    image_objects = []
-                    for index, image in enumerate(images):
-                        image_objects.append(
-                            ProductImage(
-                                product=product,
-                                image=image,
-                                is_primary=(index == 0)
-                            )
-                        )
-                    ProductImage.objects.bulk_create(image_objects)
+                # Files are stored and validated by the media worker
+                user = self.context.get('request').user
+                product._media_tasks = queue_product_images(product, images, requested_by=user)
+                product._media_tasks += self.queue_pdfs(product, technical_pdf, installation_pdf)
 
                 logger.info(
                     'Product created successfully: id=%s, sku=%s',
@@ -259,6 +263,8 @@ class ProductSerializer(serializers.ModelSerializer):
 
                 return product
 
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             logger.error(
                 'Failed to create product: %s\nData: %s',
@@ -271,15 +277,49 @@ class ProductSerializer(serializers.ModelSerializer):
                 ]
             })
 
+    def add_upload_sessions(self, images, technical_pdf, installation_pdf):
+        """Add the chunked uploads named by ``image_uploads`` and ``<pdf field>_upload`` (``uploads.sessions``).
+
+        Their images follow the ``images`` files, so ``image_sync`` upload indexes count across both.
+        """
+        request = self.context.get('request')
+        try:
+            images = list(images) + claim_upload_sessions(upload_ids(request.data, 'image_uploads'), request.user)
+            technical_pdf = technical_pdf or claim_upload_session(request.data.get('technical_specification_pdf_upload'), request.user)
+            installation_pdf = installation_pdf or claim_upload_session(request.data.get('installation_guide_pdf_upload'), request.user)
+        except ValueError as e:
+            raise serializers.ValidationError({'uploads': [str(e)]})
+        return images, technical_pdf, installation_pdf
+
+    def queue_pdfs(self, product, technical_pdf, installation_pdf):
+        user = self.context.get('request').user
+        return [
+            queue_product_pdf(product, field, pdf, requested_by=user)
+            for field, pdf in [('technical_specification_pdf', technical_pdf), ('installation_guide_pdf', installation_pdf)]
+            if pdf
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        media_tasks = getattr(instance, '_media_tasks', None)
+        if media_tasks:
+            # Poll /api/uploads/tasks/<id>/ until each is completed or failed
+            data['media_tasks'] = MediaTaskSerializer(media_tasks, many=True, context=self.context).data
+        return data
+
     def update(self, instance, validated_data):
         from django.db import transaction
         
         try:
             with transaction.atomic():
-                request_files = self.context.get('request').FILES
+                request = self.context.get('request')
+                request_files = request.FILES
                 images = request_files.getlist('images', [])
+                # Keep/delete/reorder/primary instructions; see products.image_sync
+                image_sync = request.data.get('image_sync')
                 technical_pdf = validated_data.pop('technical_specification_pdf', request_files.get('technical_specification_pdf', None))
                 installation_pdf = validated_data.pop('installation_guide_pdf', request_files.get('installation_guide_pdf', None))
+                images, technical_pdf, installation_pdf = self.add_upload_sessions(images, technical_pdf, installation_pdf)
 
                 for image in images:
                     if not image.content_type.startswith('image/'):
@@ -302,26 +342,20 @@ class ProductSerializer(serializers.ModelSerializer):
                 for attr, value in validated_data.items():
                     setattr(instance, attr, value)
 
-                if technical_pdf:
-                    instance.technical_specification_pdf = technical_pdf
-                if installation_pdf:
-                    instance.installation_guide_pdf = installation_pdf
-
                 instance.save()
 
-                if images:
-                    instance.images.all().delete()
-                    
-                    image_objects = []
-                    for index, image in enumerate(images):
-                        image_objects.append(
-                            ProductImage(
-                                product=instance,
-                                image=image,
-                                is_primary=(index == 0)
-                            )
-                        )
-                    ProductImage.objects.bulk_create(image_objects)
+                if image_sync is None and images:
+                    # Clients that do not send instructions replace every image, as before
+                    image_sync = replace_all(instance.images.values_list('id', flat=True), len(images))
+                media_tasks = []
+                if image_sync is not None:
+                    try:
+                        media_tasks = sync_product_images(instance, image_sync, images, requested_by=request.user)
+                    except ValueError as e:
+                        raise serializers.ValidationError({'image_sync': [str(e)]})
+
+                # Files are stored and validated by the media worker
+                instance._media_tasks = media_tasks + self.queue_pdfs(instance, technical_pdf, installation_pdf)
 
                 logger.info(
                     'Product updated successfully: id=%s, sku=%s',
@@ -331,6 +365,8 @@ class ProductSerializer(serializers.ModelSerializer):
 
                 return instance
 
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             logger.error(
                 'Failed to update product: %s\nProduct ID: %s\nData: %s',
@@ -342,4 +378,104 @@ class ProductSerializer(serializers.ModelSerializer):
                 'non_field_errors': [
                     'Failed to update product: %s' % str(e)
                 ]
-            })
\ No newline at end of file
+            })
+
+def parse_field_list(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """Flat product representation for list endpoints.
+
+    ``?fields=`` limits the output to the named fields and ``?expand=`` adds
+    the full nested ``category``, ``subcategory``, ``brand`` or ``images``.
+    ``optimize_queryset`` picks the joins those fields need, so a page costs
+    the same number of queries whatever its size.
+    """
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
+    brand_name = serializers.CharField(source='brand.name', read_only=True, allow_null=True)
+    primary_image = serializers.SerializerMethodField()
+
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, read_only=True)
+    discount = serializers.DecimalField(max_digits=5, decimal_places=2, coerce_to_string=False, read_only=True)
+    shipping_cost = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, read_only=True)
+
+    # name -> (serializer class, kwargs)
+    expandable_fields = {
+        'category': (CategorySerializer, {}),
+        'subcategory': (SubcategorySerializer, {}),
+        'brand': (BrandSerializer, {}),
+        'images': (ProductImageSerializer, {'many': True}),
+    }
+    # output field -> select_related path
+    select_related_fields = {
+        'category_name': 'category',
+        'subcategory_name': 'subcategory',
+        'brand_name': 'brand',
+        'category': 'category',
+        'subcategory': 'subcategory__category',
+        'brand': 'brand',
+    }
+    # output field -> prefetch_related path
+    prefetch_related_fields = {
+        'primary_image': 'images',
+        'images': 'images',
+    }
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'sku', 'manufacturer_id', 'category_id', 'category_name',
+            'subcategory_id', 'subcategory_name', 'brand_id', 'brand_name', 'price', 'discount',
+            'stock_quantity', 'min_order_quantity', 'max_order_quantity', 'shipping_cost',
+            'is_active', 'is_featured', 'is_approved', 'primary_image', 'version', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+        requested, expand = self.requested_fields(request.query_params)
+        for name in list(self.fields):
+            if name not in requested:
+                self.fields.pop(name)
+        for name in expand:
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+
+    @classmethod
+    def requested_fields(cls, query_params):
+        """Return ``(flat field names, expanded field names)`` for the query params."""
+        expand = [name for name in parse_field_list(query_params.get('expand')) if name in cls.expandable_fields]
+        fields = parse_field_list(query_params.get('fields'))
+        if fields:
+            requested = [name for name in fields if name in cls.Meta.fields]
+        else:
+            requested = list(cls.Meta.fields)
+        return requested, expand
+
+    @classmethod
+    def optimize_queryset(cls, queryset, query_params):
+        requested, expand = cls.requested_fields(query_params)
+        names = requested + expand
+        select = {cls.select_related_fields[name] for name in names if name in cls.select_related_fields}
+        prefetch = {cls.prefetch_related_fields[name] for name in names if name in cls.prefetch_related_fields}
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        return queryset
+
+    def get_primary_image(self, obj):
+        images = list(obj.images.all())
+        if not images:
+            return None
+        image = next((image for image in images if image.is_primary), images[0])
+        if not image.image:
+            return None
+        request = self.context.get('request')
+        # The list rendition once it is generated, the original until then
+        url = srcset(image, str).get(LIST_RENDITION) or image.image.url
+        return request.build_absolute_uri(url) if request else url
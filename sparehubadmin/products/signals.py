@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .cache import bump_catalog_version
+from .models import Brand, Category, Product, ProductImage, ProductVariant, Subcategory
+from .renditions import rendition_files
+from .search import build_search_document, get_search_backend, reindex_queryset
+from uploads.tasks import queue_file_deletion
+
+SEARCH_SOURCE_FIELDS = {'name', 'sku', 'description', 'material', 'brand', 'category', 'subcategory'}
+
+@receiver(pre_save, sender=Product)
+def set_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.search_document = build_search_document(instance)
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=ProductVariant)
+def bump_version(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Saves limited to other fields would not persist the new version
+    if raw or instance._state.adding or (update_fields is not None and 'version' not in update_fields):
+        return
+    # Incremented in SQL: the instance may predate a bulk stock update or checkout that bumped it with F()
+    instance.version = F('version') + 1
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+def load_version(sender, instance, raw=False, **kwargs):
+    # Registered before the other post_save receivers so they see the stored number
+    if hasattr(instance.version, 'resolve_expression'):
+        instance.refresh_from_db(fields=['version'])
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None:
+        if not SEARCH_SOURCE_FIELDS.intersection(update_fields):
+            return
+        if 'search_document' not in update_fields:
+            Product.objects.filter(pk=instance.pk).update(search_document=instance.search_document)
+    get_search_backend().index_products([instance])
+
+@receiver(pre_save, sender=Brand)
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Subcategory)
+def remember_name_change(sender, instance, raw=False, **kwargs):
+    instance._search_name_changed = bool(
+        not raw and instance.pk and
+        sender.objects.filter(pk=instance.pk).exclude(name=instance.name).exists()
+    )
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Subcategory)
+def reindex_renamed(sender, instance, **kwargs):
+    if not getattr(instance, '_search_name_changed', False):
+        return
+    lookup = {Brand: 'brand', Category: 'category', Subcategory: 'subcategory'}[sender]
+    transaction.on_commit(lambda: reindex_queryset(Product.objects.filter(**{lookup: instance})))
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_catalog_cache(sender, **kwargs):
+    # After commit, so a concurrent request cannot cache pre-commit data under the new version
+    transaction.on_commit(bump_catalog_version)
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_files(sender, instance, **kwargs):
+    # Queued in the deleting transaction, so a rollback keeps the files
+    queue_file_deletion([instance.image.name, *rendition_files(instance.renditions)])
@@ -0,0 +1,180 @@
+"""Bulk price and stock updates for ERP syncs.
+
+Items are matched by product or variant SKU and applied in short
+transactions of ``BULK_STOCK_BATCH_SIZE`` rows: the batch's rows are locked
+with one query per model, compared with the requested values, written with
+``bulk_update`` and logged as ``ProductChangeEvent`` rows. Items may carry
+the ``version`` the client last saw; a row changed since then is reported
+as a conflict instead of being overwritten. Rows whose values already match
+are left untouched, so frequent full syncs only write what changed.
+"""
+import logging
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from .bulk_import import MAX_REPORTED_ERRORS, clean_text, parse_decimal, parse_integer
+from .cache import bump_catalog_version
+from .models import Product, ProductChangeEvent, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+BULK_STOCK_BATCH_SIZE = 500
+MAX_BULK_STOCK_ITEMS = 50000
+
+# field: parser; variants are priced relative to their product
+PRODUCT_FIELDS = {
+    'stock_quantity': lambda value: parse_integer(value, 0),
+    'price': lambda value: parse_decimal(value, 10, 2, 0, None),
+    'discount': lambda value: parse_decimal(value, 5, 2, 0, 100),
+}
+VARIANT_FIELDS = {
+    'stock_quantity': lambda value: parse_integer(value, 0),
+    'price_modifier': lambda value: parse_decimal(value, 10, 2, -99999999, None),
+}
+
+# Sent after commit with the ProductChangeEvent rows written by each batch
+products_changed = Signal()
+
+
+def parse_item(item):
+    """Return ``(sku, values, version, errors)`` for one request item."""
+    if not isinstance(item, dict):
+        return None, {}, None, {'non_field_errors': 'Item must be an object.'}
+    sku = clean_text(item.get('sku'))
+    errors = {}
+    if not sku:
+        errors['sku'] = 'This field is required.'
+    values = {}
+    for field in set(PRODUCT_FIELDS) | set(VARIANT_FIELDS):
+        if item.get(field) is None or clean_text(item[field]) == '':
+            continue
+        parser = PRODUCT_FIELDS.get(field) or VARIANT_FIELDS[field]
+        try:
+            values[field] = parser(item[field])
+        except ValueError as e:
+            errors[field] = f'{field.replace("_", " ").capitalize()} {e}.'
+    if not values and not errors:
+        errors['non_field_errors'] = 'Nothing to update; send stock_quantity, price, discount or price_modifier.'
+    version = None
+    if item.get('version') is not None:
+        try:
+            version = parse_integer(item['version'], 1)
+        except ValueError as e:
+            errors['version'] = f'Version {e}.'
+    return sku, values, version, errors
+
+
+class StockUpdater:
+    """Apply price/stock items for one manufacturer and collect a per-item report."""
+
+    def __init__(self, manufacturer, source='bulk_stock', batch_size=BULK_STOCK_BATCH_SIZE):
+        self.manufacturer = manufacturer
+        self.source = source
+        self.batch_size = batch_size
+        self.report = {'processed': 0, 'updated': 0, 'unchanged': 0, 'conflicts': 0, 'failed': 0, 'errors': []}
+
+    def error(self, index, sku, errors, conflict=False):
+        self.report['conflicts' if conflict else 'failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'index': index, 'sku': sku or None, 'errors': errors})
+
+    def run(self, items):
+        batch, seen = [], set()
+        for index, item in enumerate(items):
+            self.report['processed'] += 1
+            sku, values, version, errors = parse_item(item)
+            if not errors and sku in seen:
+                errors = {'sku': 'Duplicate SKU in this request.'}
+            if errors:
+                self.error(index, sku, errors)
+                continue
+            seen.add(sku)
+            batch.append((index, sku, values, version))
+            if len(batch) >= self.batch_size:
+                self.apply_batch(batch)
+                batch = []
+        if batch:
+            self.apply_batch(batch)
+        self.report['errors'].sort(key=lambda error: error['index'])
+        self.report['errors_truncated'] = self.report['conflicts'] + self.report['failed'] > len(self.report['errors'])
+        logger.info(
+            f"Bulk stock update by manufacturer {self.manufacturer.id}: processed={self.report['processed']} "
+            f"updated={self.report['updated']} unchanged={self.report['unchanged']} "
+            f"conflicts={self.report['conflicts']} failed={self.report['failed']}"
+        )
+        return self.report
+
+    def apply_batch(self, batch):
+        skus = [sku for _, sku, _, _ in batch]
+        now = timezone.now()
+        with transaction.atomic():
+            # Locked in id order, like orders.stock.lock_rows, so syncs and checkouts cannot deadlock
+            products = {
+                product.sku: product for product in
+                Product.objects.select_for_update()
+                .filter(manufacturer=self.manufacturer, sku__in=skus)
+                .only('id', 'sku', 'price', 'discount', 'stock_quantity', 'version', 'updated_at')
+                .order_by('id')
+            }
+            variants = {}
+            variant_skus = [sku for sku in skus if sku not in products]
+            if variant_skus:
+                variants = {
+                    variant.sku: variant for variant in
+                    ProductVariant.objects.select_for_update()
+                    .filter(product__manufacturer=self.manufacturer, sku__in=variant_skus)
+                    .only('id', 'sku', 'product_id', 'price_modifier', 'stock_quantity', 'version', 'updated_at')
+                    .order_by('id')
+                }
+
+            changed = {Product: [], ProductVariant: []}
+            changed_fields = {Product: set(), ProductVariant: set()}
+            events = []
+            for index, sku, values, version in batch:
+                target = products.get(sku) or variants.get(sku)
+                if target is None:
+                    self.error(index, sku, {'sku': 'No product or variant with this SKU.'})
+                    continue
+                model = type(target)
+                allowed = PRODUCT_FIELDS if model is Product else VARIANT_FIELDS
+                invalid = sorted(set(values) - set(allowed))
+                if invalid:
+                    kind = 'products' if model is Product else 'variants'
+                    self.error(index, sku, {field: f'Cannot be set on {kind}.' for field in invalid})
+                    continue
+                if version is not None and version != target.version:
+                    self.error(index, sku, {
+                        'version': f'Changed since version {version}; current version is {target.version}.'
+                    }, conflict=True)
+                    continue
+                changes = {
+                    field: [str(getattr(target, field)), str(value)]
+                    for field, value in values.items() if getattr(target, field) != value
+                }
+                if not changes:
+                    self.report['unchanged'] += 1
+                    continue
+                for field in changes:
+                    setattr(target, field, values[field])
+                target.version += 1
+                target.updated_at = now
+                changed[model].append(target)
+                changed_fields[model].update(changes)
+                events.append(ProductChangeEvent(
+                    product_id=target.id if model is Product else target.product_id,
+                    variant_id=target.id if model is ProductVariant else None,
+                    sku=sku,
+                    source=self.source,
+                    changes=changes,
+                    version=target.version,
+                    changed_by=self.manufacturer,
+                ))
+
+            for model, rows in changed.items():
+                if rows:
+                    model.objects.bulk_update(rows, sorted(changed_fields[model]) + ['version', 'updated_at'])
+            if events:
+                ProductChangeEvent.objects.bulk_create(events)
+                transaction.on_commit(lambda: products_changed.send(sender=ProductChangeEvent, events=events))
+                transaction.on_commit(bump_catalog_version)
+        self.report['updated'] += len(events)
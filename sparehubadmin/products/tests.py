@@ -0,0 +1,123 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
+from django.test import TestCase
+from rest_framework.test import APIClient
+from users.models import User
+from .bulk_import import ProductImporter, SkuTaken
+from .models import Brand, Category, Product, Subcategory
+
+HEADER = 'sku,name,category,subcategory,price,weight'
+
+
+def csv_upload(*lines, name='products.csv'):
+    return SimpleUploadedFile(name, '\n'.join(lines).encode('utf-8') + b'\n', content_type='text/csv')
+
+
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manufacturer = User.objects.create_user('maker@example.com', 'maker', 'pw', role='manufacturer')
+        cls.other = User.objects.create_user('rival@example.com', 'rival', 'pw', role='manufacturer')
+        cls.category = Category.objects.create(name='Engine', slug='engine')
+        cls.subcategory = Subcategory.objects.create(category=cls.category, name='Pistons', slug='pistons')
+        Brand.objects.create(name='Bosch')
+
+    def run_import(self, upload, manufacturer=None):
+        return ProductImporter(manufacturer or self.manufacturer).run(upload, 'csv')
+
+    def test_creates_products(self):
+        report = self.run_import(csv_upload(
+            f'{HEADER},brand,stock_quantity',
+            'PST-1,Piston,Engine,Pistons,100,1.5,bosch,20',
+            'PST-2,Ring,engine,pistons,10,0.1,,5',
+        ))
+        self.assertEqual((report['created'], report['updated'], report['failed']), (2, 0, 0))
+        product = Product.objects.get(sku='PST-1')
+        self.assertEqual((product.price, product.stock_quantity, product.brand.name), (Decimal('100.00'), 20, 'Bosch'))
+        self.assertEqual(product.manufacturer, self.manufacturer)
+        self.assertIn('piston', product.search_document.lower())
+
+    def test_update_keeps_columns_the_file_lacks(self):
+        self.run_import(csv_upload(f'{HEADER},stock_quantity,description', 'PST-1,Piston,Engine,Pistons,100,1.5,20,Forged'))
+        version = Product.objects.get(sku='PST-1').version
+        report = self.run_import(csv_upload(HEADER, 'PST-1,Piston XL,Engine,Pistons,120,1.5'))
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        product = Product.objects.get(sku='PST-1')
+        self.assertEqual((product.name, product.price), ('Piston XL', Decimal('120.00')))
+        self.assertEqual((product.stock_quantity, product.description), (20, 'Forged'))
+        self.assertEqual(product.version, version + 1)
+
+    def test_invalid_rows_are_reported_by_row(self):
+        report = self.run_import(csv_upload(
+            HEADER,
+            'PST-1,Piston,Engine,Pistons,100,1.5',
+            'PST-2,Ring,Gearbox,Pistons,abc,1',
+            ',Blank,Engine,Pistons,1,1',
+        ))
+        self.assertEqual((report['processed'], report['created'], report['failed']), (3, 1, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4])
+        self.assertEqual(set(report['errors'][0]['errors']), {'category', 'subcategory', 'price'})
+        self.assertFalse(report['errors_truncated'])
+
+    def test_last_duplicate_row_wins(self):
+        report = self.run_import(csv_upload(
+            HEADER, 'PST-1,First,Engine,Pistons,100,1', 'PST-1,Second,Engine,Pistons,200,1',
+        ))
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+        self.assertEqual(Product.objects.get(sku='PST-1').name, 'Second')
+
+    def test_sku_of_another_manufacturer_is_not_overwritten(self):
+        self.run_import(csv_upload(HEADER, 'PST-1,Theirs,Engine,Pistons,100,1'), manufacturer=self.other)
+        report = self.run_import(csv_upload(
+            HEADER, 'PST-1,Mine,Engine,Pistons,1,1', 'PST-2,Ring,Engine,Pistons,10,1',
+        ))
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['errors'], {'sku': 'This SKU is already in use.'})
+        product = Product.objects.get(sku='PST-1')
+        self.assertEqual((product.name, product.manufacturer), ('Theirs', self.other))
+
+    def test_batch_is_retried_when_a_sku_is_taken_concurrently(self):
+        upsert = ProductImporter.upsert
+        calls = []
+
+        def racing_upsert(importer, products):
+            calls.append(1)
+            if len(calls) == 1:
+                raise SkuTaken('PST-1')
+            return upsert(importer, products)
+
+        with mock.patch.object(ProductImporter, 'upsert', racing_upsert):
+            report = self.run_import(csv_upload(HEADER, 'PST-1,Piston,Engine,Pistons,100,1'))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(report['created'], 1)
+
+    def test_endpoint_requires_a_manufacturer(self):
+        client = APIClient()
+        shop = User.objects.create_user('shop@example.com', 'shop', 'pw', role='shop')
+        client.force_authenticate(shop)
+        upload = csv_upload(HEADER, 'PST-1,Piston,Engine,Pistons,100,1')
+        self.assertEqual(client.post('/api/products/bulk-import/', {'file': upload}).status_code, 403)
+
+        client.force_authenticate(self.manufacturer)
+        upload = csv_upload(HEADER, 'PST-1,Piston,Engine,Pistons,100,1')
+        response = client.post('/api/products/bulk-import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+
+
+class ProductVersionTests(TestCase):
+    def test_saving_a_stale_instance_keeps_other_bumps(self):
+        manufacturer = User.objects.create_user('maker@example.com', 'maker', 'pw', role='manufacturer')
+        category = Category.objects.create(name='Engine', slug='engine')
+        product = Product.objects.create(
+            name='Piston', sku='PST-1', category=category, manufacturer=manufacturer, price=1, weight=1,
+            subcategory=Subcategory.objects.create(category=category, name='Pistons', slug='pistons'),
+        )
+        Product.objects.filter(pk=product.pk).update(version=F('version') + 1)
+        product.name = 'Piston XL'
+        product.save()
+        self.assertEqual(product.version, 3)
+        self.assertEqual(Product.objects.get(pk=product.pk).version, 3)
@@ -1,15 +1,22 @@
 import logging
-from rest_framework import viewsets, permissions, status
+from django.core.cache import cache
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser, MultiPartParser
 from .models import Product, Category, Subcategory, Brand
 from .serializers import (
-    ProductSerializer, CategorySerializer, SubcategorySerializer,
+    ProductSerializer, ProductListSerializer, CategorySerializer, SubcategorySerializer,
     BrandSerializer
 )
+from .bulk_import import ImportFormatError, ProductImporter, detect_format
+from .cache import FACETS_CACHE_TIMEOUT, cached_catalog_data, catalog_cache_key
+from .facets import apply_catalog_filters, compute_facets, filter_params
+from .stock import MAX_BULK_STOCK_ITEMS, StockUpdater
 from users.models import User
-from django.db.models import Q
+from sparehubadmin.conditional import ConditionalGetMixin, conditional_response
+from sparehubadmin.pagination import OptInKeysetPagination
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -23,59 +30,55 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductPagination(OptInKeysetPagination):
+    fallback_class = StandardResultsSetPagination
+
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = ProductPagination
+    keyset_ordering_fields = ('created_at', 'price', 'name')
+    conditional_fields = (
+        'updated_at', 'category__updated_at', 'subcategory__updated_at', 'brand__updated_at',
+        'images__created_at', 'variants__updated_at',
+    )
+    conditional_count_relations = ('images', 'variants')
+
+    def catalog_cache_params(self, request, **params):
+        # Image URLs are absolute, so entries are per host
+        return {'host': request.build_absolute_uri('/'), **params}
+
+    def get_visible_queryset(self):
+        queryset = Product.objects.all()
+        if self.request.user.role == 'manufacturer':
+            logger.info(f"Fetching products for manufacturer: {self.request.user.id}")
+            return queryset.filter(manufacturer=self.request.user)
+        logger.info(f"Fetching products for shop user: {self.request.user.id}")
+        return queryset.filter(is_active=True, is_approved=True)
+
+    def use_list_serializer(self):
+        # Opt-in so existing clients keep the nested ProductSerializer payload
+        params = self.request.query_params
+        return self.action in ('list', 'featured') and ('fields' in params or 'expand' in params)
+
+    def get_serializer_class(self):
+        if self.use_list_serializer():
+            return ProductListSerializer
+        return ProductSerializer
+
+    def optimize_queryset(self, queryset):
+        if self.use_list_serializer():
+            return ProductListSerializer.optimize_queryset(queryset, self.request.query_params)
+        return queryset.select_related(
+            'category', 'subcategory__category', 'brand'
+        ).prefetch_related('images')
 
     def get_queryset(self):
         try:
-            queryset = Product.objects.all()
-            if self.request.user.role == 'manufacturer':
-                logger.info(f"Fetching products for manufacturer: {self.request.user.id}")
-                queryset = queryset.filter(manufacturer=self.request.user)
-            else:
-                logger.info(f"Fetching products for shop user: {self.request.user.id}")
-                queryset = queryset.filter(is_active=True, is_approved=True)
-
-            category_id = self.request.query_params.get('category_id')
-            subcategory_id = self.request.query_params.get('subcategory_id')
-            brand_id = self.request.query_params.get('brand_id')
-            min_price = self.request.query_params.get('min_price')
-            max_price = self.request.query_params.get('max_price')
-            stock_status = self.request.query_params.get('stock_status')
-            search_query = self.request.query_params.get('search')
-
-            if category_id:
-                queryset = queryset.filter(category_id=category_id)
-            if subcategory_id:
-                queryset = queryset.filter(subcategory_id=subcategory_id)
-            if brand_id:
-                queryset = queryset.filter(brand_id=brand_id)
-            if min_price:
-                try:
-                    queryset = queryset.filter(price__gte=float(min_price))
-                except ValueError:
-                    logger.warning(f"Invalid min_price: {min_price}")
-            if max_price:
-                try:
-                    queryset = queryset.filter(price__lte=float(max_price))
-                except ValueError:
-                    logger.warning(f"Invalid max_price: {max_price}")
-            if stock_status:
-                if stock_status == 'in_stock':
-                    queryset = queryset.filter(stock_quantity__gt=10)
-                elif stock_status == 'low_stock':
-                    queryset = queryset.filter(stock_quantity__lte=10, stock_quantity__gt=0)
-                elif stock_status == 'out_of_stock':
-                    queryset = queryset.filter(stock_quantity=0)
-            if search_query:
-                queryset = queryset.filter(
-                    Q(name__icontains=search_query) | Q(sku__icontains=search_query)
-                )
-
-            return queryset
+            queryset = self.get_visible_queryset()
+            queryset = apply_catalog_filters(queryset, filter_params(self.request.query_params))
+            return self.optimize_queryset(queryset)
         except Exception as e:
             logger.error(f"Error in get_queryset: {str(e)}")
             raise
@@ -88,6 +91,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         try:
             serializer.save(manufacturer=self.request.user)
             logger.info(f"Product created by manufacturer: {self.request.user.id}")
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error creating product: {str(e)}")
             raise serializers.ValidationError(f"Failed to create product: {str(e)}")
@@ -105,6 +110,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         try:
             serializer.save(manufacturer=self.request.user)
             logger.info(f"Product updated by manufacturer: {self.request.user.id}")
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error updating product: {str(e)}")
             raise serializers.ValidationError(f"Failed to update product: {str(e)}")
@@ -112,10 +119,14 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def categories(self, request):
         try:
-            categories = Category.objects.filter(is_active=True)
-            serializer = CategorySerializer(categories, many=True, context={'request': request})
-            logger.info(f"Fetched {len(categories)} categories")
-            return Response(serializer.data)
+            categories, etag, cached = cached_catalog_data(
+                'categories', 'public', self.catalog_cache_params(request),
+                lambda: CategorySerializer(
+                    Category.objects.filter(is_active=True), many=True, context={'request': request}
+                ).data
+            )
+            logger.info(f"Fetched {len(categories)} categories (cached={cached})")
+            return conditional_response(request, categories, etag)
         except Exception as e:
             logger.error(f"Error fetching categories: {str(e)}")
             return Response({"detail": "Failed to fetch categories"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -124,12 +135,18 @@ class ProductViewSet(viewsets.ModelViewSet):
     def subcategories(self, request):
         try:
             category_id = request.query_params.get('category_id')
-            subcategories = Subcategory.objects.filter(is_active=True)
-            if category_id:
-                subcategories = subcategories.filter(category_id=category_id)
-            serializer = SubcategorySerializer(subcategories, many=True, context={'request': request})
-            logger.info(f"Fetched {len(subcategories)} subcategories")
-            return Response(serializer.data)
+
+            def build():
+                subcategories = Subcategory.objects.filter(is_active=True)
+                if category_id:
+                    subcategories = subcategories.filter(category_id=category_id)
+                return SubcategorySerializer(subcategories, many=True, context={'request': request}).data
+
+            subcategories, etag, cached = cached_catalog_data(
+                'subcategories', 'public', self.catalog_cache_params(request, category_id=category_id), build
+            )
+            logger.info(f"Fetched {len(subcategories)} subcategories (cached={cached})")
+            return conditional_response(request, subcategories, etag)
         except Exception as e:
             logger.error(f"Error fetching subcategories: {str(e)}")
             return Response({"detail": "Failed to fetch subcategories"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -137,23 +154,86 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def brands(self, request):
         try:
-            brands = Brand.objects.filter(is_active=True)
-            serializer = BrandSerializer(brands, many=True, context={'request': request})
-            logger.info(f"Fetched {len(brands)} brands")
-            return Response(serializer.data)
+            brands, etag, cached = cached_catalog_data(
+                'brands', 'public', self.catalog_cache_params(request),
+                lambda: BrandSerializer(
+                    Brand.objects.filter(is_active=True), many=True, context={'request': request}
+                ).data
+            )
+            logger.info(f"Fetched {len(brands)} brands (cached={cached})")
+            return conditional_response(request, brands, etag)
         except Exception as e:
             logger.error(f"Error fetching brands: {str(e)}")
             return Response({"detail": "Failed to fetch brands"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def facets(self, request):
+        try:
+            params = filter_params(request.query_params)
+            scope = f'manufacturer:{request.user.id}' if request.user.role == 'manufacturer' else 'public'
+            cache_key = catalog_cache_key('facets', scope, params)
+            facets = cache.get(cache_key)
+            cached = facets is not None
+            if not cached:
+                facets = compute_facets(self.get_visible_queryset(), params)
+                cache.set(cache_key, facets, FACETS_CACHE_TIMEOUT)
+            logger.info(f"Fetched product facets (cached={cached})")
+            return Response({**facets, 'cached': cached})
+        except Exception as e:
+            logger.error(f"Error fetching product facets: {str(e)}")
+            return Response({"detail": "Failed to fetch product facets"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def featured(self, request):
         try:
-            featured_products = Product.objects.filter(
-                is_active=True, is_approved=True, is_featured=True
-            )[:10]
-            serializer = ProductSerializer(featured_products, many=True, context={'request': request})
-            logger.info(f"Fetched {len(featured_products)} featured products")
-            return Response(serializer.data)
+            def build():
+                featured_products = self.optimize_queryset(Product.objects.filter(
+                    is_active=True, is_approved=True, is_featured=True
+                ))[:10]
+                return self.get_serializer(featured_products, many=True).data
+
+            params = self.catalog_cache_params(
+                request,
+                fields=request.query_params.get('fields'),
+                expand=request.query_params.get('expand'),
+            )
+            featured_products, etag, cached = cached_catalog_data('featured', 'public', params, build)
+            logger.info(f"Fetched {len(featured_products)} featured products (cached={cached})")
+            return conditional_response(request, featured_products, etag)
         except Exception as e:
             logger.error(f"Error fetching featured products: {str(e)}")
-            return Response({"detail": "Failed to fetch featured products"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"detail": "Failed to fetch featured products"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='bulk-import', permission_classes=[IsManufacturer],
+            parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "Upload a CSV or JSON Lines file in the 'file' field"}, status=status.HTTP_400_BAD_REQUEST)
+        importer = ProductImporter(request.user)
+        try:
+            file_format = detect_format(upload, request.data.get('file_format') or request.query_params.get('file_format'))
+            report = importer.run(upload, file_format)
+        except ImportFormatError as e:
+            logger.warning(f"Bulk import by manufacturer {request.user.id} stopped: {str(e)}")
+            # Batches before the unreadable part are already saved
+            return Response({"detail": str(e), **importer.report}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error importing products: {str(e)}")
+            return Response({"detail": "Failed to import products"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(report)
+
+    @action(detail=False, methods=['patch'], url_path='bulk-stock', permission_classes=[IsManufacturer],
+            parser_classes=[JSONParser])
+    def bulk_stock(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({"detail": "Send a list of {sku, stock_quantity, price, discount} items"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_STOCK_ITEMS:
+            return Response({"detail": f"At most {MAX_BULK_STOCK_ITEMS} items per request"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = StockUpdater(request.user).run(items)
+        except Exception as e:
+            logger.error(f"Error updating stock: {str(e)}")
+            return Response({"detail": "Failed to update stock"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(report)
@@ -0,0 +1,123 @@
+"""HTTP conditional GET helpers shared by the API views.
+
+Responses carry an ``ETag`` (and ``Last-Modified`` where the data has
+timestamps); a client that sends them back in ``If-None-Match`` /
+``If-Modified-Since`` gets ``304 Not Modified`` with an empty body instead
+of the full payload.
+
+``ConditionalGetMixin`` derives the validators of a detail endpoint from a
+single aggregate query over ``updated_at`` and related rows, so unchanged
+objects are answered before they are loaded or serialized.
+"""
+import hashlib
+import json
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+def compute_etag(data):
+    """Strong ETag for JSON-serializable ``data``."""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(payload.encode('utf-8')).hexdigest())
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    # If-None-Match uses the weak comparison, so W/ prefixes added by proxies still match
+    candidates = [candidate.removeprefix('W/') for candidate in parse_etags(header)]
+    return '*' in candidates or etag.removeprefix('W/') in candidates
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Authenticated data: browsers may keep it but must revalidate before reuse
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conditional_response(request, data, etag=None):
+    """``Response(data)`` with an ETag, or an empty 304 when the client already has it."""
+    etag = etag or compute_etag(data)
+    if etag_matches(request, etag):
+        return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+    return set_validators(Response(data), etag)
+
+def not_modified(request, etag, last_modified=None):
+    # If-Modified-Since is only consulted when the client sent no ETag (RFC 9110 13.2.2)
+    if request.META.get('HTTP_IF_NONE_MATCH'):
+        return etag_matches(request, etag)
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+
+def state_validators(request, state, last_modified=None):
+    """``(etag, last_modified)`` for a representation built from ``state``.
+
+    The request URL and user are part of the tag because the same object is
+    rendered differently per host (absolute media URLs), query string
+    (``fields``/``expand``) and viewer.
+    """
+    payload = json.dumps(
+        [request.build_absolute_uri(), getattr(request.user, 'pk', None), state],
+        cls=DjangoJSONEncoder, sort_keys=True
+    )
+    return 'W/' + quote_etag(hashlib.sha1(payload.encode('utf-8')).hexdigest()), last_modified
+
+
+class ConditionalGetMixin:
+    """ETag / Last-Modified support for ``retrieve`` on a viewset.
+
+    ``conditional_fields`` are model field paths whose maximum value
+    identifies the object's current state; ``__`` paths reach related rows.
+    ``conditional_count_relations`` are to-many relations counted as well,
+    so deleting a child row is noticed even though it leaves no timestamp.
+    The latest datetime among the values is sent as ``Last-Modified``.
+
+    Visibility comes from ``get_queryset()``, so views must scope their
+    queryset rather than rely on object-level permissions.
+    """
+    conditional_fields = ('updated_at',)
+    conditional_count_relations = ()
+
+    def get_conditional_validators(self, request):
+        """``(etag, last_modified)`` for the requested object, or ``None`` if it does not exist."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        aggregates = {f'field_{index}': Max(path) for index, path in enumerate(self.conditional_fields)}
+        aggregates.update({
+            f'count_{index}': Count(relation, distinct=True)
+            for index, relation in enumerate(self.conditional_count_relations)
+        })
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            row = queryset.order_by().values('pk').annotate(**aggregates).first()
+        except (TypeError, ValueError, ValidationError):
+            # Malformed lookup value: let retrieve() produce its usual 404
+            return None
+        if row is None:
+            return None
+        state = [row.pop('pk')] + [row[key] for key in sorted(row)]
+        timestamps = [value for value in state if isinstance(value, datetime)]
+        return state_validators(request, state, max(timestamps) if timestamps else None)
+
+    def conditional_get(self, request, respond):
+        """Return 304 when the client's copy is current, else ``respond()`` with validators."""
+        validators = self.get_conditional_validators(request)
+        if validators is None:
+            return respond()
+        etag, last_modified = validators
+        if not_modified(request, etag, last_modified):
+            return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+        response = respond()
+        if response.status_code == status.HTTP_200_OK:
+            set_validators(response, etag, last_modified)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        parent = super()
+        return self.conditional_get(request, lambda: parent.retrieve(request, *args, **kwargs))
@@ -0,0 +1,138 @@
+"""Keyset (cursor) pagination shared by the API viewsets.
+
+Pages are fetched with ``WHERE (sort_key, id) < (last_sort_key, last_id)``
+instead of ``OFFSET``, so every page costs one indexed range scan and rows
+inserted while a client scrolls never shift or duplicate later pages. The
+opaque cursor carries the ordering and the position of the last row.
+
+Clients opt in by sending ``cursor`` (empty for the first page); requests
+without it keep the view's previous pagination behaviour.
+"""
+import base64
+import binascii
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(BasePagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    default_ordering = '-created_at'
+    # Non-nullable fields clients may sort by; views override with ``keyset_ordering_fields``
+    ordering_fields = ('created_at',)
+
+    def get_ordering_fields(self, view):
+        return getattr(view, 'keyset_ordering_fields', self.ordering_fields)
+
+    def get_ordering(self, request, view):
+        ordering = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        if ordering.lstrip('-') not in self.get_ordering_fields(view):
+            raise ValidationError({self.ordering_query_param: f"Unsupported ordering '{ordering}'"})
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, encoded, ordering):
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if cursor['o'] != ordering:
+                raise ValueError('cursor ordering mismatch')
+            return cursor['v'], int(cursor['id'])
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, ordering, value, pk):
+        # Full precision: DjangoJSONEncoder would truncate datetimes to milliseconds
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif not isinstance(value, (int, str)):
+            value = str(value)
+        payload = json.dumps({'o': ordering, 'v': value, 'id': pk})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(request, view)
+        field = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(ordering, '-id' if descending else 'id')
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            value, pk = self.decode_cursor(encoded, ordering)
+            value = queryset.model._meta.get_field(field).to_python(value)
+            op = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{op}': value}) |
+                Q(**{field: value, f'id__{op}': pk})
+            )
+
+        # One extra row tells whether another page exists without a COUNT(*)
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(ordering, getattr(last, field), last.pk)
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class OptInKeysetPagination(KeysetPagination):
+    """Keyset pagination when ``cursor`` is sent, else ``fallback_class`` (or no pagination)."""
+    fallback_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if self.cursor_query_param in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        if self.fallback_class is None:
+            return None
+        self.fallback = self.fallback_class()
+        return self.fallback.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        url = super().get_next_link()
+        # Drop page-number params that only make sense for the fallback paginator
+        return remove_query_param(url, 'page') if url else url
@@ -48,12 +48,13 @@ INSTALLED_APPS = [
 
     'custom_admin.apps.CustomAdminConfig',
     'users',
-    'products',
+    'products.apps.ProductsConfig',
     'orders',
     'addresses',
     'notifications',
     'settings',
     'analytics',
+    'uploads.apps.UploadsConfig',
     'sparehubadmin',
 ]
 
@@ -124,6 +125,35 @@ else:
     }
 
 
+# Cache
+# CACHE_BACKEND is one of locmem (per process), file, db (run `manage.py createcachetable`)
+# or redis (needs the redis package); CACHE_LOCATION overrides the default location.
+# The catalog version (products.cache) must be seen by every gunicorn worker and by the
+# worker commands that edit products, so the default is the shared database cache;
+# locmem is only suitable for a single process.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'sparehub'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, '.cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'sparehub_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='db')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': 'sparehub',
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+
+# Seconds catalog lists (categories, subcategories, brands, featured) stay cached;
+# edits invalidate them immediately through the catalog version
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Tax applied to order subtotals by the server-side pricing engine (18% GST)
+ORDER_TAX_RATE = config('ORDER_TAX_RATE', default='0.18')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -181,6 +211,44 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = config('MEDIA_URL', default='/media/')
 MEDIA_ROOT = config('MEDIA_ROOT', default=os.path.join(BASE_DIR, 'media'))
 
+# Uploaded media is stored once per distinct content (uploads.storage); run
+# manage.py collect_media_garbage periodically to delete unreferenced blobs.
+# STATICFILES_STORAGE above is not read by Django 5.1, so staticfiles keeps the default
+STORAGES = {
+    'default': {
+        'BACKEND': config('MEDIA_STORAGE_BACKEND', default='uploads.storage.ContentAddressedStorage'),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Product image renditions (products.renditions): formats generated for every size,
+# e.g. "webp,avif" where Pillow can encode AVIF, and the size of the worker pool
+IMAGE_RENDITION_FORMATS = config('IMAGE_RENDITION_FORMATS', default='webp').split(',')
+IMAGE_RENDITION_WORKERS = config('IMAGE_RENDITION_WORKERS', default=2, cast=int)
+
+# Uploads waiting for manage.py run_media_worker (uploads.tasks). Keep it outside
+# MEDIA_ROOT so unvalidated files are never served, and on the same filesystem as
+# FILE_UPLOAD_TEMP_DIR so staging an upload is a rename
+MEDIA_QUEUE_DIR = config('MEDIA_QUEUE_DIR', default=os.path.join(BASE_DIR, 'media_queue'))
+# Whether `manage.py run_media_worker` runs (Procfile `worker`). It must see the same
+# MEDIA_QUEUE_DIR and MEDIA_ROOT disk as the web processes. Without a worker, each web
+# process handles uploads in MEDIA_INLINE_WORKERS background threads (uploads.background),
+# which poll for leftover tasks and sweep stale files at the given intervals (seconds)
+MEDIA_WORKER_ENABLED = config('MEDIA_WORKER_ENABLED', default=False, cast=bool)
+MEDIA_INLINE_WORKERS = config('MEDIA_INLINE_WORKERS', default=2, cast=int)
+MEDIA_INLINE_POLL_INTERVAL = config('MEDIA_INLINE_POLL_INTERVAL', default=30.0, cast=float)
+MEDIA_INLINE_CLEANUP_INTERVAL = config('MEDIA_INLINE_CLEANUP_INTERVAL', default=3600.0, cast=float)
+
+# Resumable chunked uploads (uploads.sessions): largest file, largest chunk per request,
+# and how long a session stays usable after its last chunk
+UPLOAD_SESSION_MAX_BYTES = config('UPLOAD_SESSION_MAX_BYTES', default=200 * 1024 * 1024, cast=int)
+# Anonymous sessions only carry registration logos and licenses
+UPLOAD_SESSION_ANON_MAX_BYTES = config('UPLOAD_SESSION_ANON_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+UPLOAD_CHUNK_MAX_BYTES = config('UPLOAD_CHUNK_MAX_BYTES', default=8 * 1024 * 1024, cast=int)
+UPLOAD_SESSION_TTL_HOURS = config('UPLOAD_SESSION_TTL_HOURS', default=24, cast=int)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -207,6 +275,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        # Upload sessions opened without signing in, per client IP (uploads.views)
+        'anon_upload_sessions': config('ANON_UPLOAD_SESSION_RATE', default='20/hour'),
+    },
 }
 
 # CORS settings
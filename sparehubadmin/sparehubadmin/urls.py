@@ -31,6 +31,7 @@ urlpatterns = [
     path('api/settings/', include('settings.urls')),
     path('api/analytics/', include('analytics.urls')),
     path('api/orders/', include('orders.urls')),
+    path('api/uploads/', include('uploads.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import MediaTask, UploadSession
+
+@admin.register(MediaTask)
+class MediaTaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'original_name', 'size', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('original_name', 'stored_path')
+    ordering = ('-created_at',)
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'filename', 'status', 'received', 'size', 'owner', 'created_at', 'expires_at')
+    list_filter = ('status',)
+    search_fields = ('filename',)
+    ordering = ('-created_at',)
@@ -0,0 +1,77 @@
+"""In-process media processing for deployments without ``run_media_worker``.
+
+With ``MEDIA_WORKER_ENABLED`` off, each web process runs a few daemon
+threads that claim pending ``MediaTask`` rows exactly like the worker does,
+with a conditional UPDATE, so several processes never run a task twice.
+Queuing a task wakes them once the request's transaction commits; the
+request itself returns straight away. They also poll, which picks up tasks
+left pending by a restarted process, and periodically run the worker's
+cleanup sweeps and requeue tasks left running by a process that exited
+mid-task.
+
+The threads start on the first task queued by a process.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# A task running this long belonged to a process that exited while processing it
+STALE_TASK_AGE = timedelta(hours=1)
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_threads = []
+_last_cleanup = None
+
+
+def wake():
+    """Start the processing threads if needed and have them claim new tasks."""
+    with _lock:
+        if not _threads:
+            for index in range(max(1, settings.MEDIA_INLINE_WORKERS)):
+                thread = threading.Thread(target=process_tasks, name=f'media-inline-{index}', daemon=True)
+                thread.start()
+                _threads.append(thread)
+    _wakeup.set()
+
+def cleanup_due():
+    global _last_cleanup
+    with _lock:
+        if _last_cleanup is not None and time.monotonic() - _last_cleanup < settings.MEDIA_INLINE_CLEANUP_INTERVAL:
+            return False
+        _last_cleanup = time.monotonic()
+        return True
+
+def requeue_stale_tasks():
+    from .models import MediaTask, MediaTaskStatus
+    return MediaTask.objects.filter(
+        status=MediaTaskStatus.RUNNING, started_at__lt=timezone.now() - STALE_TASK_AGE
+    ).update(status=MediaTaskStatus.PENDING, started_at=None)
+
+def process_tasks():
+    from .sessions import remove_expired_sessions
+    from .tasks import claim_next_task, remove_orphaned_staged_files, run_media_task
+
+    while True:
+        _wakeup.wait(settings.MEDIA_INLINE_POLL_INTERVAL)
+        _wakeup.clear()
+        try:
+            if cleanup_due():
+                requeue_stale_tasks()
+                remove_orphaned_staged_files()
+                remove_expired_sessions()
+            while True:
+                task_id = claim_next_task()
+                if task_id is None:
+                    break
+                run_media_task(task_id)
+        except Exception:
+            logger.exception("In-process media processing failed")
+        finally:
+            close_old_connections()
@@ -0,0 +1,140 @@
+"""Garbage collection of content-addressed blobs.
+
+References are counted at collection time rather than kept in a counter:
+file fields are also written with ``QuerySet.update()`` (the media worker
+does), which no signal sees, so a stored count would drift. The referrers
+are every ``FileField`` on a ``ContentAddressedStorage`` (``ProductImage``,
+the ``Product`` PDFs, ``Brand`` logos, ``Category`` and ``Subcategory``
+images), the rendition files listed in ``ProductImage.renditions`` and the
+manufacturer and shop documents, which are stored as absolute URLs.
+
+A blob nothing refers to is removed once it is older than the grace
+period; saving content again touches its blob, so a file that is stored
+but not yet referenced by a committed row is never collected.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from itertools import chain
+from urllib.parse import unquote, urlparse
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import FileField
+from products.models import ProductImage
+from products.renditions import rendition_files
+from users.models import Manufacturer, Shop
+from .storage import BLOB_DIRECTORY, INCOMING_PREFIX, ContentAddressedStorage, is_blob_name
+
+logger = logging.getLogger(__name__)
+
+GRACE_SECONDS = 60 * 60
+ITERATOR_CHUNK_SIZE = 2000
+
+
+def blob_file_fields():
+    """``(model, field)`` for every file field stored in a ``ContentAddressedStorage``."""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field
+
+def file_field_references():
+    for model, field in blob_file_fields():
+        names = model._default_manager.exclude(**{field.name: ''}).exclude(
+            **{f'{field.name}__isnull': True}
+        ).values_list(field.name, flat=True)
+        yield from names.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+def rendition_references():
+    renditions = ProductImage.objects.order_by().values_list('renditions', flat=True)
+    for image_renditions in renditions.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        yield from rendition_files(image_renditions)
+
+def profile_document_references():
+    media_path = urlparse(settings.MEDIA_URL).path
+    for model in (Manufacturer, Shop):
+        for urls in model.objects.values_list('logo', 'license').iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            for url in urls:
+                path = urlparse(url or '').path
+                if path.startswith(media_path):
+                    yield unquote(path[len(media_path):])
+
+def count_references():
+    """``Counter`` of blob name -> number of references."""
+    return Counter(
+        name for name in chain(file_field_references(), rendition_references(), profile_document_references())
+        if is_blob_name(name)
+    )
+
+def stored_files(storage):
+    """``(name, stat)`` of every file under the blob directory, including interrupted saves."""
+    root = storage.path(BLOB_DIRECTORY)
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield os.path.relpath(path, storage.location).replace(os.sep, '/'), stat
+
+def collect_garbage(grace_seconds=GRACE_SECONDS, dry_run=False, storage=None):
+    """Delete unreferenced blobs older than ``grace_seconds`` and return a report."""
+    storage = storage or default_storage
+    if not isinstance(storage, ContentAddressedStorage):
+        raise ValueError('The default storage is not a ContentAddressedStorage.')
+
+    references = count_references()
+    cutoff = time.time() - grace_seconds
+    report = {
+        'dry_run': dry_run,
+        'blobs': 0,
+        'blob_bytes': 0,
+        'references': sum(references.values()),
+        'referenced_blobs': 0,
+        'shared_blobs': 0,
+        'deduplicated_bytes': 0,
+        'unreferenced_blobs': 0,
+        'recent_unreferenced_blobs': 0,
+        'deleted_blobs': 0,
+        'freed_bytes': 0,
+        'interrupted_saves_removed': 0,
+        'missing_blobs': [],
+    }
+    seen = set()
+    for name, stat in stored_files(storage):
+        if os.path.basename(name).startswith(INCOMING_PREFIX):
+            if stat.st_mtime < cutoff:
+                if not dry_run:
+                    os.remove(storage.path(name))
+                report['interrupted_saves_removed'] += 1
+            continue
+
+        seen.add(name)
+        report['blobs'] += 1
+        report['blob_bytes'] += stat.st_size
+        count = references.get(name, 0)
+        if count:
+            report['referenced_blobs'] += 1
+            if count > 1:
+                report['shared_blobs'] += 1
+                report['deduplicated_bytes'] += stat.st_size * (count - 1)
+            continue
+
+        report['unreferenced_blobs'] += 1
+        if stat.st_mtime >= cutoff:
+            report['recent_unreferenced_blobs'] += 1
+            continue
+        if not dry_run:
+            storage.delete_blob(name)
+        report['deleted_blobs'] += 1
+        report['freed_bytes'] += stat.st_size
+
+    report['missing_blobs'] = sorted(set(references) - seen)
+    logger.info(
+        f"Media garbage collection: blobs={report['blobs']} deleted={report['deleted_blobs']} "
+        f"freed={report['freed_bytes']} missing={len(report['missing_blobs'])} dry_run={dry_run}"
+    )
+    return report
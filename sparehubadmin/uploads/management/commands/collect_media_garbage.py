@@ -0,0 +1,42 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Count references to content-addressed media blobs and delete the ones nothing refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting it')
+        parser.add_argument(
+            '--grace-seconds', type=int, default=None,
+            help='Keep unreferenced blobs written or re-saved within this many seconds (default one hour)'
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        from uploads.garbage import GRACE_SECONDS, collect_garbage
+
+        grace_seconds = options['grace_seconds'] if options['grace_seconds'] is not None else GRACE_SECONDS
+        try:
+            report = collect_garbage(grace_seconds=grace_seconds, dry_run=options['dry_run'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        report = {'generated_at': timezone.now().isoformat(), 'grace_seconds': grace_seconds, **report}
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stderr.write(self.style.SUCCESS(
+            f"{verb} {report['deleted_blobs']} of {report['blobs']} blobs ({report['freed_bytes']} bytes); "
+            f"{report['shared_blobs']} shared blobs save {report['deduplicated_bytes']} bytes"
+        ))
+        if report['missing_blobs']:
+            self.stderr.write(self.style.WARNING(
+                f"{len(report['missing_blobs'])} referenced blobs are missing, e.g. {report['missing_blobs'][0]}"
+            ))
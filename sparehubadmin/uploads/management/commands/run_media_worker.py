@@ -0,0 +1,86 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.core.management.base import BaseCommand
+
+
+def init_worker():
+    # Worker processes are spawned fresh, so they need their own app registry
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Store, validate and render queued MediaTask uploads in a local process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of media processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between queue polls when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument(
+            '--requeue-running', action='store_true',
+            help='Reset tasks left running by a crashed worker back to pending before starting'
+        )
+        parser.add_argument(
+            '--cleanup-interval', type=float, default=3600.0,
+            help='Seconds between sweeps of staged files left behind by rolled back requests and expired upload sessions'
+        )
+
+    def handle(self, *args, **options):
+        from django.utils import timezone
+        from uploads.models import MediaTask, MediaTaskStatus
+        from uploads.sessions import remove_expired_sessions
+        from uploads.tasks import claim_next_task, remove_orphaned_staged_files, run_media_task
+
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+
+        if options['requeue_running']:
+            requeued = MediaTask.objects.filter(status=MediaTaskStatus.RUNNING).update(
+                status=MediaTaskStatus.PENDING, started_at=None
+            )
+            self.stdout.write(f'Requeued {requeued} running tasks')
+
+        in_flight = {}
+        last_cleanup = None
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as pool:
+            while True:
+                if last_cleanup is None or time.monotonic() - last_cleanup >= options['cleanup_interval']:
+                    removed = remove_orphaned_staged_files()
+                    if removed:
+                        self.stdout.write(f'Removed {removed} orphaned staged files')
+                    expired = remove_expired_sessions()
+                    if expired:
+                        self.stdout.write(f'Removed {expired} expired upload sessions')
+                    last_cleanup = time.monotonic()
+
+                while len(in_flight) < workers:
+                    task_id = claim_next_task()
+                    if task_id is None:
+                        break
+                    in_flight[pool.submit(run_media_task, task_id)] = task_id
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_id = in_flight.pop(future)
+                    try:
+                        _, succeeded = future.result()
+                    except Exception as e:
+                        # The worker process died before it could record the failure itself
+                        MediaTask.objects.filter(pk=task_id).update(
+                            status=MediaTaskStatus.FAILED,
+                            error=str(e),
+                            finished_at=timezone.now()
+                        )
+                        succeeded = False
+                    if succeeded:
+                        self.stdout.write(self.style.SUCCESS(f'Media task {task_id} completed'))
+                    else:
+                        self.stdout.write(self.style.ERROR(f'Media task {task_id} failed'))
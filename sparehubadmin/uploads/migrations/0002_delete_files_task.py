@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediatask',
+            name='kind',
+            field=models.CharField(choices=[('product_image', 'Product Image'), ('product_pdf', 'Product Pdf'), ('profile_document', 'Profile Document'), ('image_renditions', 'Image Renditions'), ('delete_files', 'Delete Files')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,80 @@
+import uuid
+from django.db import models
+from django.conf import settings
+
+class MediaTaskKind(models.TextChoices):
+    PRODUCT_IMAGE = 'product_image'
+    PRODUCT_PDF = 'product_pdf'
+    PROFILE_DOCUMENT = 'profile_document'
+    IMAGE_RENDITIONS = 'image_renditions'
+    DELETE_FILES = 'delete_files'
+
+class MediaTaskStatus(models.TextChoices):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+class MediaTask(models.Model):
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='media_tasks')
+    kind = models.CharField(max_length=20, choices=MediaTaskKind.choices)
+    status = models.CharField(max_length=20, choices=MediaTaskStatus.choices, default=MediaTaskStatus.PENDING)
+    # Where the result goes, e.g. {"product_image_id": 1} or {"profile": "shop", "profile_id": 2, "field": "logo"}
+    target = models.JSONField(default=dict, blank=True)
+    staged_path = models.CharField(max_length=255, blank=True)  # Relative to MEDIA_QUEUE_DIR
+    original_name = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField(default=0)
+    stored_path = models.CharField(max_length=255, blank=True)  # Storage name of the processed file
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='uploads_media_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} task #{self.id} ({self.status})"
+
+class UploadSessionStatus(models.TextChoices):
+    OPEN = 'open'
+    COMPLETED = 'completed'
+    CONSUMED = 'consumed'
+
+class UploadSession(models.Model):
+    # Unguessable, because registration uploads are made before the client has an account
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64, blank=True)  # Optional SHA-256 of the whole file, hex
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=UploadSessionStatus.choices, default=UploadSessionStatus.OPEN)
+    # Set while a chunk is being written, so concurrent writers cannot interleave
+    chunk_started_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='uploads_session_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.id} of {self.filename} ({self.status})"
+
+    @property
+    def staged_path(self):
+        """Where the chunks are assembled, relative to ``MEDIA_QUEUE_DIR``."""
+        return f'sessions/{self.id}.part'
+
+    # The attributes queue_upload and the file type checks read from uploaded files
+    @property
+    def name(self):
+        return self.filename
@@ -0,0 +1,39 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import MediaTask, UploadSession
+from .sessions import SHA256_PATTERN, open_session
+
+class MediaTaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MediaTask
+        fields = [
+            'id', 'kind', 'status', 'target', 'original_name', 'size', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'content_type', 'size', 'checksum', 'offset', 'status', 'expires_at', 'created_at']
+        read_only_fields = ['id', 'offset', 'status', 'expires_at', 'created_at']
+
+    def validate_size(self, value):
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            limit = settings.UPLOAD_SESSION_MAX_BYTES
+        else:
+            limit = settings.UPLOAD_SESSION_ANON_MAX_BYTES
+        if value <= 0 or value > limit:
+            raise serializers.ValidationError(f'Files must be 1 to {limit} bytes.')
+        return value
+
+    def validate_checksum(self, value):
+        if value and not SHA256_PATTERN.match(value.lower()):
+            raise serializers.ValidationError('Use the hex SHA-256 digest of the whole file.')
+        return value
+
+    def create(self, validated_data):
+        return open_session(**validated_data)
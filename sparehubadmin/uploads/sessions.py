@@ -0,0 +1,236 @@
+"""Resumable chunked uploads.
+
+A client opens an ``UploadSession`` with the file's name, type, size and
+optionally its SHA-256, then sends the bytes as a series of ``PUT`` chunks,
+each with an ``Upload-Offset`` and an ``Upload-Checksum: sha256 <hex>``
+header. Each chunk is streamed to its own file in ``MEDIA_QUEUE_DIR/sessions/``
+and then copied into the assembled file at its offset, so neither a chunk
+nor the assembled file is held in memory.
+After a dropped connection the client asks for the session and resumes from
+its ``received`` offset. ``finalize_session`` checks the size and whole-file
+checksum.
+
+Completed sessions are referenced by id wherever a file could be uploaded
+(``image_uploads`` on products, ``logo_upload`` on registration, ...).
+Claiming one hands its assembled file to the media queue as the task's
+staged file, without copying it.
+"""
+import glob
+import hashlib
+import logging
+import os
+import re
+import shutil
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import MediaTask, MediaTaskStatus, UploadSession, UploadSessionStatus
+
+logger = logging.getLogger(__name__)
+
+STREAM_BLOCK_SIZE = 64 * 1024
+# A writer that has not finished its chunk in this time is assumed to have gone away
+CHUNK_CLAIM_TIMEOUT = timedelta(minutes=5)
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadSessionError(Exception):
+    status_code = 400
+
+    def __init__(self, message, offset=None):
+        super().__init__(message)
+        self.offset = offset
+
+
+class OffsetMismatch(UploadSessionError):
+    status_code = 409
+
+
+def session_file_path(session):
+    return os.path.join(settings.MEDIA_QUEUE_DIR, session.staged_path)
+
+def session_expiry():
+    return timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+def open_session(filename, size, content_type='', checksum='', owner=None):
+    """Create a session and its empty assembly file."""
+    session = UploadSession(
+        owner=owner if owner and owner.is_authenticated else None,
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type[:100],
+        size=size,
+        checksum=checksum.lower(),
+        expires_at=session_expiry(),
+    )
+    path = session_file_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    session.save()
+    return session
+
+def parse_checksum(header):
+    """Hex digest from an ``Upload-Checksum: sha256 <hex>`` header."""
+    algorithm, _, digest = (header or '').strip().partition(' ')
+    digest = digest.strip().lower()
+    if algorithm.lower() != 'sha256' or not SHA256_PATTERN.match(digest):
+        raise UploadSessionError('Send Upload-Checksum: sha256 <hex digest of the chunk>.')
+    return digest
+
+def usable(session):
+    if session.status != UploadSessionStatus.OPEN:
+        raise UploadSessionError(f'The upload is {session.status}.', offset=session.received)
+    if session.expires_at <= timezone.now():
+        raise UploadSessionError('The upload session has expired.')
+
+def write_chunk(session, offset, length, stream, checksum_header):
+    """Append ``length`` bytes from ``stream`` at ``offset`` and return the new offset."""
+    usable(session)
+    expected = parse_checksum(checksum_header)
+    if offset != session.received:
+        raise OffsetMismatch(f'Expected offset {session.received}.', offset=session.received)
+    if length <= 0 or length > settings.UPLOAD_CHUNK_MAX_BYTES:
+        raise UploadSessionError(f'Chunks must be 1 to {settings.UPLOAD_CHUNK_MAX_BYTES} bytes with a Content-Length.')
+    if offset + length > session.size:
+        raise UploadSessionError(f'The chunk ends past the declared size of {session.size} bytes.')
+
+    # The claim's start time is its token. The body is streamed into a file of this
+    # writer's own and copied into the assembly only while the row lock confirms the
+    # claim, so a writer whose stale claim was taken over cannot touch the upload
+    now = timezone.now()
+    claimed = UploadSession.objects.filter(
+        Q(chunk_started_at__isnull=True) | Q(chunk_started_at__lt=now - CHUNK_CLAIM_TIMEOUT),
+        pk=session.pk, status=UploadSessionStatus.OPEN, received=offset,
+    ).update(chunk_started_at=now)
+    if not claimed:
+        current = UploadSession.objects.filter(pk=session.pk).values_list('received', flat=True).first()
+        raise OffsetMismatch('Another chunk is being written, or the offset moved.', offset=current)
+    claim = UploadSession.objects.filter(pk=session.pk, chunk_started_at=now)
+
+    chunk_path = f'{session_file_path(session)}.{uuid.uuid4().hex}.chunk'
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(chunk_path, 'wb') as chunk:
+            while written < length:
+                block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                digest.update(block)
+                chunk.write(block)
+                written += len(block)
+        if written != length:
+            raise UploadSessionError('The chunk ended before Content-Length bytes.', offset=offset)
+        if digest.hexdigest() != expected:
+            raise UploadSessionError('Chunk checksum mismatch.', offset=offset)
+
+        with transaction.atomic():
+            if not list(claim.select_for_update().values_list('pk', flat=True)):
+                # Taken over after CHUNK_CLAIM_TIMEOUT; the other writer's chunk is the one that counts
+                current = UploadSession.objects.filter(pk=session.pk).values_list('received', flat=True).first()
+                raise OffsetMismatch('The chunk took too long and was superseded.', offset=current)
+            with open(chunk_path, 'rb') as chunk, open(session_file_path(session), 'r+b') as assembly:
+                assembly.seek(offset)
+                shutil.copyfileobj(chunk, assembly, STREAM_BLOCK_SIZE)
+                assembly.truncate(offset + written)
+            claim.update(
+                received=offset + written, chunk_started_at=None, expires_at=session_expiry(), updated_at=timezone.now()
+            )
+    except Exception:
+        # Releases the claim only if it is still this writer's
+        claim.update(chunk_started_at=None)
+        raise
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+    session.received = offset + written
+    return session.received
+
+def finalize_session(session):
+    """Verify an assembled upload and make it available to claim."""
+    usable(session)
+    if session.received != session.size:
+        raise UploadSessionError(f'{session.size - session.received} bytes are missing.', offset=session.received)
+    if session.checksum:
+        digest = hashlib.sha256()
+        with open(session_file_path(session), 'rb') as assembly:
+            for block in iter(lambda: assembly.read(STREAM_BLOCK_SIZE), b''):
+                digest.update(block)
+        if digest.hexdigest() != session.checksum:
+            # Start over; the chunks each matched, so the declared checksum or the chunk order was wrong
+            with open(session_file_path(session), 'wb'):
+                pass
+            UploadSession.objects.filter(pk=session.pk).update(received=0, updated_at=timezone.now())
+            logger.warning(f"Upload {session.id} of {session.filename} failed its checksum; reset")
+            raise UploadSessionError('File checksum mismatch; the upload was reset.', offset=0)
+    if not UploadSession.objects.filter(pk=session.pk, status=UploadSessionStatus.OPEN).update(
+        status=UploadSessionStatus.COMPLETED, updated_at=timezone.now()
+    ):
+        raise UploadSessionError('The upload was finalized concurrently.')
+    session.status = UploadSessionStatus.COMPLETED
+    logger.info(f"Upload {session.id} of {session.filename} completed: {session.size} bytes")
+    return session
+
+def abort_session(session):
+    if session.status == UploadSessionStatus.CONSUMED:
+        raise UploadSessionError('The upload is already in use.')
+    path = session_file_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    session.delete()
+
+def upload_ids(data, key):
+    """Upload ids under ``key`` in form data or a JSON body."""
+    if hasattr(data, 'getlist'):
+        return [value for value in data.getlist(key) if value]
+    value = data.get(key)
+    if isinstance(value, list):
+        return value
+    return [value] if value else []
+
+def claim_upload_sessions(ids, user=None):
+    """Completed sessions for ``ids``, in order, marked consumed so they cannot be used twice.
+
+    Call inside the transaction that queues their files. Raises ``ValueError``.
+    """
+    sessions = []
+    for value in ids:
+        try:
+            session_id = uuid.UUID(str(value))
+        except ValueError:
+            raise ValueError(f'Invalid upload id {value!r}.')
+        owner = Q(owner__isnull=True)
+        if user is not None and user.is_authenticated:
+            owner |= Q(owner=user)
+        claimed = UploadSession.objects.filter(
+            owner, pk=session_id, status=UploadSessionStatus.COMPLETED, expires_at__gt=timezone.now()
+        ).update(status=UploadSessionStatus.CONSUMED, updated_at=timezone.now())
+        if not claimed:
+            raise ValueError(f'Upload {session_id} is not a completed upload of yours.')
+        sessions.append(UploadSession.objects.get(pk=session_id))
+    return sessions
+
+def claim_upload_session(value, user=None):
+    sessions = claim_upload_sessions([value] if value else [], user)
+    return sessions[0] if sessions else None
+
+def remove_expired_sessions():
+    """Delete expired sessions and their files unless a queued task still needs them; returns how many."""
+    expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+    sessions = list(expired)
+    # A claimed file belongs to its media task, which removes it once processed
+    in_use = set(MediaTask.objects.filter(
+        staged_path__in=[session.staged_path for session in sessions],
+        status__in=[MediaTaskStatus.PENDING, MediaTaskStatus.RUNNING],
+    ).values_list('staged_path', flat=True))
+    for session in sessions:
+        path = session_file_path(session)
+        if session.staged_path not in in_use and os.path.exists(path):
+            os.remove(path)
+        # Chunk files are removed by their writer; these are left by a killed process
+        for chunk_path in glob.glob(f'{glob.escape(path)}.*.chunk'):
+            os.remove(chunk_path)
+    UploadSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+    return len(sessions)
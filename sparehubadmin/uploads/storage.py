@@ -0,0 +1,80 @@
+"""Content-addressed media storage.
+
+``ContentAddressedStorage`` streams each saved file into a temporary file
+while hashing it, then keeps it as ``blobs/<ab>/<cd>/<sha256><ext>``. The
+same bytes uploaded again for another product, brand or category resolve to
+the existing blob, so they are stored once; the duplicate is discarded
+instead of written.
+
+Blobs can be shared, so ``delete`` leaves them alone. ``manage.py
+collect_media_garbage`` counts the references to every blob from the file
+fields and rendition metadata that point at them and removes the ones
+nothing refers to (``uploads.garbage``). Files saved before this backend
+was enabled keep their names and are deleted as before.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIRECTORY = 'blobs'
+HASH_CHUNK_SIZE = 256 * 1024
+INCOMING_PREFIX = '.incoming-'
+MAX_EXTENSION_LENGTH = 10
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_DIRECTORY}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+def is_blob_name(name):
+    return bool(name) and name.replace('\\', '/').startswith(f'{BLOB_DIRECTORY}/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """``FileSystemStorage`` that stores each distinct content once, under its SHA-256 digest."""
+
+    def get_available_name(self, name, max_length=None):
+        # The name is derived from the content in _save, so there is nothing to probe for
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        extension = extension if len(extension) <= MAX_EXTENSION_LENGTH else ''
+        blob_root = self.path(BLOB_DIRECTORY)
+        os.makedirs(blob_root, exist_ok=True)
+
+        digest = hashlib.sha256()
+        descriptor, incoming_path = tempfile.mkstemp(dir=blob_root, prefix=INCOMING_PREFIX)
+        try:
+            with os.fdopen(descriptor, 'wb') as incoming:
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    incoming.write(chunk)
+            name = blob_name(digest.hexdigest(), extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                # Restart the garbage collector's grace period for a blob that is about to be referenced again
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(incoming_path, self.file_permissions_mode or 0o644)
+                # Atomic, so a concurrent save of the same content leaves one complete blob
+                os.replace(incoming_path, path)
+        finally:
+            if os.path.exists(incoming_path):
+                os.remove(incoming_path)
+        return name
+
+    def delete(self, name):
+        if is_blob_name(name):
+            # Other rows may share the blob; collect_media_garbage removes it once unreferenced
+            return
+        super().delete(name)
+
+    def delete_blob(self, name):
+        super().delete(name)
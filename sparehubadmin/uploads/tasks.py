@@ -0,0 +1,330 @@
+"""Background processing of uploaded media.
+
+Request handlers only stage uploads and queue a ``MediaTask``:
+``stage_upload`` moves Django's temporary upload file into
+``MEDIA_QUEUE_DIR`` (small in-memory uploads are written out in chunks), so
+the time a request spends on a file does not grow with its size. Product
+images get a placeholder ``ProductImage`` row straight away, which keeps
+their order and primary flag and gives clients an id to refer to.
+
+``manage.py run_media_worker`` claims tasks with a conditional UPDATE, like
+the export worker, validates each staged file (images are decoded with
+Pillow, PDFs checked for their header and trailer), moves it into storage
+and generates product image renditions. Clients poll
+``/api/uploads/tasks/<id>/`` for the outcome. Files left behind by deleted
+images are removed by the worker as well (``queue_file_deletion``).
+
+Deployments without a worker (``MEDIA_WORKER_ENABLED`` off) process tasks
+in background threads of the web processes instead (``uploads.background``).
+
+Files uploaded in chunks (``uploads.sessions``) are queued the same way;
+their assembled file already sits in the queue directory and becomes the
+task's staged file.
+"""
+import logging
+import os
+import time
+import uuid
+from urllib.parse import urljoin
+from django.conf import settings
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import QueryDict
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from products.cache import bump_catalog_version
+from products.models import Product, ProductImage
+from products.renditions import process_images
+from users.models import Manufacturer, Shop
+from . import background
+from .models import MediaTask, MediaTaskKind, MediaTaskStatus, UploadSession
+from .storage import is_blob_name
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_PDF_FIELDS = ('technical_specification_pdf', 'installation_guide_pdf')
+PROFILE_MODELS = {'manufacturer': Manufacturer, 'shop': Shop}
+PROFILE_DIRECTORIES = {'logo': 'logos', 'license': 'licenses'}
+# Staged files without a pending or running task (left by rolled back requests) are removed after this
+STAGED_FILE_MAX_AGE = 24 * 60 * 60
+PDF_PROBE_BYTES = 1024
+
+
+class MediaValidationError(Exception):
+    pass
+
+
+def copy_request_data(data):
+    """Mutable copy of ``request.data`` sharing its uploaded files.
+
+    ``QueryDict.copy()`` deep-copies values, which fails for uploads Django
+    spooled to a temporary file.
+    """
+    if not isinstance(data, QueryDict):
+        return data.copy()
+    copied = QueryDict(mutable=True)
+    for key, values in data.lists():
+        copied.setlist(key, list(values))
+    return copied
+
+def staged_file_path(relative_path):
+    return os.path.join(settings.MEDIA_QUEUE_DIR, relative_path)
+
+def stage_upload(uploaded_file):
+    """Move an uploaded file into the queue directory and return its relative path."""
+    if isinstance(uploaded_file, UploadSession):
+        # Already assembled in the queue directory by the chunked upload
+        return uploaded_file.staged_path
+    extension = os.path.splitext(uploaded_file.name)[1].lower()[:10]
+    relative_path = f'{uuid.uuid4().hex}{extension}'
+    destination = staged_file_path(relative_path)
+    os.makedirs(settings.MEDIA_QUEUE_DIR, exist_ok=True)
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        # A rename on the same filesystem, whatever the size
+        file_move_safe(uploaded_file.temporary_file_path(), destination)
+    else:
+        with open(destination, 'wb') as staged:
+            for chunk in uploaded_file.chunks():
+                staged.write(chunk)
+    return relative_path
+
+def create_task(**fields):
+    task = MediaTask.objects.create(**fields)
+    if not settings.MEDIA_WORKER_ENABLED:
+        # No media worker is deployed: background threads of this process take the task after commit
+        transaction.on_commit(background.wake)
+    return task
+
+def queue_upload(uploaded_file, kind, target, requested_by=None):
+    return create_task(
+        kind=kind,
+        target=target,
+        staged_path=stage_upload(uploaded_file),
+        original_name=os.path.basename(uploaded_file.name)[:255],
+        content_type=(uploaded_file.content_type or '')[:100],
+        size=uploaded_file.size or 0,
+        requested_by=requested_by if requested_by and requested_by.is_authenticated else None,
+    )
+
+def next_image_position(product):
+    last = product.images.order_by('-position').values_list('position', flat=True).first()
+    return 0 if last is None else last + 1
+
+def queue_product_image(product, uploaded_file, position, is_primary=False, requested_by=None):
+    """Create a placeholder image at ``position`` and queue the upload that fills it in."""
+    image = ProductImage.objects.create(product=product, position=position, is_primary=is_primary)
+    return queue_upload(uploaded_file, MediaTaskKind.PRODUCT_IMAGE, {'product_image_id': image.id}, requested_by)
+
+def queue_product_images(product, uploads, requested_by=None, first_is_primary=True):
+    """Append placeholder images for ``uploads`` in order and queue their processing."""
+    start = next_image_position(product) if uploads else 0
+    return [
+        queue_product_image(product, uploaded_file, start + index, first_is_primary and index == 0, requested_by)
+        for index, uploaded_file in enumerate(uploads)
+    ]
+
+def queue_product_pdf(product, field, uploaded_file, requested_by=None):
+    return queue_upload(
+        uploaded_file, MediaTaskKind.PRODUCT_PDF, {'product_id': product.id, 'field': field}, requested_by
+    )
+
+def queue_profile_document(profile, field, uploaded_file, base_url, requested_by=None):
+    """Queue a manufacturer or shop logo/license; ``base_url`` makes the stored URL absolute."""
+    target = {
+        'profile': profile._meta.model_name, 'profile_id': profile.pk, 'field': field, 'base_url': base_url,
+    }
+    return queue_upload(uploaded_file, MediaTaskKind.PROFILE_DOCUMENT, target, requested_by)
+
+def queue_renditions(product_image, requested_by=None):
+    return create_task(
+        kind=MediaTaskKind.IMAGE_RENDITIONS,
+        target={'product_image_id': product_image.id},
+        requested_by=requested_by if requested_by and requested_by.is_authenticated else None,
+    )
+
+def queue_file_deletion(names):
+    """Queue removal of files no row refers to any more, in the caller's transaction.
+
+    Content-addressed blobs may be shared and are left to ``collect_media_garbage``.
+    """
+    names = sorted({name for name in names if name and not is_blob_name(name)})
+    if not names:
+        return None
+    return create_task(kind=MediaTaskKind.DELETE_FILES, target={'names': names})
+
+def validate_image(path):
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise MediaValidationError(f'Not a valid image: {str(e)}')
+
+def validate_pdf(path):
+    """Check the PDF header and end-of-file marker without parsing the document."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as pdf:
+        head = pdf.read(PDF_PROBE_BYTES)
+        pdf.seek(max(size - PDF_PROBE_BYTES, 0))
+        tail = pdf.read()
+    if b'%PDF-' not in head:
+        raise MediaValidationError('Not a PDF file.')
+    if b'%%EOF' not in tail:
+        raise MediaValidationError('The PDF file is truncated.')
+
+def validate_document(path):
+    """Licenses may be PDFs or scanned images."""
+    try:
+        validate_pdf(path)
+    except MediaValidationError:
+        validate_image(path)
+
+def process_product_image(task, path):
+    image = ProductImage.objects.filter(pk=task.target['product_image_id']).select_related('product').first()
+    if image is None:
+        raise MediaValidationError('The product image was deleted before it was processed.')
+    validate_image(path)
+    with open(path, 'rb') as staged:
+        image.image.save(task.original_name, File(staged), save=False)
+    ProductImage.objects.filter(pk=image.pk).update(image=image.image.name)
+    process_images([image])
+    return image.image.name
+
+def process_product_pdf(task, path):
+    field_name = task.target['field']
+    if field_name not in PRODUCT_PDF_FIELDS:
+        raise MediaValidationError(f'Unknown product file field {field_name!r}.')
+    validate_pdf(path)
+    field = Product._meta.get_field(field_name)
+    with open(path, 'rb') as staged:
+        name = field.storage.save(field.generate_filename(None, task.original_name), File(staged))
+    updated = Product.objects.filter(pk=task.target['product_id']).update(
+        **{field_name: name, 'updated_at': timezone.now()}
+    )
+    if not updated:
+        field.storage.delete(name)
+        raise MediaValidationError('The product was deleted before the file was processed.')
+    bump_catalog_version()
+    return name
+
+def process_profile_document(task, path):
+    model = PROFILE_MODELS[task.target['profile']]
+    field_name = task.target['field']
+    if field_name not in PROFILE_DIRECTORIES:
+        raise MediaValidationError(f'Unknown profile file field {field_name!r}.')
+    if field_name == 'logo':
+        validate_image(path)
+    else:
+        validate_document(path)
+    with open(path, 'rb') as staged:
+        name = default_storage.save(f'{PROFILE_DIRECTORIES[field_name]}/{task.original_name}', File(staged))
+    url = urljoin(task.target['base_url'], default_storage.url(name))
+    if not model.objects.filter(pk=task.target['profile_id']).update(**{field_name: url}):
+        default_storage.delete(name)
+        raise MediaValidationError('The profile was deleted before the file was processed.')
+    return name
+
+def process_renditions(task, path):
+    image = ProductImage.objects.filter(pk=task.target['product_image_id']).first()
+    if image is None or not image.image:
+        raise MediaValidationError('The product image no longer exists.')
+    process_images([image])
+    return image.image.name
+
+def process_delete_files(task, path):
+    storage = ProductImage._meta.get_field('image').storage
+    for name in task.target.get('names', []):
+        try:
+            storage.delete(name)
+        except OSError as e:
+            logger.warning(f"Could not delete orphaned file {name}: {str(e)}")
+    return ''
+
+PROCESSORS = {
+    MediaTaskKind.PRODUCT_IMAGE: process_product_image,
+    MediaTaskKind.PRODUCT_PDF: process_product_pdf,
+    MediaTaskKind.PROFILE_DOCUMENT: process_profile_document,
+    MediaTaskKind.IMAGE_RENDITIONS: process_renditions,
+    MediaTaskKind.DELETE_FILES: process_delete_files,
+}
+
+def discard_placeholder(task):
+    """Drop the empty image row of a failed upload, keeping a primary image on the product."""
+    image = ProductImage.objects.filter(pk=task.target.get('product_image_id')).first()
+    if image is None or image.image:
+        return
+    image.delete()
+    if image.is_primary:
+        replacement = ProductImage.objects.filter(product_id=image.product_id).first()
+        if replacement and not ProductImage.objects.filter(product_id=image.product_id, is_primary=True).exists():
+            ProductImage.objects.filter(pk=replacement.pk).update(is_primary=True)
+
+def claim_next_task():
+    """Atomically move the oldest pending task to running and return its id, or None."""
+    for task_id in MediaTask.objects.filter(
+        status=MediaTaskStatus.PENDING
+    ).order_by('created_at').values_list('id', flat=True)[:10]:
+        claimed = MediaTask.objects.filter(id=task_id, status=MediaTaskStatus.PENDING).update(
+            status=MediaTaskStatus.RUNNING,
+            started_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        if claimed:
+            return task_id
+    return None
+
+def run_media_task(task_id):
+    """Process a claimed task, in a worker process or a background thread."""
+    task = MediaTask.objects.get(pk=task_id)
+    path = staged_file_path(task.staged_path) if task.staged_path else None
+    try:
+        if path and not os.path.exists(path):
+            raise MediaValidationError('The staged upload is missing.')
+        stored_path = PROCESSORS[task.kind](task, path)
+    except Exception as e:
+        if isinstance(e, MediaValidationError):
+            logger.warning(f"Media task {task.id} rejected {task.original_name}: {str(e)}")
+        else:
+            logger.exception(f"Media task {task.id} failed")
+        if task.kind == MediaTaskKind.PRODUCT_IMAGE:
+            discard_placeholder(task)
+        MediaTask.objects.filter(pk=task.pk).update(
+            status=MediaTaskStatus.FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        return task.id, False
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    MediaTask.objects.filter(pk=task.pk).update(
+        status=MediaTaskStatus.COMPLETED,
+        stored_path=stored_path or '',
+        finished_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+    return task.id, True
+
+def remove_orphaned_staged_files(max_age=STAGED_FILE_MAX_AGE):
+    """Delete old staged files no pending or running task refers to; returns how many."""
+    if not os.path.isdir(settings.MEDIA_QUEUE_DIR):
+        return 0
+    cutoff = time.time() - max_age
+    candidates = [
+        entry.name for entry in os.scandir(settings.MEDIA_QUEUE_DIR)
+        if entry.is_file() and entry.stat().st_mtime < cutoff
+    ]
+    if not candidates:
+        return 0
+    in_use = set(MediaTask.objects.filter(
+        staged_path__in=candidates, status__in=[MediaTaskStatus.PENDING, MediaTaskStatus.RUNNING]
+    ).values_list('staged_path', flat=True))
+    removed = 0
+    for name in candidates:
+        if name not in in_use:
+            os.remove(staged_file_path(name))
+            removed += 1
+    return removed
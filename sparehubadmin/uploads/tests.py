@@ -0,0 +1,179 @@
+import glob
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import UploadSession, UploadSessionStatus
+from .sessions import (
+    CHUNK_CLAIM_TIMEOUT, OffsetMismatch, UploadSessionError, claim_upload_sessions, finalize_session,
+    open_session, session_file_path, write_chunk,
+)
+
+DATA = os.urandom(1000)
+
+
+def checksum_header(data):
+    return f'sha256 {hashlib.sha256(data).hexdigest()}'
+
+
+class UploadSessionTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.queue_dir = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_QUEUE_DIR=cls.queue_dir)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.queue_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def assembled(self, session):
+        with open(session_file_path(session), 'rb') as assembly:
+            return assembly.read()
+
+    def write(self, session, offset, data, header=None, stream=None):
+        return write_chunk(session, offset, len(data), stream or io.BytesIO(data), header or checksum_header(data))
+
+
+class ChunkTests(UploadSessionTestCase):
+    def setUp(self):
+        self.session = open_session('part.jpg', len(DATA), 'image/jpeg', hashlib.sha256(DATA).hexdigest())
+
+    def test_chunks_assemble_and_finalize(self):
+        self.assertEqual(self.write(self.session, 0, DATA[:600]), 600)
+        self.assertEqual(self.write(self.session, 600, DATA[600:]), 1000)
+        finalize_session(self.session)
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.received, self.session.status), (1000, UploadSessionStatus.COMPLETED))
+        self.assertEqual(self.assembled(self.session), DATA)
+        self.assertEqual(glob.glob(f'{session_file_path(self.session)}.*.chunk'), [])
+
+    def test_wrong_offset_reports_the_current_one(self):
+        self.write(self.session, 0, DATA[:600])
+        for offset in (0, 700):
+            with self.assertRaises(OffsetMismatch) as raised:
+                self.write(self.session, offset, DATA[offset:offset + 100])
+            self.assertEqual(raised.exception.offset, 600)
+
+    def test_checksum_mismatch_leaves_the_upload_unchanged(self):
+        self.write(self.session, 0, DATA[:600])
+        with self.assertRaises(UploadSessionError):
+            self.write(self.session, 600, DATA[600:], header=checksum_header(b'other'))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.received, 600)
+        self.assertIsNone(self.session.chunk_started_at)
+        self.assertEqual(self.assembled(self.session), DATA[:600])
+
+    def test_rejected_chunks(self):
+        with self.assertRaises(UploadSessionError):
+            self.write(self.session, 0, DATA[:10], header='md5 abc')
+        with self.assertRaises(UploadSessionError):
+            self.write(self.session, 0, DATA + b'x')
+        with self.assertRaises(UploadSessionError):
+            # Shorter than its Content-Length
+            write_chunk(self.session, 0, 100, io.BytesIO(DATA[:50]), checksum_header(DATA[:100]))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.received, 0)
+
+    def test_finalize_needs_every_byte(self):
+        self.write(self.session, 0, DATA[:600])
+        with self.assertRaises(UploadSessionError) as raised:
+            finalize_session(self.session)
+        self.assertEqual(raised.exception.offset, 600)
+
+    def test_file_checksum_mismatch_resets_the_upload(self):
+        session = open_session('part.jpg', len(DATA), checksum=hashlib.sha256(b'other').hexdigest())
+        self.write(session, 0, DATA)
+        with self.assertRaises(UploadSessionError) as raised:
+            finalize_session(session)
+        self.assertEqual(raised.exception.offset, 0)
+        session.refresh_from_db()
+        self.assertEqual((session.received, session.status), (0, UploadSessionStatus.OPEN))
+        self.assertEqual(self.assembled(session), b'')
+
+    def test_expired_session_is_rejected(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(expires_at=timezone.now())
+        self.session.refresh_from_db()
+        with self.assertRaises(UploadSessionError):
+            self.write(self.session, 0, DATA[:10])
+
+
+class ChunkClaimTests(UploadSessionTestCase):
+    def setUp(self):
+        self.session = open_session('part.jpg', len(DATA))
+
+    def test_concurrent_chunk_is_rejected(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(chunk_started_at=timezone.now())
+        with self.assertRaises(OffsetMismatch):
+            self.write(self.session, 0, DATA[:100])
+
+    def test_abandoned_claim_is_taken_over(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(
+            chunk_started_at=timezone.now() - CHUNK_CLAIM_TIMEOUT - timedelta(seconds=1)
+        )
+        self.assertEqual(self.write(self.session, 0, DATA[:100]), 100)
+
+    def test_superseded_writer_leaves_the_upload_alone(self):
+        session = self.session
+
+        class TakenOverStream(io.BytesIO):
+            def read(self, size=-1):
+                # Another writer takes over the claim while this body is still arriving
+                UploadSession.objects.filter(pk=session.pk).update(chunk_started_at=timezone.now() + timedelta(seconds=1))
+                return super().read(size)
+
+        with self.assertRaises(OffsetMismatch):
+            self.write(session, 0, DATA[:100], stream=TakenOverStream(DATA[:100]))
+        self.assertEqual(self.assembled(session), b'')
+        session.refresh_from_db()
+        self.assertEqual(session.received, 0)
+        self.assertIsNotNone(session.chunk_started_at)
+
+
+class ClaimTests(UploadSessionTestCase):
+    def test_completed_upload_is_claimed_once(self):
+        session = open_session('part.jpg', len(DATA))
+        self.write(session, 0, DATA)
+        with self.assertRaises(ValueError):
+            claim_upload_sessions([session.id])
+        finalize_session(session)
+        self.assertEqual(claim_upload_sessions([session.id]), [session])
+        with self.assertRaises(ValueError):
+            claim_upload_sessions([session.id])
+
+
+class UploadSessionApiTests(UploadSessionTestCase):
+    def test_resumable_upload(self):
+        client = APIClient()
+        response = client.post('/api/uploads/sessions/', {
+            'filename': 'part.jpg', 'content_type': 'image/jpeg', 'size': len(DATA),
+            'checksum': hashlib.sha256(DATA).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        url = f"/api/uploads/sessions/{response.data['id']}/"
+
+        def put(offset, data):
+            return client.generic(
+                'PUT', f'{url}chunk/', data, content_type='application/offset+octet-stream',
+                HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=checksum_header(data),
+            )
+
+        response = put(0, DATA[:600])
+        self.assertEqual((response.status_code, response.data['offset']), (200, 600))
+        self.assertEqual(response['Upload-Offset'], '600')
+        response = put(0, DATA[:600])
+        self.assertEqual((response.status_code, response.data['offset']), (409, 600))
+        self.assertEqual(client.get(url).data['offset'], 600)
+        self.assertEqual(put(600, DATA[600:]).status_code, 200)
+
+        response = client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], UploadSessionStatus.COMPLETED)
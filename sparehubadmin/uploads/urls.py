@@ -0,0 +1,11 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import MediaTaskViewSet, UploadSessionViewSet
+
+router = DefaultRouter()
+router.register(r'tasks', MediaTaskViewSet)
+router.register(r'sessions', UploadSessionViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,98 @@
+import logging
+from django.db.models import Q
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.throttling import AnonRateThrottle
+from .models import MediaTask, UploadSession
+from .serializers import MediaTaskSerializer, UploadSessionSerializer
+from .sessions import UploadSessionError, abort_session, finalize_session, write_chunk
+
+logger = logging.getLogger(__name__)
+
+class MediaTaskViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of queued uploads; users see the tasks they queued, staff see all."""
+    queryset = MediaTask.objects.all()
+    serializer_class = MediaTaskSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = MediaTask.objects.order_by('-created_at')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(requested_by=self.request.user)
+        return queryset
+
+class AnonUploadSessionThrottle(AnonRateThrottle):
+    scope = 'anon_upload_sessions'
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """Resumable chunked uploads (``uploads.sessions``).
+
+    Open without signing in as well, so files can be uploaded before registering;
+    anonymous sessions are reachable only through their random id, are limited to
+    ``UPLOAD_SESSION_ANON_MAX_BYTES`` and are throttled per client.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_throttles(self):
+        # Chunks and status checks of an open session are not throttled
+        if self.action == 'create':
+            return [AnonUploadSessionThrottle()]
+        return super().get_throttles()
+
+    def get_queryset(self):
+        owner = Q(owner__isnull=True)
+        if self.request.user.is_authenticated:
+            owner |= Q(owner=self.request.user)
+        return UploadSession.objects.filter(owner)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    def error_response(self, error):
+        body = {'detail': str(error)}
+        if error.offset is not None:
+            body['offset'] = error.offset
+        return Response(body, status=error.status_code)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """Write the request body at ``Upload-Offset``; the body's SHA-256 is sent as ``Upload-Checksum``."""
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'detail': 'Upload-Offset must be a byte offset.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            received = write_chunk(session, offset, length, request.stream, request.headers.get('Upload-Checksum'))
+        except UploadSessionError as e:
+            return self.error_response(e)
+        except Exception as e:
+            logger.error(f"Error writing chunk of upload {session.id}: {str(e)}")
+            return Response({'detail': 'Could not store the chunk.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'id': str(session.id), 'offset': received}, headers={'Upload-Offset': str(received)})
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        try:
+            finalize_session(session)
+        except UploadSessionError as e:
+            return self.error_response(e)
+        except Exception as e:
+            logger.error(f"Error finalizing upload {session.id}: {str(e)}")
+            return Response({'detail': 'Could not finalize the upload.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(self.get_serializer(session).data)
+
+    def perform_destroy(self, instance):
+        abort_session(instance)
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except UploadSessionError as e:
+            return self.error_response(e)
@@ -8,13 +8,40 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework_simplejwt.tokens import RefreshToken
+from sparehubadmin.conditional import ConditionalGetMixin, state_validators
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
+from uploads.serializers import MediaTaskSerializer
+from uploads.sessions import claim_upload_session
+from uploads.tasks import copy_request_data, queue_profile_document
 import logging
 
 logger = logging.getLogger(__name__)
 
+def queue_profile_documents(request, profile, user, logo_file, license_file):
+    """Stage the registration logo and license for the media worker."""
+    base_url = request.build_absolute_uri('/')
+    return [
+        queue_profile_document(profile, field, uploaded_file, base_url, requested_by=user)
+        for field, uploaded_file in [('logo', logo_file), ('license', license_file)]
+        if uploaded_file
+    ]
+
+def has_upload(request, data, field):
+    return bool(request.FILES.get(field) or data.get(f'{field}_upload'))
+
+def profile_uploads(request, data):
+    """The logo and license files, or the chunked uploads named by ``logo_upload`` and ``license_upload``.
+
+    Raises ``ValueError`` for an upload id that is not a completed anonymous upload.
+    """
+    return (
+        request.FILES.get('logo') or claim_upload_session(data.get('logo_upload')),
+        request.FILES.get('license') or claim_upload_session(data.get('license_upload')),
+    )
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -25,7 +52,7 @@ class ManufacturerRegisterView(APIView):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
     def post(self, request):
-        data = request.data.copy()
+        data = copy_request_data(request.data)
         email = data.get('email')
         if not email:
             return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -49,22 +76,6 @@ class ManufacturerRegisterView(APIView):
             logger.error(f"User serializer errors: {user_serializer.errors}")
             return Response(user_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        logo_file = request.FILES.get('logo')
-        license_file = request.FILES.get('license')
-
-        logo_url = None
-        license_url = None
-        from django.core.files.storage import default_storage
-        from django.core.files.base import ContentFile
-
-        if logo_file:
-            logo_path = default_storage.save(f'logos/{logo_file.name}', ContentFile(logo_file.read()))
-            logo_url = request.build_absolute_uri(default_storage.url(logo_path))
-
-        if license_file:
-            license_path = default_storage.save(f'licenses/{license_file.name}', ContentFile(license_file.read()))
-            license_url = request.build_absolute_uri(default_storage.url(license_path))
-
         website = data.get('website')
         if website in ['', None]:
             website = None
@@ -87,25 +98,36 @@ class ManufacturerRegisterView(APIView):
             'country': data.get('country'),
             'website': website,
             'product_categories': data.get('product_categories'),
-            'logo': logo_url if logo_url else data.get('logo'),
-            'license': license_url if license_url else data.get('license'),
+            # Uploaded files are filled in by the media worker
+            'logo': None if has_upload(request, data, 'logo') else data.get('logo'),
+            'license': None if has_upload(request, data, 'license') else data.get('license'),
             'terms_accepted': data.get('terms_accepted') == 'true' or data.get('terms_accepted') == True,
         }
 
         manufacturer_serializer = ManufacturerSerializer(data=manufacturer_data)
-        if manufacturer_serializer.is_valid():
-            manufacturer_serializer.save()
-        else:
+        if not manufacturer_serializer.is_valid():
             logger.error(f"Manufacturer serializer errors: {manufacturer_serializer.errors}")
             user.delete()
             return Response(manufacturer_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            # Uploads are claimed together and only for a valid profile, so a failed
+            # registration leaves them usable for the retry
+            with transaction.atomic():
+                logo_file, license_file = profile_uploads(request, data)
+                manufacturer = manufacturer_serializer.save()
+                media_tasks = queue_profile_documents(request, manufacturer, user, logo_file, license_file)
+        except ValueError as e:
+            user.delete()
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         refresh = RefreshToken.for_user(user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh),
             'role': user.role,
             'user': user_serializer.data,
+            'media_tasks': MediaTaskSerializer(media_tasks, many=True).data,
         }, status=status.HTTP_201_CREATED)
 
 class ShopRegisterView(APIView):
@@ -114,7 +136,7 @@ class ShopRegisterView(APIView):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
     def post(self, request):
-        data = request.data.copy()
+        data = copy_request_data(request.data)
         email = data.get('email')
         if not email:
             return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -138,22 +160,6 @@ class ShopRegisterView(APIView):
             logger.error(f"User serializer errors: {user_serializer.errors}")
             return Response(user_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        logo_file = request.FILES.get('logo')
-        license_file = request.FILES.get('license')
-
-        logo_url = None
-        license_url = None
-        from django.core.files.storage import default_storage
-        from django.core.files.base import ContentFile
-
-        if logo_file:
-            logo_path = default_storage.save(f'logos/{logo_file.name}', ContentFile(logo_file.read()))
-            logo_url = request.build_absolute_uri(default_storage.url(logo_path))
-
-        if license_file:
-            license_path = default_storage.save(f'licenses/{license_file.name}', ContentFile(license_file.read()))
-            license_url = request.build_absolute_uri(default_storage.url(license_path))
-
         website = data.get('website')
         if website in ['', None]:
             website = None
@@ -176,25 +182,36 @@ class ShopRegisterView(APIView):
             'country': data.get('country'),
             'website': website,
             'business_type': data.get('business_type'),
-            'logo': logo_url if logo_url else data.get('logo'),
-            'license': license_url if license_url else data.get('license'),
+            # Uploaded files are filled in by the media worker
+            'logo': None if has_upload(request, data, 'logo') else data.get('logo'),
+            'license': None if has_upload(request, data, 'license') else data.get('license'),
             'terms_accepted': data.get('terms_accepted') == 'true' or data.get('terms_accepted') == True,
         }
 
         shop_serializer = ShopSerializer(data=shop_data)
-        if shop_serializer.is_valid():
-            shop_serializer.save()
-        else:
+        if not shop_serializer.is_valid():
             logger.error(f"Shop serializer errors: {shop_serializer.errors}")
             user.delete()
             return Response(shop_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            # Uploads are claimed together and only for a valid profile, so a failed
+            # registration leaves them usable for the retry
+            with transaction.atomic():
+                logo_file, license_file = profile_uploads(request, data)
+                shop = shop_serializer.save()
+                media_tasks = queue_profile_documents(request, shop, user, logo_file, license_file)
+        except ValueError as e:
+            user.delete()
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         refresh = RefreshToken.for_user(user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh),
             'role': user.role,
             'user': user_serializer.data,
+            'media_tasks': MediaTaskSerializer(media_tasks, many=True).data,
         }, status=status.HTTP_201_CREATED)
 
 class LoginView(APIView):
@@ -278,10 +295,22 @@ class LoginView(APIView):
             logger.debug(f'Authentication failed for user {username}')
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
-class UserProfileView(APIView):
+class UserProfileView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
+    def get_conditional_validators(self, request):
+        user = request.user
+        profile_model = {'manufacturer': Manufacturer, 'shop': Shop}.get(user.role)
+        profile_updated_at = None
+        if profile_model is not None:
+            profile_updated_at = profile_model.objects.filter(user=user).values_list('updated_at', flat=True).first()
+        timestamps = [stamp for stamp in (user.updated_at, profile_updated_at) if stamp is not None]
+        return state_validators(request, [user.pk, user.role, *timestamps], max(timestamps) if timestamps else None)
+
     def get(self, request):
+        return self.conditional_get(request, lambda: self.profile_response(request))
+
+    def profile_response(self, request):
         user = request.user
         user_serializer = UserSerializer(user)
         
@@ -337,7 +366,7 @@ class UserProfileView(APIView):
 
     def put(self, request):
         user = request.user
-        data = request.data.copy()
+        data = copy_request_data(request.data)
 
         user_serializer = UserSerializer(user, data=data, partial=True)
         if user_serializer.is_valid():